@@ -0,0 +1,32 @@
+"""Wallet indexes for exports
+
+Revision ID: 3c9e1f4a7b21
+Revises: 77a5ccfe5450
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e1f4a7b21'
+down_revision: Union[str, None] = '77a5ccfe5450'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# колонки фильтров db_wallets / filter_fresh; имена — как у index=True в models.Wallet
+INDEXED = ('rockets', 'last_updated', 'lable', 'profit_ratio', 'good_ratio')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for column in INDEXED:
+        op.create_index(op.f(f'ix_wallets_{column}'), 'wallets', [column], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in reversed(INDEXED):
+        op.drop_index(op.f(f'ix_wallets_{column}'), table_name='wallets')
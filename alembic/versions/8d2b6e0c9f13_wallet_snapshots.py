@@ -0,0 +1,48 @@
+"""Wallet snapshot history
+
+Revision ID: 8d2b6e0c9f13
+Revises: 3c9e1f4a7b21
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2b6e0c9f13'
+down_revision: Union[str, None] = '3c9e1f4a7b21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('wallet_snapshots',
+    sa.Column('address', sa.String(), nullable=False),
+    sa.Column('captured_at', sa.TIMESTAMP(timezone=True), nullable=False),
+    sa.Column('winrate', sa.Float(), nullable=True),
+    sa.Column('sol_balance', sa.Float(), nullable=True),
+    sa.Column('pnl', sa.Float(), nullable=True),
+    sa.Column('rockets', sa.Integer(), nullable=True),
+    sa.Column('trade_counts', sa.Integer(), nullable=True),
+    sa.Column('profit_trades', sa.Integer(), nullable=True),
+    sa.Column('good_profit', sa.Integer(), nullable=True),
+    sa.Column('fast_trades', sa.Float(), nullable=True),
+    sa.Column('median', sa.Float(), nullable=True),
+    sa.Column('lable', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('address', 'captured_at'),
+    postgresql_partition_by='RANGE (captured_at)',
+    )
+    op.create_index('ix_wallet_snapshots_captured_at', 'wallet_snapshots', ['captured_at'], unique=False)
+    # месячные секции создаёт src.db.snapshots.ensure_partitions; остальное — в default
+    if op.get_context().dialect.name == 'postgresql':
+        op.execute('CREATE TABLE wallet_snapshots_default PARTITION OF wallet_snapshots DEFAULT')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_wallet_snapshots_captured_at', table_name='wallet_snapshots')
+    op.drop_table('wallet_snapshots')
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+TOP_PAGE = FIXTURES / "dexscreener" / "top_page.html"
+TOP_TRADERS = FIXTURES / "dexscreener" / "top_traders"
+WALLET_JSON = FIXTURES / "gmgn" / "wallet_new.json"
+ACTIVITY_TABLE = FIXTURES / "gmgn" / "activity_table.json"
+RESULTS_TXT = FIXTURES / "gmgn" / "results.txt"
+
+# БД для замеров upsert: отдельная база, не рабочая.  Без неё кейсы пропускаются.
+DB_ENV = "BENCH_DATABASE_URL"
+BENCH_PREFIX = "bench"          # адреса тестовых кошельков, удаляются после замера
+DB_ROWS = 50
+
+
+@dataclass
+class Case:
+    """Один замер: `setup()` готовит данные и возвращает (число элементов, функция одного прогона)."""
+
+    name: str
+    unit: str
+    setup: Callable[[], "tuple[int, Callable[[], object]]"]
+    teardown: Optional[Callable[[], None]] = None
+    skip_reason: Optional[Callable[[], Optional[str]]] = None
+
+
+CASES: Dict[str, Case] = {}
+
+
+def case(name: str, unit: str, skip_reason=None):
+    def register(setup):
+        CASES[name] = Case(name, unit, setup, skip_reason=skip_reason)
+        return setup
+    return register
+
+
+# ---------- DexScreener -------------------------------------------------
+@case("parse_token_addresses", unit="pages")
+def _parse_token_addresses():
+    from src.dexscraper.parse_pages import parse_token_addresses
+
+    out_dir = Path(tempfile.mkdtemp(prefix="bench_tokens_"))
+    return 1, lambda: parse_token_addresses([TOP_PAGE], out_dir)
+
+
+def _wallets_case(backend: str):
+    def setup():
+        from src.dexscraper.extract_wallets import _wallets_from_html
+
+        files = sorted(TOP_TRADERS.glob("*.html"))
+        return len(files), lambda: [_wallets_from_html(f, backend) for f in files]
+    return setup
+
+
+def _register_wallet_backends() -> None:
+    from src.dexscraper.extract_wallets import BACKENDS
+
+    for backend in BACKENDS:
+        case(f"wallets_from_html[{backend}]", unit="files")(_wallets_case(backend))
+
+
+# ---------- gmgn --------------------------------------------------------
+@case("process_data", unit="wallets")
+def _process_data():
+    from src.dexscraper.wallet_main import process_data
+
+    data = json.loads(WALLET_JSON.read_text(encoding="utf-8"))
+    n = 1000
+    return n, lambda: [process_data(data, "bench", "7d") for _ in range(n)]
+
+
+@case("median_interval_and_label", unit="wallets")
+def _median_interval_and_label():
+    from src.dexscraper.wallet_parse_main import median_interval_and_label
+
+    durations = [row["duration"] for row in json.loads(ACTIVITY_TABLE.read_text(encoding="utf-8"))["rows"]]
+    n = 200
+    return n, lambda: [median_interval_and_label(durations) for _ in range(n)]
+
+
+@case("activity_metrics", unit="wallets")
+def _activity_metrics():
+    from src.dexscraper.wallet_parse_main import activity_metrics
+
+    table = json.loads(ACTIVITY_TABLE.read_text(encoding="utf-8"))
+    n = 100
+    return n, lambda: [activity_metrics(table) for _ in range(n)]
+
+
+@case("score_tables[batch]", unit="wallets")
+def _score_tables():
+    from src.dexscraper.scoring import score_tables
+
+    tables = [json.loads(ACTIVITY_TABLE.read_text(encoding="utf-8"))] * 1000
+    return len(tables), lambda: score_tables(tables)
+
+
+@case("load_results_multiline", unit="objects")
+def _load_results_multiline():
+    from src.dexscraper.wallet_parse_main import load_results_multiline
+
+    n = len(load_results_multiline(RESULTS_TXT))
+    return n, lambda: load_results_multiline(RESULTS_TXT)
+
+
+@case("iter_records[jsonl]", unit="objects")
+def _iter_records_jsonl():
+    from src.dexscraper.results_io import append_record, iter_records, read_records
+
+    path = Path(tempfile.mkdtemp(prefix="bench_results_")) / "results.txt"
+    for record in read_records(RESULTS_TXT):
+        append_record(path, record)
+    n = sum(1 for _ in iter_records(path))
+    return n, lambda: sum(1 for _ in iter_records(path))
+
+
+# ---------- БД ----------------------------------------------------------
+def _db_skip() -> Optional[str]:
+    return None if os.getenv(DB_ENV) else f"не задан {DB_ENV}"
+
+
+def _bench_sessions():
+    from src.db.database import Base, get_engine, get_session_factory
+
+    Base.metadata.create_all(get_engine(os.environ[DB_ENV]))
+    return get_session_factory(os.environ[DB_ENV])
+
+
+def _cleanup_db() -> None:
+    from src.db.models import Wallet
+
+    session = _bench_sessions()()
+    try:
+        session.query(Wallet).filter(Wallet.address.like(f"{BENCH_PREFIX}%")).delete(synchronize_session=False)
+        session.commit()
+    finally:
+        session.close()
+
+
+def _addresses() -> List[str]:
+    return [f"{BENCH_PREFIX}{i:06d}" for i in range(DB_ROWS)]
+
+
+@case("db.add_wallet", unit="rows", skip_reason=_db_skip)
+def _db_add_wallet():
+    from src.dexscraper.wallet_main import add_wallet
+
+    SessionLocal = _bench_sessions()
+    addresses = _addresses()
+    return len(addresses), lambda: [add_wallet(SessionLocal, a, 0.5, 12.3, 45.6) for a in addresses]
+
+
+@case("db.add_may_good", unit="rows", skip_reason=_db_skip)
+def _db_add_may_good():
+    import src.dexscraper.wallet_parse_main as wallet_parse_main
+    from src.dexscraper.wallet_main import add_wallet
+
+    SessionLocal = _bench_sessions()
+    wallet_parse_main.SessionLocal = SessionLocal    # add_may_good берёт фабрику из модуля
+    addresses = _addresses()
+    for a in addresses:                              # в пайплайне строку сначала создаёт add_wallet
+        add_wallet(SessionLocal, a, 0.5, 12.3, 45.6)
+    return len(addresses), lambda: [
+        wallet_parse_main.add_may_good(a, 1, 40, 20, 8, 12.5, 6.0, "DAILY") for a in addresses
+    ]
+
+
+@case("db.upsert_wallets[batch]", unit="rows", skip_reason=_db_skip)
+def _db_upsert_wallets():
+    from src.db.upsert import upsert_wallets, wallet_row
+
+    SessionLocal = _bench_sessions()
+    rows = [wallet_row(a, 0.5, 12.3, 45.6) for a in _addresses()]
+    return len(rows), lambda: upsert_wallets(SessionLocal, rows)
+
+
+CASES["db.add_may_good"].teardown = _cleanup_db
+CASES["db.upsert_wallets[batch]"].teardown = _cleanup_db
+
+
+def all_cases() -> Dict[str, Case]:
+    _register_wallet_backends()
+    return CASES
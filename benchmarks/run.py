@@ -0,0 +1,146 @@
+"""
+Офлайн-бенчмарки по записанным фикстурам DexScreener / gmgn.
+
+    python -m benchmarks.run                              # JSON в stdout
+    python -m benchmarks.run --out bench.json --baseline benchmarks/baseline.json
+    python -m benchmarks.run --save-baseline              # перезаписать baseline
+
+Код выхода 1, если какой-то кейс медленнее baseline больше чем на --tolerance.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# DATABASE_URL нужен src.db.database; соединения в офлайн-кейсах не открываются
+os.environ.setdefault("DATABASE_URL", os.getenv("BENCH_DATABASE_URL", "sqlite://"))
+os.environ.setdefault("DEX_CACHE_TTL_HOURS", "0")
+
+from benchmarks.cases import Case, all_cases
+
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+
+def measure(case: Case, repeat: int) -> dict:
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):   # прогресс-принты кода
+        return _measure(case, repeat)
+
+
+def _measure(case: Case, repeat: int) -> dict:
+    items, run = case.setup()
+    run()                                   # прогрев: импорты, кэши парсеров
+
+    timings: List[float] = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+
+    # пиковая память — отдельным прогоном, tracemalloc заметно тормозит код
+    gc.collect()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # пропускная способность по лучшему прогону — он меньше всего зависит от шума машины
+    best = min(timings)
+    return {
+        "items": items,
+        "unit": case.unit,
+        "repeat": repeat,
+        "seconds_median": round(statistics.median(timings), 6),
+        "seconds_best": round(best, 6),
+        "throughput": round(items / best, 3) if best else None,
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def run_all(names: Optional[List[str]] = None, repeat: int = 5) -> dict:
+    results: Dict[str, dict] = {}
+    for name, case in all_cases().items():
+        if names and not any(n in name for n in names):
+            continue
+        reason = case.skip_reason() if case.skip_reason else None
+        if reason:
+            results[name] = {"skipped": reason}
+            print(f"[bench] {name:<32} пропуск: {reason}", file=sys.stderr)
+            continue
+        try:
+            results[name] = measure(case, repeat)
+        finally:
+            if case.teardown:
+                case.teardown()
+        r = results[name]
+        print(f"[bench] {name:<32} {r['throughput']:>12} {r['unit']}/s  peak {r['peak_kib']} KiB",
+              file=sys.stderr)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Строки-отчёт по каждому общему кейсу; регрессии помечены «REGRESSION»."""
+    lines: List[str] = []
+    for name, cur in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or "throughput" not in cur or not base.get("throughput"):
+            continue
+        ratio = cur["throughput"] / base["throughput"]
+        mark = "REGRESSION" if ratio < 1 - tolerance else ("faster" if ratio > 1 + tolerance else "ok")
+        cur["vs_baseline"] = round(ratio, 3)
+        lines.append(f"{name:<32} x{ratio:6.2f}  {mark}")
+    return lines
+
+
+def _cli() -> None:
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарки пайплайна")
+    parser.add_argument("cases", nargs="*", help="подстроки имён кейсов (по умолчанию — все)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", type=Path, help="куда записать JSON (по умолчанию stdout)")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимое замедление (доля)")
+    parser.add_argument("--save-baseline", action="store_true", help="записать результат как baseline")
+    args = parser.parse_args()
+
+    current = run_all(args.cases, args.repeat)
+
+    regressions = 0
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(current, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"[bench] baseline → {args.baseline}", file=sys.stderr)
+    elif args.baseline.exists():
+        report = compare(current, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+        for line in report:
+            print(f"[bench] {line}", file=sys.stderr)
+        regressions = sum("REGRESSION" in line for line in report)
+
+    text = json.dumps(current, indent=2, ensure_ascii=False)
+    if args.out:
+        args.out.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    _cli()
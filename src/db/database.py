@@ -1,9 +1,12 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from dotenv import load_dotenv
 
 import os
+import threading
+from typing import Dict, Optional, Tuple
 
 load_dotenv()
 
@@ -11,10 +14,89 @@ Base = declarative_base()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL, echo=True, future=True)
+# настройки берутся из окружения, чтобы их видели и дочерние процессы
+ECHO_ENV = "DB_ECHO"                    # 1 — SQL в лог, debug — ещё и строки результата; по умолчанию выкл.
+POOL_SIZE_ENV = "DB_POOL_SIZE"
+MAX_OVERFLOW_ENV = "DB_MAX_OVERFLOW"
+POOL_RECYCLE_ENV = "DB_POOL_RECYCLE"    # секунды; pooler Neon рвёт простаивающие соединения
+DEFAULT_POOL_SIZE = 5
+DEFAULT_MAX_OVERFLOW = 10
+DEFAULT_POOL_RECYCLE = 300
 
-SessionLocal = sessionmaker(
-    bind=engine,
-    autocommit=False,
-    autoflush=False,
-)
\ No newline at end of file
+# один engine на (процесс, URL): пул соединений нельзя делить между fork'ами
+_engines: Dict[Tuple[int, str], Engine] = {}
+_factories: Dict[Tuple[int, str], sessionmaker] = {}
+_lock = threading.Lock()
+
+
+def _echo():
+    value = os.getenv(ECHO_ENV, "").strip().lower()
+    if value == "debug":
+        return "debug"
+    return value in ("1", "true", "yes")
+
+
+def _make_engine(url: str) -> Engine:
+    kwargs = dict(echo=_echo(), future=True, pool_pre_ping=True)
+    if not url.startswith("sqlite"):
+        # у SQLite свой пул (SingletonThreadPool / QueuePool на файл) — размеры не задаём
+        kwargs.update(
+            pool_size=int(os.getenv(POOL_SIZE_ENV, DEFAULT_POOL_SIZE)),
+            max_overflow=int(os.getenv(MAX_OVERFLOW_ENV, DEFAULT_MAX_OVERFLOW)),
+            pool_recycle=int(os.getenv(POOL_RECYCLE_ENV, DEFAULT_POOL_RECYCLE)),
+        )
+    return create_engine(url, **kwargs)
+
+
+def get_engine(url: Optional[str] = None) -> Engine:
+    """
+    Engine текущего процесса для `url` (по умолчанию DATABASE_URL).
+    Создаётся при первом обращении; после fork дочерний процесс
+    получает свой engine, соединения родителя не трогаются.
+    """
+    url = url or DATABASE_URL
+    if not url:
+        raise RuntimeError("не задан DATABASE_URL")
+    key = (os.getpid(), url)
+    with _lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _engines[key] = _make_engine(url)
+    return engine
+
+
+def get_session_factory(url: Optional[str] = None) -> sessionmaker:
+    """sessionmaker поверх get_engine(url) — тоже один на процесс."""
+    engine = get_engine(url)
+    key = (os.getpid(), url or DATABASE_URL)
+    with _lock:
+        factory = _factories.get(key)
+        if factory is None:
+            factory = _factories[key] = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    return factory
+
+
+def after_fork() -> None:
+    """
+    Для initializer'а пула процессов: забыть engine'ы родителя, не
+    закрывая их соединения (они принадлежат родителю).
+    """
+    pid = os.getpid()
+    with _lock:
+        for key in [k for k in _engines if k[0] != pid]:
+            _engines.pop(key).dispose(close=False)
+        for key in [k for k in _factories if k[0] != pid]:
+            del _factories[key]
+
+
+class _SessionLocal:
+    """
+    Совместимость со старым `SessionLocal = sessionmaker(...)`:
+    SessionLocal() — сессия на engine текущего процесса.
+    """
+
+    def __call__(self, **kwargs):
+        return get_session_factory()(**kwargs)
+
+
+SessionLocal = _SessionLocal()
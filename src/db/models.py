@@ -1,6 +1,6 @@
 from datetime import datetime
 from sqlalchemy import (
-    Integer, String, Float, TIMESTAMP, func, Computed
+    Integer, String, Float, TIMESTAMP, func, Computed, Index, PrimaryKeyConstraint
 )
 from sqlalchemy.orm import Mapped, mapped_column
 from src.db.database import Base
@@ -18,27 +18,29 @@ class Wallet(Base):
     sol_balance: Mapped[float] = mapped_column(Float, nullable=False)
     pnl:         Mapped[float] = mapped_column(Float, nullable=False)
 
-    rockets:       Mapped[int]  = mapped_column(Integer, nullable=False, default=0)
+    rockets:       Mapped[int]  = mapped_column(Integer, nullable=False, default=0, index=True)
     trade_counts:  Mapped[int]  = mapped_column(Integer, nullable=False, default=0)
     profit_trades: Mapped[int]  = mapped_column(Integer, nullable=False, default=0)
     good_profit:   Mapped[int]= mapped_column(Integer,  nullable=False, default=0)
 
     profit_ratio:  Mapped[float] = mapped_column(
         Float,
-        Computed("COALESCE(profit_trades::float / NULLIF(trade_counts,0), 0)", persisted=True),
+        Computed("COALESCE(CAST(profit_trades AS FLOAT) / NULLIF(trade_counts,0), 0)", persisted=True),
         nullable=True,
+        index=True,
     )
 
     good_ratio:    Mapped[float] = mapped_column(
         Float,
-        Computed("COALESCE(good_profit::float  / NULLIF(trade_counts,0), 0)", persisted=True),
+        Computed("COALESCE(CAST(good_profit AS FLOAT) / NULLIF(trade_counts,0), 0)", persisted=True),
         nullable=True,
+        index=True,
     )
 
 
     fast_trades:   Mapped[float | None] = mapped_column(Float,  nullable=False, default=0)
     median:        Mapped[float] = mapped_column(Float, nullable=False, default=0)
-    lable:         Mapped[str] = mapped_column(String, nullable=True)
+    lable:         Mapped[str] = mapped_column(String, nullable=True, index=True)
 
 
     checked_count: Mapped[int]  = mapped_column(Integer, default=0)
@@ -46,4 +48,34 @@ class Wallet(Base):
         TIMESTAMP(timezone=True),
         server_default=func.now(),
         onupdate=func.now(),
+        index=True,
     )
+
+
+class WalletSnapshot(Base):
+    """
+    История метрик кошелька: строка добавляется, только когда метрики
+    изменились с прошлого снимка (см. src.db.snapshots).  В Postgres
+    таблица секционирована по captured_at (RANGE, по месяцам), поэтому
+    ключ включает время.
+    """
+    __tablename__ = "wallet_snapshots"
+    __table_args__ = (
+        PrimaryKeyConstraint("address", "captured_at"),
+        Index("ix_wallet_snapshots_captured_at", "captured_at"),
+        {"postgresql_partition_by": "RANGE (captured_at)"},
+    )
+
+    address:     Mapped[str]      = mapped_column(String, nullable=False)
+    captured_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False)
+
+    winrate:       Mapped[float | None] = mapped_column(Float)
+    sol_balance:   Mapped[float | None] = mapped_column(Float)
+    pnl:           Mapped[float | None] = mapped_column(Float)
+    rockets:       Mapped[int | None]   = mapped_column(Integer)
+    trade_counts:  Mapped[int | None]   = mapped_column(Integer)
+    profit_trades: Mapped[int | None]   = mapped_column(Integer)
+    good_profit:   Mapped[int | None]   = mapped_column(Integer)
+    fast_trades:   Mapped[float | None] = mapped_column(Float)
+    median:        Mapped[float | None] = mapped_column(Float)
+    lable:         Mapped[str | None]   = mapped_column(String)
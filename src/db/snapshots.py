@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy import func, insert, select, text
+
+from src.db.models import Wallet, WalletSnapshot
+
+# История метрик: после записи в wallets текущие значения сравниваются
+# с последним снимком адреса, и в wallet_snapshots добавляются только
+# изменившиеся — пачкой, одним INSERT.  По истории считается, насколько
+# «шумные» метрики у кошелька и как давно они не менялись.
+
+METRICS = (
+    "winrate", "sol_balance", "pnl", "rockets", "trade_counts",
+    "profit_trades", "good_profit", "fast_trades", "median", "lable",
+)
+NUMERIC_METRICS = METRICS[:-1]
+
+IN_CHUNK = 5000   # адресов в одном IN (...), как в filter_fresh
+
+ENABLED_ENV = "DB_SNAPSHOTS"      # 0 — не вести историю (например, до миграции)
+
+DEFAULT_PARTITION = "wallet_snapshots_default"
+_ENSURED: Set[Tuple[int, str, datetime]] = set()    # (pid, база, месяц) — секции уже проверены
+
+
+def enabled() -> bool:
+    return os.getenv(ENABLED_ENV, "1").strip().lower() not in ("0", "false", "no")
+
+
+def record_changes_safe(session_factory: Callable, addresses: Iterable[str]) -> int:
+    """record_changes для путей записи: ошибка истории не ломает запись в wallets."""
+    if not enabled():
+        return 0
+    try:
+        return record_changes(session_factory, addresses)
+    except Exception as e:
+        print(f"[snapshots] история не записана: {str(e).splitlines()[0]}")
+        return 0
+
+
+# ---------- секции Postgres ----------------------------------------------
+def _month_start(dt: datetime) -> datetime:
+    return dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(dt: datetime) -> datetime:
+    return (dt.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _bound(dt: datetime) -> str:
+    return f"'{dt:%Y-%m-%d} 00:00:00+00'"
+
+
+def _exists(session, name: str) -> bool:
+    return session.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+
+
+def _create_partition(session, start: datetime) -> bool:
+    """
+    Секция месяца `start`.  Если строки этого месяца уже лежат в
+    wallet_snapshots_default, Postgres не даст создать секцию поверх
+    них: default отсоединяется, строки переносятся в новую секцию,
+    default подсоединяется обратно.  True — секция создана.
+    """
+    name, end = f"wallet_snapshots_{start:%Y_%m}", _next_month(start)
+    if _exists(session, name):
+        return False
+    bounds = f"captured_at >= {_bound(start)} AND captured_at < {_bound(end)}"
+    create = f"CREATE TABLE {name} PARTITION OF wallet_snapshots FOR VALUES FROM ({_bound(start)}) TO ({_bound(end)})"
+    has_rows = _exists(session, DEFAULT_PARTITION) and session.execute(
+        text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {bounds})")
+    ).scalar()
+    if not has_rows:
+        session.execute(text(create))
+        return True
+
+    session.execute(text(f"ALTER TABLE wallet_snapshots DETACH PARTITION {DEFAULT_PARTITION}"))
+    session.execute(text(create))
+    moved = session.execute(text(f"INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} WHERE {bounds}")).rowcount
+    session.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {bounds}"))
+    session.execute(text(f"ALTER TABLE wallet_snapshots ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+    print(f"[snapshots] {moved} строк перенесены из {DEFAULT_PARTITION} в {name}")
+    return True
+
+
+def ensure_partitions(session_factory: Callable, months_ahead: int = 1) -> None:
+    """
+    Месячные секции wallet_snapshots на текущий и `months_ahead`
+    следующих месяцев, а также на месяцы, чьи строки уже попали в
+    wallet_snapshots_default (Postgres; для SQLite ничего не делает).
+    """
+    with session_factory() as session:
+        if session.get_bind().dialect.name != "postgresql":
+            return
+        # воркеры стартуют одновременно — секции создаёт кто-то один
+        session.execute(text("SELECT pg_advisory_xact_lock(hashtext('wallet_snapshots_partitions'))"))
+        months = set()
+        start = _month_start(datetime.now(timezone.utc))
+        for _ in range(months_ahead + 1):
+            months.add(start)
+            start = _next_month(start)
+        if _exists(session, DEFAULT_PARTITION):
+            stray = session.scalars(text(
+                f"SELECT DISTINCT date_trunc('month', captured_at AT TIME ZONE 'UTC') FROM {DEFAULT_PARTITION}"
+            ))
+            months.update(m.replace(tzinfo=timezone.utc) for m in stray)
+        for month in sorted(months):
+            _create_partition(session, month)
+        session.commit()
+
+
+def _ensure_once(session_factory: Callable, session) -> None:
+    """ensure_partitions один раз на процесс, базу и месяц — перед записью снимков."""
+    bind = session.get_bind()
+    if bind.dialect.name != "postgresql":
+        return
+    key = (os.getpid(), bind.url.render_as_string(), _month_start(datetime.now(timezone.utc)))
+    if key in _ENSURED:
+        return
+    _ENSURED.add(key)       # и при ошибке: повторять на каждом сбросе бессмысленно, строки уйдут в default
+    try:
+        ensure_partitions(session_factory)
+    except Exception as e:
+        print(f"[snapshots] секции wallet_snapshots не созданы: {str(e).splitlines()[0]}")
+
+
+# ---------- запись изменений ---------------------------------------------
+def _chunks(items: List[str]) -> Iterable[List[str]]:
+    for i in range(0, len(items), IN_CHUNK):
+        yield items[i : i + IN_CHUNK]
+
+
+def _current(session, addresses: List[str]) -> Dict[str, Tuple]:
+    cols = [Wallet.__table__.c[m] for m in METRICS]
+    out: Dict[str, Tuple] = {}
+    for chunk in _chunks(addresses):
+        for row in session.execute(select(Wallet.address, *cols).where(Wallet.address.in_(chunk))):
+            out[row[0]] = tuple(row[1:])
+    return out
+
+
+def _latest(session, addresses: List[str]) -> Dict[str, Tuple]:
+    """Последний снимок каждого адреса — один запрос на пачку адресов."""
+    cols = [WalletSnapshot.__table__.c[m] for m in METRICS]
+    out: Dict[str, Tuple] = {}
+    for chunk in _chunks(addresses):
+        last = (
+            select(WalletSnapshot.address, func.max(WalletSnapshot.captured_at).label("captured_at"))
+            .where(WalletSnapshot.address.in_(chunk))
+            .group_by(WalletSnapshot.address)
+            .subquery()
+        )
+        stmt = select(WalletSnapshot.address, *cols).join(
+            last,
+            (WalletSnapshot.address == last.c.address) & (WalletSnapshot.captured_at == last.c.captured_at),
+        )
+        for row in session.execute(stmt):
+            out[row[0]] = tuple(row[1:])
+    return out
+
+
+def record_changes(session_factory: Callable, addresses: Iterable[str]) -> int:
+    """
+    Снимает текущие метрики `addresses` из wallets и добавляет снимок
+    для тех, у кого они отличаются от последнего (или снимков ещё нет).
+    Возвращает число добавленных строк.
+    """
+    addresses = list(dict.fromkeys(addresses))
+    if not addresses:
+        return 0
+    session = session_factory()
+    try:
+        _ensure_once(session_factory, session)
+        current = _current(session, addresses)
+        latest = _latest(session, list(current))
+        rows = [
+            {"address": a, **dict(zip(METRICS, values))}
+            for a, values in current.items()
+            if latest.get(a) != values
+        ]
+        if rows:
+            # время БД, как у wallets.last_updated, — stable_addresses сравнивает их между собой;
+            # у SQLite CURRENT_TIMESTAMP с точностью до секунды, там берём время клиента
+            stmt = insert(WalletSnapshot)
+            if session.get_bind().dialect.name == "postgresql":
+                stmt = stmt.values(captured_at=func.now())
+            else:
+                now = datetime.now(timezone.utc)
+                rows = [{**row, "captured_at": now} for row in rows]
+            session.execute(stmt, rows)
+        session.commit()
+        return len(rows)
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+# ---------- волатильность ------------------------------------------------
+def metric_volatility(
+    session_factory: Callable,
+    addresses: Optional[Sequence[str]] = None,
+    since_days: Optional[float] = None,
+    metrics: Sequence[str] = NUMERIC_METRICS,
+) -> Dict[str, dict]:
+    """
+    По истории снимков для каждого адреса:
+        snapshots    — сколько раз метрики менялись (число снимков);
+        last_change  — время последнего изменения;
+        flat_hours   — сколько часов метрики не менялись;
+        std / cv     — стандартное отклонение и коэффициент вариации
+                       (std / |mean|) каждой метрики из `metrics`.
+    Строки читаются потоком, статистика — по сегментам в NumPy.
+    """
+    cols = [WalletSnapshot.__table__.c[m] for m in metrics]
+    stmt = select(WalletSnapshot.address, WalletSnapshot.captured_at, *cols).order_by(
+        WalletSnapshot.address, WalletSnapshot.captured_at
+    )
+    if addresses is not None:
+        stmt = stmt.where(WalletSnapshot.address.in_(list(addresses)))
+    if since_days is not None:
+        stmt = stmt.where(WalletSnapshot.captured_at >= datetime.now(timezone.utc) - timedelta(days=since_days))
+
+    names: List[str] = []
+    last_times: List[datetime] = []
+    counts: List[int] = []
+    values: List[Tuple] = []
+    with session_factory() as session:
+        for row in session.execute(stmt, execution_options={"yield_per": 1000}):
+            if not names or names[-1] != row[0]:
+                names.append(row[0])
+                counts.append(0)
+                last_times.append(row[1])
+            counts[-1] += 1
+            last_times[-1] = row[1]
+            values.append(tuple(np.nan if v is None else float(v) for v in row[2:]))
+
+    if not names:
+        return {}
+    data = np.asarray(values, dtype=float).reshape(len(values), len(metrics))
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    n = np.asarray(counts, dtype=float)[:, None]
+
+    # суммы по сегментам без цикла по адресам
+    filled = np.nan_to_num(data)
+    sums = np.add.reduceat(filled, offsets[:-1], axis=0)
+    squares = np.add.reduceat(filled ** 2, offsets[:-1], axis=0)
+    mean = sums / n
+    std = np.sqrt(np.clip(squares / n - mean ** 2, 0, None))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cv = np.where(np.abs(mean) > 0, std / np.abs(mean), 0.0)
+
+    now = datetime.now(timezone.utc)
+    result: Dict[str, dict] = {}
+    for i, address in enumerate(names):
+        last = last_times[i]
+        if last.tzinfo is None:                 # SQLite отдаёт время без зоны
+            last = last.replace(tzinfo=timezone.utc)
+        result[address] = {
+            "snapshots": counts[i],
+            "last_change": last,
+            "flat_hours": (now - last).total_seconds() / 3600,
+            "std": dict(zip(metrics, std[i].round(6).tolist())),
+            "cv": dict(zip(metrics, cv[i].round(6).tolist())),
+        }
+    return result
+
+
+def stable_addresses(
+    session_factory: Callable, addresses: Sequence[str], flat_hours: float, recheck_hours: float
+) -> Set[str]:
+    """
+    Адреса, чьи метрики не менялись дольше `flat_hours` часов, хотя
+    кошелёк перепроверялся после последнего изменения (wallets.last_updated
+    позже последнего снимка) — их можно проверять реже.
+
+    Реже, но не никогда: кошелёк, не проверявшийся дольше `recheck_hours`
+    часов, в результат не попадает — иначе пропуск не даёт сдвинуться
+    last_updated, и кошелёк выглядит «стабильным» всё дольше.
+    """
+    if flat_hours <= 0 or recheck_hours <= 0 or not addresses:
+        return set()
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(hours=flat_hours)
+    recheck_since = now - timedelta(hours=recheck_hours)
+    stable: Set[str] = set()
+    with session_factory() as session:
+        for chunk in _chunks(list(addresses)):
+            last = (
+                select(WalletSnapshot.address, func.max(WalletSnapshot.captured_at).label("changed"))
+                .where(WalletSnapshot.address.in_(chunk))
+                .group_by(WalletSnapshot.address)
+                .subquery()
+            )
+            stmt = (
+                select(last.c.address)
+                .join(Wallet, Wallet.address == last.c.address)
+                .where(
+                    last.c.changed < cutoff,
+                    Wallet.last_updated > last.c.changed,
+                    Wallet.last_updated >= recheck_since,
+                )
+            )
+            stable.update(session.scalars(stmt))
+    return stable
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from typing import Callable, Dict, Iterable, List
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+
+from src.db.models import Wallet
+from src.db.snapshots import record_changes_safe
+
+# Пакетная запись кошельков: INSERT ... ON CONFLICT (address) DO UPDATE
+# на сотни строк за один запрос вместо SELECT + UPDATE + COMMIT на кошелёк.
+# profit_ratio / good_ratio — вычисляемые колонки, их считает сама БД.
+
+BATCH_SIZE = 500
+
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+ACTIVITY_FIELDS = ("rockets", "trade_counts", "profit_trades", "good_profit", "fast_trades", "median", "lable")
+
+
+# ---------- строки ---------------------------------------------------------
+def wallet_row(address: str, winrate: float, sol_balance: float, pnl: float) -> dict:
+    """Базовые метрики gmgn — с теми же округлениями, что и add_wallet."""
+    return {
+        "address": address,
+        "winrate": int(winrate * 100),
+        "sol_balance": int(sol_balance),
+        "pnl": int(pnl),
+    }
+
+
+def activity_row(
+    address: str,
+    rockets: int,
+    trade_counts: int,
+    profit_trades: int,
+    good_profit: int,
+    fast_trades: float,
+    median: float,
+    label: str,
+) -> dict:
+    """Метрики таблицы активности (как add_may_good)."""
+    return {
+        "address": address,
+        "rockets": rockets,
+        "trade_counts": trade_counts,
+        "profit_trades": profit_trades,
+        "good_profit": good_profit,
+        "fast_trades": fast_trades,
+        "median": float(median),
+        "lable": label,
+    }
+
+
+# ---------- запись ---------------------------------------------------------
+def _batches(rows: List[dict], size: int) -> Iterable[List[dict]]:
+    for i in range(0, len(rows), size):
+        yield rows[i : i + size]
+
+
+def _upsert(session_factory, rows: List[dict], updates: Callable, batch_size: int, snapshot: bool) -> int:
+    """
+    Один многострочный INSERT ... ON CONFLICT (address) DO UPDATE на пачку,
+    все пачки — в одной транзакции.  `updates(excluded)` → словарь SET.
+    При ошибке — rollback и исключение (решает вызывающий).
+    snapshot — после commit дописать изменившиеся метрики в wallet_snapshots.
+    """
+    session = session_factory()
+    try:
+        dialect = session.get_bind().dialect.name
+        if dialect not in _INSERTS:
+            raise NotImplementedError(f"upsert не поддерживается для {dialect}")
+        for batch in _batches(rows, batch_size):
+            stmt = _INSERTS[dialect](Wallet).values(batch)
+            stmt = stmt.on_conflict_do_update(index_elements=[Wallet.address], set_=updates(stmt.excluded))
+            session.execute(stmt)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+    if snapshot:
+        record_changes_safe(session_factory, [row["address"] for row in rows])
+    return len(rows)
+
+
+def _coalesce(rows: Iterable[dict]) -> Dict[str, dict]:
+    """
+    Один адрес — одна строка запроса (ON CONFLICT не обновляет строку
+    дважды за оператор): побеждают последние значения, повторы
+    копятся в checked_count.
+    """
+    merged: Dict[str, dict] = {}
+    for row in rows:
+        prev = merged.get(row["address"])
+        count = (prev["checked_count"] if prev else 0) + 1
+        merged[row["address"]] = {**(prev or {}), **row, "checked_count": count}
+    return merged
+
+
+def upsert_wallets(
+    session_factory, rows: Iterable[dict], batch_size: int = BATCH_SIZE, snapshot: bool = True
+) -> int:
+    """
+    Строки wallet_row пачками по `batch_size`: новые кошельки вставляются
+    с checked_count = числу повторов, у существующих checked_count
+    увеличивается, winrate/sol_balance/pnl перезаписываются.
+    Возвращает число записанных адресов.
+    """
+    return _upsert(
+        session_factory,
+        list(_coalesce(rows).values()),
+        lambda excluded: {
+            "winrate": excluded.winrate,
+            "sol_balance": excluded.sol_balance,
+            "pnl": excluded.pnl,
+            "checked_count": func.coalesce(Wallet.checked_count, 0) + excluded.checked_count,
+            "last_updated": func.now(),
+        },
+        batch_size,
+        snapshot,
+    )
+
+
+def upsert_activity(
+    session_factory, rows: Iterable[dict], batch_size: int = BATCH_SIZE, snapshot: bool = True
+) -> int:
+    """
+    Строки activity_row пачками: метрики активности перезаписываются,
+    checked_count не меняется.  Кошелёк, которого ещё нет в БД,
+    вставляется с нулевыми winrate/sol_balance/pnl (обычно его уже
+    создал upsert_wallets на этапе gmgn).
+    """
+    merged = [
+        {**row, "winrate": 0, "sol_balance": 0, "pnl": 0, "checked_count": 0}
+        for row in {row["address"]: row for row in rows}.values()
+    ]
+    return _upsert(
+        session_factory,
+        merged,
+        lambda excluded: {
+            **{name: getattr(excluded, name) for name in ACTIVITY_FIELDS},
+            "last_updated": func.now(),
+        },
+        batch_size,
+        snapshot,
+    )
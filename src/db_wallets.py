@@ -1,25 +1,187 @@
-from sqlalchemy.orm import Session
-from src.db.database import engine
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+
+from src.db.database import SessionLocal
 from src.db.models import Wallet  # путь к вашему классу Wallet
 
+# Выгрузка кошельков из БД: только нужные колонки, строки идут потоком
+# (server-side cursor через yield_per, для CSV из Postgres — COPY TO STDOUT),
+# поэтому память не растёт с размером таблицы.  Фильтры опираются на
+# индексы из миграции 3c9e1f4a7b21.
+
+FORMATS = ("txt", "csv", "jsonl")
+YIELD_PER = 1000
+COLUMNS = tuple(c.name for c in Wallet.__table__.columns)
+
+
+@dataclass
+class WalletFilter:
+    """Критерии выгрузки; None / пустое — без ограничения."""
+
+    min_rockets: Optional[int] = None
+    labels: Sequence[str] = field(default_factory=tuple)
+    min_profit_ratio: Optional[float] = None
+    min_good_ratio: Optional[float] = None
+    min_winrate: Optional[float] = None          # в процентах, как хранится в БД
+    min_trades: Optional[int] = None
+    updated_within_hours: Optional[float] = None
+
+    def conditions(self) -> list:
+        conds = []
+        if self.min_rockets is not None:
+            conds.append(Wallet.rockets >= self.min_rockets)
+        if self.labels:
+            conds.append(Wallet.lable.in_(list(self.labels)))
+        if self.min_profit_ratio is not None:
+            conds.append(Wallet.profit_ratio >= self.min_profit_ratio)
+        if self.min_good_ratio is not None:
+            conds.append(Wallet.good_ratio >= self.min_good_ratio)
+        if self.min_winrate is not None:
+            conds.append(Wallet.winrate >= self.min_winrate)
+        if self.min_trades is not None:
+            conds.append(Wallet.trade_counts >= self.min_trades)
+        if self.updated_within_hours is not None:
+            since = datetime.now(timezone.utc) - timedelta(hours=self.updated_within_hours)
+            conds.append(Wallet.last_updated >= since)
+        return conds
+
+
+def build_query(filters: WalletFilter, columns: Sequence[str] = ("address",)):
+    unknown = [c for c in columns if c not in COLUMNS]
+    if unknown:
+        raise ValueError(f"неизвестные колонки: {', '.join(unknown)}")
+    return select(*(Wallet.__table__.c[c] for c in columns)).where(*filters.conditions()).order_by(Wallet.id)
+
+
+def iter_wallets(
+    filters: WalletFilter,
+    columns: Sequence[str] = ("address",),
+    session_factory=SessionLocal,
+    batch: int = YIELD_PER,
+) -> Iterator[Tuple]:
+    """Кортежи значений `columns` по `batch` строк за раз (server-side cursor)."""
+    with session_factory() as session:
+        result = session.execute(build_query(filters, columns), execution_options={"yield_per": batch})
+        for row in result:
+            yield tuple(row)
+
+
+# ---------- форматы -------------------------------------------------------
+def _write_rows(rows: Iterator[Tuple], columns: Sequence[str], fmt: str, f) -> int:
+    n = 0
+    if fmt == "csv":
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for n, row in enumerate(rows, 1):
+            writer.writerow(row)
+    elif fmt == "jsonl":
+        for n, row in enumerate(rows, 1):
+            f.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str) + "\n")
+    else:
+        # txt: как раньше — адрес на строку; несколько колонок — через табуляцию
+        for n, row in enumerate(rows, 1):
+            f.write("\t".join("" if v is None else str(v) for v in row) + "\n")
+    return n
+
+
+def _copy_csv(session_factory, filters: WalletFilter, columns: Sequence[str], f) -> Optional[int]:
+    """
+    CSV средствами Postgres: COPY (SELECT ...) TO STDOUT, без Python на
+    каждую строку.  None — не Postgres / драйвер без copy_expert /
+    запрос не удалось отрендерить с литералами.
+    """
+    with session_factory() as session:
+        engine = session.get_bind()
+    if engine.dialect.name != "postgresql":
+        return None
+    try:
+        sql = build_query(filters, columns).compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+    except Exception:
+        return None
+
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        if not hasattr(cursor, "copy_expert"):          # не psycopg2
+            return None
+        cursor.copy_expert(f"COPY ({sql}) TO STDOUT WITH CSV HEADER", f)
+        return cursor.rowcount
+    finally:
+        raw.close()
+
+
+def export_wallets(
+    outfile: Path,
+    filters: Optional[WalletFilter] = None,
+    columns: Sequence[str] = ("address",),
+    fmt: Optional[str] = None,
+    session_factory=SessionLocal,
+    use_copy: bool = True,
+) -> int:
+    """
+    Выгружает кошельки под `filters` в `outfile`.  Формат — по `fmt`
+    или расширению файла (.csv / .jsonl, иначе txt).  Возвращает число строк.
+    """
+    filters = filters or WalletFilter()
+    outfile = Path(outfile)
+    fmt = fmt or (outfile.suffix.lstrip(".") if outfile.suffix.lstrip(".") in FORMATS else "txt")
+    if fmt not in FORMATS:
+        raise ValueError(f"формат {fmt}: ожидается одно из {', '.join(FORMATS)}")
+
+    with open(outfile, "w", encoding="utf-8", newline="") as f:
+        n = _copy_csv(session_factory, filters, columns, f) if fmt == "csv" and use_copy else None
+        if n is None:
+            f.seek(0)
+            f.truncate()
+            n = _write_rows(iter_wallets(filters, columns, session_factory), columns, fmt, f)
+
+    print(f"Экспортировано {n} кошельков в файл {outfile}")
+    return n
+
+
 def export_wallets_with_rockets(min_rockets: int = 2, outfile: str = "db_wallets.txt"):
-    # создаём сессию
-    with Session(engine) as session:
-        # формируем запрос: все кошельки, у которых rockets >= min_rockets
-        wallets = (
-            session
-            .query(Wallet)
-            .filter(Wallet.rockets >= min_rockets)
-            .all()
-        )
-
-    # записываем в файл
-    with open(outfile, "w", encoding="utf-8") as f:
-        for w in wallets:
-            # здесь записываем, что нужно: например, только адрес
-            f.write(f"{w.address}\n")
-
-    print(f"Экспортировано {len(wallets)} кошельков с rockets >= {min_rockets} в файл {outfile}")
+    """Прежний вызов: адреса кошельков с rockets >= min_rockets."""
+    return export_wallets(Path(outfile), WalletFilter(min_rockets=min_rockets), fmt="txt")
+
+
+def _cli() -> None:
+    parser = argparse.ArgumentParser(description="Выгрузка кошельков из БД")
+    parser.add_argument("outfile", type=Path, nargs="?", default=Path("db_wallets.txt"))
+    parser.add_argument("--format", choices=FORMATS, help="по умолчанию — по расширению файла")
+    parser.add_argument("--columns", default="address", help=f"через запятую: {', '.join(COLUMNS)}")
+    parser.add_argument("--min-rockets", type=int)
+    parser.add_argument("--label", action="append", default=[], help="DAILY / NORMAL / RARE (можно несколько)")
+    parser.add_argument("--min-profit-ratio", type=float)
+    parser.add_argument("--min-good-ratio", type=float)
+    parser.add_argument("--min-winrate", type=float, help="в процентах")
+    parser.add_argument("--min-trades", type=int)
+    parser.add_argument("--updated-within", type=float, metavar="HOURS")
+    parser.add_argument("--no-copy", action="store_true", help="не использовать COPY для CSV")
+    args = parser.parse_args()
+
+    filters = WalletFilter(
+        min_rockets=args.min_rockets,
+        labels=args.label,
+        min_profit_ratio=args.min_profit_ratio,
+        min_good_ratio=args.min_good_ratio,
+        min_winrate=args.min_winrate,
+        min_trades=args.min_trades,
+        updated_within_hours=args.updated_within,
+    )
+    if not any(v not in (None, []) for v in vars(filters).values()):
+        filters.min_rockets = 2                       # прежнее поведение скрипта
+    columns: List[str] = [c.strip() for c in args.columns.split(",") if c.strip()]
+    export_wallets(args.outfile, filters, columns, args.format, use_copy=not args.no_copy)
+
 
 if __name__ == "__main__":
-    export_wallets_with_rockets()
+    _cli()
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+# снимки страниц активности gmgn: сырой текст ячеек (или JSON из CDP),
+# по одному файлу на кошелёк — чтобы считать метрики отдельно от браузера
+# и пересчитывать старые прогоны по новым правилам без повторного скрапинга
+SNAPSHOT_DIR_NAME = "activity_snapshots"
+
+SOURCE_DOM = "dom"     # снимок dom_extract.activity_rows
+SOURCE_CDP = "cdp"     # ответы XHR, пойманные cdp_capture.capture_json
+
+
+def snapshot_path(snapshot_dir: Path, address: str) -> Path:
+    return Path(snapshot_dir) / f"{address}.json"
+
+
+def save_snapshot(
+    snapshot_dir: Path,
+    item: dict,
+    table: Optional[dict] = None,
+    payloads: Optional[List[dict]] = None,
+) -> Path:
+    """
+    Пишет снимок атомарно (tmp + rename): недописанный файл после падения
+    не примут за готовый.  `item` — исходная строка results.txt.
+    """
+    address = item["Wallet Address"]
+    snapshot = {
+        "address": address,
+        "captured_at": time.time(),
+        "item": item,
+        "source": SOURCE_CDP if payloads is not None else SOURCE_DOM,
+        "data": payloads if payloads is not None else table,
+    }
+    path = snapshot_path(snapshot_dir, address)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".tmp{os.getpid()}")
+    tmp.write_text(json.dumps(snapshot, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+def load_snapshot(path: Path) -> dict:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def iter_snapshots(root: Path) -> Iterator[Path]:
+    """Все снимки под `root` — каталог снимков, run-каталог или data/runs целиком."""
+    root = Path(root)
+    if root.is_file():
+        yield root
+        return
+    dirs = [root] if root.name == SNAPSHOT_DIR_NAME else sorted(root.rglob(SNAPSHOT_DIR_NAME))
+    for snapshot_dir in dirs:
+        yield from sorted(snapshot_dir.glob("*.json"))
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlparse
+
+import aiohttp
+from yarl import URL
+
+from src.dexscraper.browser_pool import BrowserPool, borrow
+from src.dexscraper.gmgn_http import (
+    API_URL,
+    CHALLENGE_MARKERS,
+    CHALLENGE_URL,
+    CLEARANCE_TTL,
+    Clearance,
+    harvest_clearance,
+)
+
+
+# host → (запросов в секунду, размер burst); DexScreener сюда не ходит — его страницы грузит браузер
+RATE_LIMITS: Dict[str, Tuple[float, int]] = {
+    "gmgn.ai": (8.0, 16),
+}
+DEFAULT_RATE_LIMIT: Tuple[float, int] = (2.0, 4)
+
+
+# ---------- token bucket ----------------------------------------------
+class TokenBucket:
+    """
+    Token bucket с адаптивной скоростью: 429/челлендж делят rate пополам
+    (не ниже min_rate), каждый успешный ответ понемногу возвращает его
+    к исходному значению.
+    """
+
+    def __init__(self, rate: float, capacity: int, min_rate: float = 0.25) -> None:
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        # под блокировкой только резервируем токен (баланс может уйти в минус)
+        # и считаем ожидание; спим уже без неё, не задерживая остальных
+        async with self._lock:
+            self._refill()
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def penalize(self) -> None:
+        self._refill()
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = min(self.tokens, 0.0)   # долг уже ждущих запросов не прощаем
+
+    def reward(self) -> None:
+        self._refill()
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class HostLimiter:
+    """Отдельный TokenBucket на каждый host (поддомены → родительский host)."""
+
+    def __init__(self, limits: Dict[str, Tuple[float, int]] = RATE_LIMITS) -> None:
+        self.limits = dict(limits)
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlparse(url).hostname or ""
+        key = next((h for h in self.limits if host == h or host.endswith("." + h)), host)
+        if key not in self._buckets:
+            rate, burst = self.limits.get(key, DEFAULT_RATE_LIMIT)
+            self._buckets[key] = TokenBucket(rate, burst)
+        return self._buckets[key]
+
+    def rates(self) -> Dict[str, float]:
+        return {host: round(b.rate, 2) for host, b in self._buckets.items()}
+
+
+# ---------- движок ----------------------------------------------------
+class AsyncWalletEvaluator:
+    """
+    Сотни одновременных запросов walletNew из одного процесса.
+    Капча решается в UC-браузере (в отдельном потоке, чтобы не блокировать
+    event loop), дальше — aiohttp с общими куками и User-Agent.
+    """
+
+    def __init__(
+        self,
+        pool: Optional[BrowserPool] = None,
+        concurrency: int = 200,
+        limiter: Optional[HostLimiter] = None,
+        timeout: float = 15.0,
+        clearance_ttl: float = CLEARANCE_TTL,
+    ) -> None:
+        self.pool = pool
+        self.concurrency = concurrency
+        self.limiter = limiter or HostLimiter()
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.clearance_ttl = clearance_ttl
+
+        self._clearance = Clearance()
+        self._refresh_lock: Optional[asyncio.Lock] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.solves = 0
+
+    async def __aenter__(self) -> "AsyncWalletEvaluator":
+        self._refresh_lock = asyncio.Lock()
+        connector = aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        await self.refresh()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+    # ---------- clearance ----------------------------------------------
+    async def refresh(self, force: bool = False) -> None:
+        stale = self._clearance
+        async with self._refresh_lock:
+            if self._clearance is not stale and not self._clearance.expired:
+                return
+            if not force and not self._clearance.expired:
+                return
+
+            loop = asyncio.get_running_loop()
+            self._clearance = await loop.run_in_executor(None, self._solve)
+            self._session.cookie_jar.clear()
+            for c in self._clearance.cookies:
+                self._session.cookie_jar.update_cookies(
+                    {c["name"]: c["value"]}, response_url=URL(CHALLENGE_URL)
+                )
+            self.solves += 1
+            print(f"[async_evaluator] clearance обновлён (#{self.solves})")
+
+    def _solve(self) -> Clearance:
+        with borrow(self.pool) as driver:
+            return harvest_clearance(driver, ttl=self.clearance_ttl)
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "User-Agent": self._clearance.user_agent,
+            "Accept": "application/json, text/plain, */*",
+            "Referer": CHALLENGE_URL,
+        }
+
+    # ---------- запросы ------------------------------------------------
+    async def fetch_wallet(self, wallet_address: str, period: str) -> dict | None:
+        url = f"{API_URL}{wallet_address}?period={period}"
+        bucket = self.limiter.bucket(url)
+
+        for _ in range(4):
+            if self._clearance.expired:
+                await self.refresh()
+            await bucket.acquire()
+            try:
+                async with self._session.get(url, headers=self._headers()) as resp:
+                    if resp.status == 429:
+                        bucket.penalize()
+                        continue
+                    if resp.headers.get("cf-mitigated") == "challenge" or resp.status in (403, 503):
+                        text = await resp.text()
+                        if resp.headers.get("cf-mitigated") == "challenge" or any(
+                            m in text for m in CHALLENGE_MARKERS
+                        ):
+                            bucket.penalize()
+                            await self.refresh(force=True)
+                            continue
+                    if resp.status != 200:
+                        print(f"[async_evaluator] {wallet_address}: HTTP {resp.status}")
+                        return None
+                    data = await resp.json(content_type=None)
+                    bucket.reward()
+                    return data
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                print(f"[async_evaluator] {wallet_address}: {e!r}")
+
+        print(f"ERROR WHILE FETCHING DATA: {wallet_address}")
+        return None
+
+    async def evaluate(
+        self,
+        wallet_addresses: Iterable[str],
+        period: str,
+        on_result: Callable[[str, dict | None], None],
+    ) -> int:
+        """
+        Запрашивает все кошельки (не больше `concurrency` одновременно) и
+        вызывает `on_result(address, data)` в пуле потоков — запись в БД
+        не блокирует event loop.  Возвращает число обработанных адресов.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def one(address: str) -> None:
+            async with semaphore:
+                data = await self.fetch_wallet(address, period)
+            await loop.run_in_executor(None, on_result, address, data)
+
+        addresses = list(wallet_addresses)
+        await asyncio.gather(*(one(a) for a in addresses))
+        print(f"[async_evaluator] готово: {len(addresses)} кошельков, rate: {self.limiter.rates()}")
+        return len(addresses)
+
+
+def evaluate_wallets(
+    wallet_addresses: Iterable[str],
+    period: str,
+    on_result: Callable[[str, dict | None], None],
+    pool: Optional[BrowserPool] = None,
+    concurrency: int = 200,
+    rate_limits: Dict[str, Tuple[float, int]] = RATE_LIMITS,
+) -> int:
+    """Синхронная обёртка для вызова из pipeline/wallet_main."""
+
+    async def _run() -> int:
+        async with AsyncWalletEvaluator(
+            pool, concurrency=concurrency, limiter=HostLimiter(rate_limits)
+        ) as evaluator:
+            return await evaluator.evaluate(wallet_addresses, period, on_result)
+
+    return asyncio.run(_run())
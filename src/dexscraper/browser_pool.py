@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Sequence
+
+from seleniumbase import Driver
+from selenium.common.exceptions import WebDriverException
+
+from src.dexscraper.session_manager import SESSIONS
+
+
+# Страницы, которые открываем при старте драйвера, чтобы пройти CF-капчу
+# один раз на весь run, а не на каждом этапе.
+WARMUP_URLS: Sequence[str] = (
+    "https://dexscreener.com/solana",
+    "https://gmgn.ai/",
+)
+
+
+class BrowserPool:
+    """
+    Пул «тёплых» UC-драйверов на один запуск pipeline.
+
+    Драйверы стартуют один раз в `start()`, проходят капчу на WARMUP_URLS
+    и выдаются этапам через `lease()`.  Перед выдачей и после ошибки
+    WebDriver драйвер проверяется и при необходимости перезапускается.
+    Если перезапуск не удался, в очередь возвращается пустой слот (None):
+    новый драйвер для него запустится при следующей выдаче.
+    Пул потокобезопасен, но драйверы нельзя передавать в другие процессы —
+    этапы, работающие с пулом, используют потоки.
+    """
+
+    def __init__(
+        self,
+        size: int = 4,
+        headless: bool = False,
+        warmup_urls: Sequence[str] = WARMUP_URLS,
+        start_delay: float = 4.0,
+        log_cdp: bool = False,
+    ) -> None:
+        self.size = size
+        self.headless = headless
+        self.log_cdp = log_cdp     # performance-лог для перехвата XHR через CDP
+        self.warmup_urls = tuple(warmup_urls)
+        self.start_delay = start_delay
+
+        self._idle: "queue.Queue[Optional[Driver]]" = queue.Queue()
+        self._all: List[Driver] = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self.restarts = 0
+
+    # ---------- жизненный цикл -----------------------------------------
+    def start(self) -> "BrowserPool":
+        for n in range(self.size):
+            driver = self._spawn()
+            self._idle.put(driver)
+            print(f"[browser_pool] драйвер {n + 1}/{self.size} готов")
+            if n + 1 < self.size:
+                time.sleep(self.start_delay)   # «ступенька», чтобы CF реже ругался
+        return self
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+            drivers, self._all = self._all, []
+        for driver in drivers:
+            _safe_quit(driver)
+        print(f"[browser_pool] закрыт, перезапусков за run: {self.restarts}")
+        print(SESSIONS.summary())
+
+    def __enter__(self) -> "BrowserPool":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # ---------- выдача драйверов ---------------------------------------
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None) -> Iterator[Driver]:
+        """
+        Выдаёт свободный драйвер на время блока `with`.
+        Упавший по WebDriverException драйвер заменяется новым.
+        """
+        if self._closed:
+            raise RuntimeError("BrowserPool закрыт")
+
+        driver = self._idle.get(timeout=timeout)
+        try:
+            driver = self._revive(driver)
+        except Exception:
+            self._idle.put(None)          # слот не теряем: попробуем при следующей выдаче
+            raise
+
+        try:
+            yield driver
+        except WebDriverException:
+            driver = self._try_restart(driver)
+            raise
+        finally:
+            self._release(driver)
+
+    def check_all(self) -> int:
+        """Проверяет все свободные драйверы, перезапуская мёртвые.  Возвращает число перезапусков."""
+        restarted = 0
+        for _ in range(self._idle.qsize()):
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if driver is None or not self.is_healthy(driver):
+                driver = self._try_restart(driver)
+                restarted += 1
+            self._idle.put(driver)
+        return restarted
+
+    def _release(self, driver: Optional[Driver]) -> None:
+        if not self._closed:
+            self._idle.put(driver)
+        elif driver is not None:
+            _safe_quit(driver)
+
+    # ---------- здоровье и перезапуск ----------------------------------
+    @staticmethod
+    def is_healthy(driver: Driver) -> bool:
+        try:
+            return bool(driver.window_handles) and driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def _spawn(self) -> Driver:
+        driver = Driver(uc=True, headless=self.headless, log_cdp=self.log_cdp)
+        self._warmup(driver)
+        with self._lock:
+            self._all.append(driver)
+        return driver
+
+    def _warmup(self, driver: Driver) -> None:
+        for url in self.warmup_urls:
+            try:
+                SESSIONS.open(driver, url)
+            except Exception as e:
+                print(f"[browser_pool] прогрев {url} не удался: {e}")
+
+    def _revive(self, driver: Optional[Driver]) -> Driver:
+        """Драйвер, готовый к работе: пустой слот заполняется, мёртвый перезапускается."""
+        if driver is None:
+            return self._spawn()
+        if not self.is_healthy(driver):
+            return self._restart(driver)
+        return driver
+
+    def _try_restart(self, driver: Optional[Driver]) -> Optional[Driver]:
+        """_revive без исключения: None — перезапуск не удался, слот остаётся пустым."""
+        try:
+            return self._restart(driver) if driver is not None else self._spawn()
+        except Exception as e:
+            print(f"[browser_pool] перезапуск не удался: {e}")
+            return None
+
+    def _restart(self, driver: Driver) -> Driver:
+        print("[browser_pool] драйвер не отвечает — перезапуск")
+        with self._lock:
+            if driver in self._all:
+                self._all.remove(driver)
+            self.restarts += 1
+        SESSIONS.forget(driver)
+        _safe_quit(driver)
+        return self._spawn()
+
+
+def _safe_quit(driver: Driver) -> None:
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+@contextmanager
+def borrow(pool: Optional[BrowserPool], headless: bool = False, log_cdp: bool = False) -> Iterator[Driver]:
+    """
+    Драйвер для одного этапа: из пула, если он передан, иначе —
+    «холодный» UC-драйвер, который закрывается по выходу из блока.
+    `log_cdp` для пула задаётся при его создании.
+    """
+    if pool is not None:
+        with pool.lease() as driver:
+            yield driver
+        return
+
+    driver = Driver(uc=True, headless=headless, log_cdp=log_cdp)
+    try:
+        yield driver
+    finally:
+        _safe_quit(driver)
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from src.dexscraper.utils import DATA_DIR
+
+CACHE_PATH = DATA_DIR / "cache" / "gmgn_cache.sqlite"
+TOKEN_CACHE_PATH = DATA_DIR / "cache" / "token_cache.sqlite"
+
+# настройки берутся из окружения, чтобы их видели и дочерние процессы
+TTL_ENV = "DEX_CACHE_TTL_HOURS"        # 0 — кэш выключен
+MAX_MB_ENV = "DEX_CACHE_MAX_MB"
+DEFAULT_TTL_HOURS = 6.0
+DEFAULT_MAX_MB = 512.0
+TOKEN_TTL_ENV = "DEX_TOKEN_TTL_HOURS"  # кэш Top Traders между run'ами; 0 — выключен
+DEFAULT_TOKEN_TTL_HOURS = 4.0
+
+# эндпоинты, которые кэшируем
+WALLET_JSON = "walletNew"
+ACTIVITY = "activity"
+TOP_TRADERS = "top_traders"            # адрес — токен, значение — кошельки из блока Top Traders
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    address  TEXT NOT NULL,
+    period   TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    value    TEXT NOT NULL,
+    size     INTEGER NOT NULL,
+    created  REAL NOT NULL,
+    accessed REAL NOT NULL,
+    PRIMARY KEY (address, period, endpoint)
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE TABLE IF NOT EXISTS counters (
+    name  TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+class ResponseCache:
+    """
+    Локальный кэш ответов (SQLite) с ключом (address, period, endpoint).
+
+    • запись старше `ttl` считается промахом;
+    • при превышении `max_bytes` вытесняются давно не читавшиеся записи (LRU);
+    • счётчики hit/miss лежат в той же базе — их видно из всех процессов.
+    Соединение своё у каждого потока и процесса, объект можно передавать
+    в multiprocessing.
+    """
+
+    def __init__(
+        self,
+        path: Path = CACHE_PATH,
+        ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        evict_every: int = 200,
+    ) -> None:
+        self.path = Path(path)
+        self.ttl = ttl if ttl is not None else float(os.getenv(TTL_ENV, DEFAULT_TTL_HOURS)) * 3600
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            float(os.getenv(MAX_MB_ENV, DEFAULT_MAX_MB)) * 1024 * 1024
+        )
+        self.evict_every = evict_every
+        self._local = threading.local()
+        self._puts = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    # ---------- соединение --------------------------------------------
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state.pop("_local")
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    # ---------- API -----------------------------------------------------
+    def get(self, address: str, period: str, endpoint: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        conn = self._conn()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value FROM entries WHERE address=? AND period=? AND endpoint=? AND created>=?",
+            (address, period, endpoint, now - self.ttl),
+        ).fetchone()
+        if row is None:
+            self._bump("miss")
+            return None
+        conn.execute(
+            "UPDATE entries SET accessed=? WHERE address=? AND period=? AND endpoint=?",
+            (now, address, period, endpoint),
+        )
+        self._bump("hit")
+        return json.loads(row[0])
+
+    def put(self, address: str, period: str, endpoint: str, value: Any) -> None:
+        if not self.enabled or value is None:
+            return
+        payload = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+        now = time.time()
+        self._conn().execute(
+            "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (address, period, endpoint, payload, len(payload), now, now),
+        )
+        self._puts += 1
+        if self._puts % self.evict_every == 0:
+            self.evict()
+
+    def evict(self) -> int:
+        """Удаляет протухшие записи и LRU-хвост сверх max_bytes.  Возвращает число удалённых."""
+        conn = self._conn()
+        removed = conn.execute(
+            "DELETE FROM entries WHERE created < ?", (time.time() - self.ttl,)
+        ).rowcount
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total > self.max_bytes:
+            excess = total - self.max_bytes
+            cutoff = conn.execute(
+                """
+                SELECT accessed FROM (
+                    SELECT accessed, SUM(size) OVER (ORDER BY accessed) AS running
+                    FROM entries
+                ) WHERE running >= ? ORDER BY accessed LIMIT 1
+                """,
+                (excess,),
+            ).fetchone()
+            if cutoff is not None:
+                removed += conn.execute("DELETE FROM entries WHERE accessed <= ?", cutoff).rowcount
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        if not self.enabled:
+            return {"hit": 0, "miss": 0}
+        rows = dict(self._conn().execute("SELECT name, value FROM counters").fetchall())
+        return {"hit": rows.get("hit", 0), "miss": rows.get("miss", 0)}
+
+    def _bump(self, name: str) -> None:
+        self._conn().execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+
+_CACHE: Optional[ResponseCache] = None
+_TOKEN_CACHE: Optional[ResponseCache] = None
+
+
+def get_cache() -> ResponseCache:
+    """Кэш процесса; настройки читаются из окружения при первом вызове."""
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = ResponseCache()
+    return _CACHE
+
+
+def get_token_cache() -> ResponseCache:
+    """
+    Кэш Top Traders процесса: отдельная база со своим TTL и своими
+    счётчиками — hit здесь означает несостоявшуюся загрузку страницы токена.
+    """
+    global _TOKEN_CACHE
+    if _TOKEN_CACHE is None:
+        ttl = float(os.getenv(TOKEN_TTL_ENV, DEFAULT_TOKEN_TTL_HOURS)) * 3600
+        _TOKEN_CACHE = ResponseCache(TOKEN_CACHE_PATH, ttl=ttl)
+    return _TOKEN_CACHE
+
+
+def stats_delta(before: Dict[str, int], after: Dict[str, int], label: str = "cache") -> str:
+    hits = after["hit"] - before["hit"]
+    misses = after["miss"] - before["miss"]
+    total = hits + misses
+    ratio = f"{hits / total * 100:.1f}%" if total else "—"
+    return f"[{label}] hit: {hits}, miss: {misses}, hit rate: {ratio}"
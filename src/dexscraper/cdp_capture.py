@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import json
+import time
+from typing import Dict, List, Optional
+
+from src.dexscraper.scoring import GOOD_PROFIT_PCT, ROCKET_PCT
+
+# XHR, которым страница gmgn.ai/sol/address/<wallet> грузит ленту активности —
+# ту же таблицу, что разбирает DOM-подсчёт.  Ответ /wallet_holdings/ (позиции по
+# токенам, а не события) не ловим: смешивать его с событиями нельзя.
+ACTIVITY_URL_MARKER = "/wallet_activity/sol"
+
+
+def drain_performance_log(driver) -> None:
+    """Очищает буфер performance-лога (get_log забирает и удаляет записи)."""
+    try:
+        driver.get_log("performance")
+    except Exception:
+        pass
+
+
+def capture_json(
+    driver,
+    url_marker: str = ACTIVITY_URL_MARKER,
+    timeout: float = 15.0,
+    poll: float = 0.3,
+) -> List[dict]:
+    """
+    Ждёт первый ответ, чей URL содержит `url_marker`, и забирает его
+    тело через CDP Network.getResponseBody.  Драйвер должен быть создан
+    с log_cdp=True.  Возвращает список из одного распарсенного JSON
+    (пустой, если за `timeout` нужный ответ не пришёл); ответы других
+    XHR страницы не ждём и не читаем.
+    """
+    pending: Dict[str, str] = {}
+    deadline = time.time() + timeout
+
+    while time.time() < deadline:
+        for entry in driver.get_log("performance"):
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+            method, params = message.get("method"), message.get("params", {})
+
+            if method == "Network.responseReceived":
+                url = params.get("response", {}).get("url", "")
+                if url_marker in url:
+                    pending[params["requestId"]] = url
+            elif method == "Network.loadingFinished" and params.get("requestId") in pending:
+                request_id = params["requestId"]
+                pending.pop(request_id)
+                try:
+                    body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+                    return [json.loads(body.get("body", ""))]
+                except Exception as e:
+                    print(f"[cdp_capture] не удалось прочитать ответ: {e}")
+
+        time.sleep(poll)
+
+    return []
+
+
+# ---------- метрики из структурированного ответа -----------------------
+def _rows(payloads: List[dict]) -> List[dict]:
+    """
+    События первого ответа ленты активности.  Снимки старых прогонов могут
+    содержать и ответ /wallet_holdings/ (data.holdings) — он пропускается.
+    """
+    for payload in payloads:
+        data = payload.get("data") or {}
+        items = data.get("activities") if isinstance(data, dict) else data
+        rows = [r for r in items or [] if isinstance(r, dict)]
+        if rows:
+            return rows
+    return []
+
+
+def _number(row: dict, *keys: str) -> Optional[float]:
+    for key in keys:
+        value = row.get(key)
+        if value not in (None, ""):
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                continue
+    return None
+
+
+def metrics_from_payloads(payloads: List[dict], max_rows: int = 100, now: Optional[float] = None):
+    """
+    Счётчики count_rockets, посчитанные по JSON вместо DOM:
+    (rockets, trades, fast_trades, profit_trades, good_profit, ages_h),
+    где ages_h — давность каждой сделки в часах.  None, если строк нет.
+    Как и DOM-подсчёт, смотрит только первые `max_rows` событий; trades —
+    число просмотренных строк, чтобы доля быстрых сделок считалась от них.
+
+    Счётчики профита — те же, что у DOM-подсчёта (src.dexscraper.scoring):
+    profit_trades — все сделки со значением pnl, независимо от знака.
+    pnl в ответе — доля (10.0 = 1000 %); длительность удержания —
+    end_holding_at − start_holding_at (для открытых позиций — до
+    last_active_timestamp); давность — now − last_active_timestamp.
+    """
+    rows = _rows(payloads)[:max_rows]
+    if not rows:
+        return None
+    now = now or time.time()
+
+    rockets = profit_trades = good_profit = fast_trades = 0
+    ages_h: List[float] = []
+
+    for row in rows:
+        pnl = _number(row, "total_profit_pnl", "realized_pnl", "pnl")
+        if pnl is not None:
+            pnl_pct = pnl * 100
+            profit_trades += 1
+            if pnl_pct > GOOD_PROFIT_PCT:
+                good_profit += 1
+            if pnl_pct > ROCKET_PCT:
+                rockets += 1
+
+        start = _number(row, "start_holding_at")
+        end = _number(row, "end_holding_at", "last_active_timestamp")
+        if start and end and 0 < end - start < 120:
+            fast_trades += 1
+
+        last_active = _number(row, "last_active_timestamp", "timestamp")
+        if last_active:
+            ages_h.append(max(now - last_active, 0) / 3600)
+
+    return rockets, len(rows), fast_trades, profit_trades, good_profit, ages_h
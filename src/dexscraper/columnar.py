@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import struct
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from src.dexscraper.utils import DATA_DIR, PROCESSED, RUNS
+from src.dexscraper.results_io import read_records
+
+# Arrow IPC — необязательная зависимость; без неё пишем .npz
+try:
+    import pyarrow as pa
+    import pyarrow.ipc  # noqa: F401  (pa.ipc)
+except ImportError:
+    pa = None
+
+FORMAT_ENV = "DEX_COLUMNAR_FORMAT"     # arrow | npz; по умолчанию arrow, если есть pyarrow
+EXPORT_STEM = "metrics"                # processed/metrics.arrow | processed/metrics.npz
+FORMATS = {"arrow": ".arrow", "npz": ".npz"}
+
+NO_VALUE = -1                          # целые колонки: метрики активности не посчитаны / нет даты
+
+# колонка → dtype; порядок — порядок колонок в файле
+SCHEMA = {
+    # process_data (results.txt)
+    "address": "U",
+    "sol_balance": "f8",
+    "pnl_pct": "f8",
+    "winrate": "f8",
+    "realized_profit": "f8",
+    "last_active": "i8",              # unix-время, NO_VALUE — 'N/A'
+    # count_rockets (clear_results.txt)
+    "has_activity": "?",
+    "rockets": "i8",
+    "trades_count": "i8",
+    "profit_trades": "i8",
+    "good_profit": "i8",
+    "fast_trades_pct": "f8",
+    "median_h": "f8",                 # NaN — интервал не определён
+    "label": "U",
+}
+
+
+# ---------- разбор строк results / clear_results -----------------------
+def _number(value, default=np.nan) -> float:
+    """'12.88' / '180.86%' / '1807.75$' / 0.6 → float; пусто и '--' → default."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value or "").strip().rstrip("%$").replace(",", "")
+    try:
+        return float(text)
+    except ValueError:
+        return default
+
+
+def _timestamp(value) -> int:
+    try:
+        return int(datetime.strptime(value, "%Y-%m-%d %H:%M:%S").timestamp())
+    except (TypeError, ValueError):
+        return NO_VALUE
+
+
+def _prefixed(item: dict, prefix: str):
+    """Значение ключа вида 'PnL 7d' / 'Realized Profit 30d' — период в имени ключа."""
+    for key, value in item.items():
+        if key.startswith(prefix):
+            return value
+    return None
+
+
+def _load_clear_results(path: Path) -> List[dict]:
+    """clear_results — JSON-массив; в старых run'ах там объекты results-формата."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except ValueError:
+        return read_records(path)
+
+
+def build_columns(results: Iterable[dict], clear_rows: Iterable[dict]) -> Dict[str, np.ndarray]:
+    """
+    Строка на кошелёк из results.txt; метрики активности подклеиваются
+    по адресу из clear_results.  Кошельки без них — has_activity=False.
+    """
+    activity = {row.get("Wallet Address"): row for row in clear_rows if "Rockets" in row}
+    cols: Dict[str, list] = {name: [] for name in SCHEMA}
+
+    for item in results:
+        address = item.get("Wallet Address")
+        if not address:
+            continue
+        cols["address"].append(address)
+        cols["sol_balance"].append(_number(item.get("SOL_value", item.get("SOL Balance"))))
+        cols["pnl_pct"].append(_number(item.get("PnL_value", _prefixed(item, "PnL "))))
+        cols["winrate"].append(_number(item.get("Winrate")))
+        cols["realized_profit"].append(_number(_prefixed(item, "Realized Profit ")))
+        cols["last_active"].append(_timestamp(item.get("Last Active Timestamp")))
+
+        row = activity.get(address)
+        cols["has_activity"].append(row is not None)
+        row = row or {}
+        for name, key in (("rockets", "Rockets"), ("trades_count", "Trades Count"),
+                          ("profit_trades", "Profit trades"), ("good_profit", "Good profit")):
+            cols[name].append(int(row.get(key, NO_VALUE)))
+        cols["fast_trades_pct"].append(_number(row.get("Fast Trades")))
+        cols["median_h"].append(_number(row.get("Median_H")))
+        cols["label"].append(row.get("Label") or "")
+
+    return {name: np.asarray(values, dtype=SCHEMA[name]) for name, values in cols.items()}
+
+
+# ---------- запись -------------------------------------------------------
+def default_format() -> str:
+    fmt = os.getenv(FORMAT_ENV) or ("arrow" if pa is not None else "npz")
+    if fmt not in FORMATS:
+        raise ValueError(f"{FORMAT_ENV}={fmt}: ожидается одно из {', '.join(FORMATS)}")
+    if fmt == "arrow" and pa is None:
+        raise ImportError("для формата arrow нужен pyarrow")
+    return fmt
+
+
+def _write_arrow(cols: Dict[str, np.ndarray], path: Path, run_id: str) -> None:
+    table = pa.table({name: pa.array(values) for name, values in cols.items()})
+    table = table.replace_schema_metadata({"run_id": run_id})
+    # без сжатия: файл читается через memory_map без копирования
+    with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def export_run(run_path: Path, fmt: Optional[str] = None) -> Optional[Path]:
+    """
+    processed/results.txt (+ clear_results.txt) → processed/metrics.{arrow,npz}
+    с типизированными колонками SCHEMA.  None — в run'е нет results.txt.
+    Файл пишется во временный и подменяется целиком.
+    """
+    processed = Path(run_path) / PROCESSED
+    results_file = processed / "results.txt"
+    if not results_file.exists():
+        return None
+
+    clear_file = processed / "clear_results.txt"
+    clear_rows = _load_clear_results(clear_file) if clear_file.exists() else []
+    cols = build_columns(read_records(results_file), clear_rows)
+
+    fmt = fmt or default_format()
+    out = processed / f"{EXPORT_STEM}{FORMATS[fmt]}"
+    tmp = out.with_name(out.name + ".tmp")
+    if fmt == "arrow":
+        _write_arrow(cols, tmp, Path(run_path).name)
+    else:
+        with open(tmp, "wb") as f:
+            np.savez(f, **cols)                 # без сжатия — члены архива можно отобразить в память
+    os.replace(tmp, out)
+    print(f"[columnar] {len(cols['address'])} кошельков → {out}")
+    return out
+
+
+# ---------- чтение через mmap -------------------------------------------
+def _mmap_npz(path: Path) -> Dict[str, np.ndarray]:
+    """Колонки несжатого .npz как np.memmap: .npy внутри zip лежат как есть."""
+    arrays: Dict[str, np.ndarray] = {}
+    with zipfile.ZipFile(path) as zf, open(path, "rb") as f:
+        for info in zf.infolist():
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                arrays[name] = np.load(zf.open(info))
+                continue
+            # локальный заголовок: 30 байт + имя + extra (у numpy — zip64)
+            f.seek(info.header_offset + 26)
+            name_len, extra_len = struct.unpack("<HH", f.read(4))
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(f)
+            read_header = (np.lib.format.read_array_header_1_0 if version == (1, 0)
+                           else np.lib.format.read_array_header_2_0)
+            shape, fortran, dtype = read_header(f)
+            if 0 in shape:
+                arrays[name] = np.zeros(shape, dtype=dtype)
+                continue
+            arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=f.tell(),
+                                     shape=shape, order="F" if fortran else "C")
+    return arrays
+
+
+def _mmap_arrow(path: Path) -> Dict[str, np.ndarray]:
+    table = pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+    # числовые колонки без null отдаются без копирования, строки — массивом объектов
+    return {name: table.column(name).to_numpy() for name in table.column_names}
+
+
+def export_path(run_path: Path) -> Optional[Path]:
+    """Экспорт run'а, если он есть (arrow предпочтительнее npz)."""
+    for fmt, suffix in FORMATS.items():
+        path = Path(run_path) / PROCESSED / f"{EXPORT_STEM}{suffix}"
+        if path.exists() and (fmt != "arrow" or pa is not None):
+            return path
+    return None
+
+
+def load_run(path: Path) -> Dict[str, np.ndarray]:
+    """Колонки одного экспорта, отображённые в память."""
+    path = Path(path)
+    return _mmap_arrow(path) if path.suffix == ".arrow" else _mmap_npz(path)
+
+
+def load_runs(
+    runs_root: Path = DATA_DIR / RUNS, run_ids: Optional[Iterable[str]] = None
+) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Колонки всех экспортированных run'ов: id run'а → его колонки,
+    отображённые в память (без копирования — время загрузки не растёт
+    с историей).  Run'ы без экспорта пропускаются.  Строки из нескольких
+    run'ов собирает select() — копируются только отобранные.
+    """
+    runs_root = Path(runs_root)
+    run_dirs = [runs_root / r for r in run_ids] if run_ids is not None else sorted(runs_root.iterdir())
+
+    runs: Dict[str, Dict[str, np.ndarray]] = {}
+    for run_dir in run_dirs:
+        path = export_path(run_dir)
+        if path is not None:
+            runs[run_dir.name] = load_run(path)
+    return runs
+
+
+def select(
+    runs: Dict[str, Dict[str, np.ndarray]],
+    where: Optional[Callable[[Dict[str, np.ndarray]], np.ndarray]] = None,
+    columns: Optional[Sequence[str]] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Строки всех run'ов, для которых `where(cols)` (маска по колонкам
+    одного run'а) истинна, одной таблицей + колонка `run`.  Маска
+    считается по каждому run'у отдельно, в память копируется только
+    результат.  where=None — все строки.
+
+        runs = load_runs()
+        good = select(runs, lambda c: (c["rockets"] > 0) & (c["label"] == "DAILY"), ["address"])
+    """
+    columns = list(columns or SCHEMA)
+    picked: Dict[str, List[np.ndarray]] = {name: [] for name in columns}
+    names: List[np.ndarray] = []
+    for run_id, cols in runs.items():
+        mask = where(cols) if where is not None else slice(None)
+        for name in columns:
+            picked[name].append(np.asarray(cols[name][mask]))
+        names.append(np.full(len(picked[columns[0]][-1]), run_id))
+
+    if not names:
+        result = {name: np.zeros(0, dtype=SCHEMA.get(name, object)) for name in columns}
+        result["run"] = np.zeros(0, dtype="U")
+        return result
+    result = {name: np.concatenate(parts) for name, parts in picked.items()}
+    result["run"] = np.concatenate(names)
+    return result
+
+
+def _cli() -> None:
+    parser = argparse.ArgumentParser(description="Колоночный экспорт метрик run'ов")
+    parser.add_argument("runs", nargs="*", help="id run'ов в data/runs (по умолчанию — все)")
+    parser.add_argument("--format", choices=tuple(FORMATS), help=f"по умолчанию — {FORMAT_ENV} или arrow")
+    parser.add_argument("--load-only", action="store_true", help="не экспортировать, только прочитать")
+    args = parser.parse_args()
+
+    runs_root = DATA_DIR / RUNS
+    run_ids = args.runs or sorted(p.name for p in runs_root.iterdir() if p.is_dir())
+    if not args.load_only:
+        for run_id in run_ids:
+            export_run(runs_root / run_id, args.format)
+
+    started = time.perf_counter()
+    runs = load_runs(runs_root, run_ids)
+    elapsed = (time.perf_counter() - started) * 1000
+    rows = sum(len(cols["address"]) for cols in runs.values())
+    print(f"[columnar] {rows} строк из {len(runs)} run'ов за {elapsed:.1f} мс")
+
+
+if __name__ == "__main__":
+    _cli()
@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import itertools
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.db.database import SessionLocal
+from src.db.snapshots import ensure_partitions, record_changes_safe
+from src.db.upsert import upsert_activity, upsert_wallets
+from src.dexscraper.results_io import append_record, read_records
+from src.dexscraper.utils import DATA_DIR
+
+# Отложенная запись в БД: воркеры кладут строки в очередь и сразу идут
+# дальше, отдельный поток копит их и пишет пачками через src.db.upsert.
+# Если БД недоступна — после повторов строки уходят в spill-файл и
+# дописываются при следующем запуске.
+
+SPILL_PATH = DATA_DIR / "db_spill" / "pending.jsonl"
+
+# настройки берутся из окружения, чтобы их видели и дочерние процессы
+ENABLED_ENV = "DB_WRITE_BEHIND"         # 0 — писать синхронно, как раньше
+BATCH_ENV = "DB_WRITE_BATCH"
+INTERVAL_ENV = "DB_WRITE_INTERVAL"      # секунды между сбросами, если пачка не набралась
+DEFAULT_BATCH = 200
+DEFAULT_INTERVAL = 2.0
+
+KIND_WALLET, KIND_ACTIVITY = "wallet", "activity"
+_UPSERTS = {KIND_WALLET: upsert_wallets, KIND_ACTIVITY: upsert_activity}
+
+_STOP = object()
+_CLAIMS = itertools.count()     # уникальные имена .replay внутри процесса
+
+
+def _pid_alive(pid: int) -> bool:
+    """Жив ли процесс `pid` (чей .replay-файл мы видим)."""
+    if os.name == "nt":
+        # os.kill(pid, 0) в Windows завершает процесс — спрашиваем через WinAPI
+        import ctypes
+
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)   # QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        ctypes.windll.kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return code.value == 259                                          # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class DbWriter:
+    """
+    Поток записи.  put() не ждёт БД: строка попадает в очередь, поток
+    сбрасывает накопленное, когда набралось `batch_size` строк или прошло
+    `flush_interval` секунд с первой несброшенной.  Повторы одного адреса
+    внутри пачки схлопывает upsert.  Неудачная пачка повторяется
+    `retries` раз с растущей паузой, затем дописывается в `spill_path`.
+    """
+
+    def __init__(
+        self,
+        session_factory=None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        spill_path: Path = SPILL_PATH,
+        retries: int = 3,
+        backoff: float = 1.0,
+        max_queue: int = 10_000,
+    ) -> None:
+        self.session_factory = session_factory or SessionLocal
+        self.batch_size = batch_size or int(os.getenv(BATCH_ENV, DEFAULT_BATCH))
+        self.flush_interval = flush_interval or float(os.getenv(INTERVAL_ENV, DEFAULT_INTERVAL))
+        self.spill_path = Path(spill_path)
+        self.retries = retries
+        self.backoff = backoff
+        self.pid = os.getpid()
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)   # полная очередь притормозит воркеров
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self.written = self.spilled = self.failed_batches = 0
+
+    # ---------- API воркеров --------------------------------------------
+    def put(self, kind: str, row: dict, session_factory=None) -> None:
+        self._queue.put((session_factory or self.session_factory, kind, row))
+
+    def start(self) -> "DbWriter":
+        try:
+            ensure_partitions(self.session_factory)
+        except Exception as e:
+            print(f"[db_writer] секции wallet_snapshots не созданы: {str(e).splitlines()[0]}")
+        self.replay_spill()
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        """Сбросить всё накопленное и остановить поток."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        # строки, положенные уже после _STOP
+        late: Dict[Tuple[object, str], List[dict]] = {}
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                factory, kind, row = item
+                late.setdefault((factory, kind), []).append(row)
+        self._flush(late)
+        print(f"[db_writer] записано: {self.written}, в spill: {self.spilled}, "
+              f"неудачных пачек: {self.failed_batches}")
+
+    # ---------- поток записи -------------------------------------------
+    def _run(self) -> None:
+        pending: Dict[Tuple[object, str], List[dict]] = {}
+        count = 0
+        deadline = 0.0
+        while True:
+            timeout = max(deadline - time.monotonic(), 0) if count else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                self._flush(pending)
+                return
+            if item is not None:
+                factory, kind, row = item
+                if not count:
+                    deadline = time.monotonic() + self.flush_interval
+                pending.setdefault((factory, kind), []).append(row)
+                count += 1
+
+            if count and (count >= self.batch_size or time.monotonic() >= deadline):
+                self._flush(pending)
+                pending, count = {}, 0
+
+    def _flush(self, pending: Dict[Tuple[object, str], List[dict]]) -> None:
+        # базовые метрики раньше метрик активности: строку кошелька создаёт upsert_wallets
+        written: Dict[object, List[str]] = {}
+        for (factory, kind), rows in sorted(pending.items(), key=lambda kv: kv[0][1] != KIND_WALLET):
+            if self._write_or_spill(factory, kind, rows):
+                self.written += len(rows)
+                written.setdefault(factory, []).extend(row["address"] for row in rows)
+        # один снимок истории на адрес за сброс, а не по одному на каждый вид строк
+        for factory, addresses in written.items():
+            record_changes_safe(factory, addresses)
+
+    def _write(self, factory, kind: str, rows: List[dict]) -> bool:
+        for attempt in range(self.retries + 1):
+            try:
+                _UPSERTS[kind](factory, rows, snapshot=False)
+                return True
+            except Exception as e:
+                print(f"[db_writer] пачка {kind} из {len(rows)} строк, попытка {attempt + 1}: {str(e).splitlines()[0]}")
+                if attempt < self.retries:
+                    time.sleep(self.backoff * 2 ** attempt)
+        self.failed_batches += 1
+        return False
+
+    def _write_or_spill(self, factory, kind: str, rows: List[dict]) -> bool:
+        """_write, после которого строки либо в БД, либо в spill — исключение их не теряет."""
+        try:
+            ok = self._write(factory, kind, rows)
+        except Exception as e:
+            print(f"[db_writer] пачка {kind} не записана: {str(e).splitlines()[0]}")
+            self.failed_batches += 1
+            ok = False
+        if not ok:
+            self._spill(kind, rows)
+        return ok
+
+    # ---------- spill ----------------------------------------------------
+    def _spill(self, kind: str, rows: List[dict]) -> None:
+        self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+        for row in rows:
+            append_record(self.spill_path, {"kind": kind, "row": row})
+        self.spilled += len(rows)
+        print(f"[db_writer] {len(rows)} строк {kind} сохранены в {self.spill_path}")
+
+    def _claim(self, path: Path) -> Optional[Path]:
+        """Атомарно забирает файл под имя этого процесса; None — его уже забрал другой."""
+        claimed = self.spill_path.with_name(f"{self.spill_path.name}.{self.pid}.{next(_CLAIMS)}.replay")
+        try:
+            os.replace(path, claimed)
+        except FileNotFoundError:
+            return None
+        return claimed
+
+    def _orphans(self) -> List[Path]:
+        """.replay-файлы процессов, которые упали, не дописав их."""
+        prefix = f"{self.spill_path.name}."
+        orphans: List[Path] = []
+        for path in sorted(self.spill_path.parent.glob(f"{prefix}*.replay")):
+            try:
+                pid = int(path.name[len(prefix):].split(".")[0])
+            except ValueError:
+                continue
+            if pid != self.pid and not _pid_alive(pid):
+                orphans.append(path)
+        return orphans
+
+    def replay_spill(self) -> int:
+        """
+        Дописывает в БД строки, оставшиеся в spill от прошлых запусков, и
+        .replay-файлы упавших процессов.  Файл удаляется после того, как
+        каждая его строка записана или снова ушла в spill.  Возвращает
+        число записанных строк.
+        """
+        # переименовываем, чтобы новые неудачи этого запуска не смешались с повтором;
+        # без проверки exists(): воркеры процессов стартуют одновременно, файл забирает один
+        claimed = [c for c in map(self._claim, self._orphans() + [self.spill_path]) if c is not None]
+
+        total = 0
+        for replay in claimed:
+            by_kind: Dict[str, List[dict]] = {}
+            try:
+                for record in read_records(replay):
+                    by_kind.setdefault(record["kind"], []).append(record["row"])
+            except Exception as e:
+                # файл остаётся: после нашей смерти его заберёт следующий writer
+                print(f"[db_writer] {replay} не прочитан: {e}")
+                continue
+
+            for kind in sorted(by_kind, key=lambda k: k != KIND_WALLET):
+                rows = by_kind[kind]
+                if self._write_or_spill(self.session_factory, kind, rows):
+                    total += len(rows)
+            replay.unlink()
+        if total:
+            print(f"[db_writer] из spill дописано {total} строк")
+        return total
+
+
+# ---------- writer процесса ------------------------------------------------
+_ACTIVE: Optional[DbWriter] = None
+_ACTIVE_LOCK = threading.Lock()
+
+
+def active_writer() -> Optional[DbWriter]:
+    """Writer текущего процесса; в форкнутом потомке чужой writer не виден."""
+    writer = _ACTIVE
+    return writer if writer is not None and writer.pid == os.getpid() else None
+
+
+def enabled() -> bool:
+    return os.getenv(ENABLED_ENV, "1").strip().lower() not in ("0", "false", "no")
+
+
+@contextmanager
+def write_behind(session_factory=None, **kwargs) -> Iterator[Optional[DbWriter]]:
+    """
+    На время блока add_wallet / add_may_good пишут через общий DbWriter.
+    Вложенные блоки используют уже запущенный writer; на выходе
+    внешнего блока всё несброшенное записывается.  С DB_WRITE_BEHIND=0 —
+    ничего не делает (запись остаётся синхронной).
+    """
+    global _ACTIVE
+    with _ACTIVE_LOCK:
+        current = active_writer()
+        owner = current is None and enabled()
+        if owner:
+            current = _ACTIVE = DbWriter(session_factory, **kwargs)
+    try:
+        if owner:
+            # секции и replay spill ходят в БД — не под блокировкой; put() до старта просто копит очередь
+            current.start()
+        yield current
+    finally:
+        if owner:
+            with _ACTIVE_LOCK:
+                _ACTIVE = None
+            current.close()
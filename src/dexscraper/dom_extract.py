@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import time
+from typing import List, Optional, Sequence
+
+# Каждая функция — один execute_script вместо цепочки find_element /
+# get_attribute: весь обход DOM делает браузер, в Python приходит JSON.
+
+_OUTER_HTML_JS = """
+let el = document;
+for (const sel of arguments[0]) {
+    el = el.querySelector(sel);
+    if (!el) return null;
+}
+if (arguments[1] && !el.querySelector(arguments[1])) return null;
+return el.outerHTML;
+"""
+
+_ACTIVITY_ROWS_JS = """
+const maxRows = arguments[0];
+const tbody = document.querySelector("div.g-table-content table tbody.g-table-tbody");
+if (!tbody) return null;
+const text = el => (el.textContent || "").trim();
+const rows = tbody.querySelectorAll("tr.g-table-row");
+const out = [];
+for (const row of Array.prototype.slice.call(rows, 0, maxRows)) {
+    const dur = row.querySelector(
+        "td.g-table-cell.g-table-cell-fix-left.g-table-cell-fix-left-last p.chakra-text"
+    );
+    const cells = Array.from(row.querySelectorAll("td.g-table-cell"), cell => ({
+        holds: Array.from(cell.querySelectorAll("span.css-1baulvz"), text),
+        profits: Array.from(
+            cell.querySelectorAll("div.css-1i5dkc8"),
+            div => Array.from(div.querySelectorAll("p.chakra-text.css-b4wymw"), text)
+        ),
+    }));
+    out.push({duration: dur ? text(dur) : null, cells: cells});
+}
+return {total: rows.length, rows: out};
+"""
+
+
+def outer_html(driver, chain: Sequence[str], ready: Optional[str] = None) -> Optional[str]:
+    """
+    outerHTML элемента по цепочке CSS-селекторов (каждый ищется внутри
+    предыдущего).  Если задан `ready`, элемент считается готовым только
+    когда внутри него есть совпадение с этим селектором.
+    """
+    return driver.execute_script(_OUTER_HTML_JS, list(chain), ready)
+
+
+def wait_outer_html(
+    driver,
+    chain: Sequence[str],
+    ready: Optional[str] = None,
+    timeout: float = 60.0,
+    poll: float = 0.5,
+) -> str:
+    """Как outer_html, но ждёт появления элемента.  TimeoutError, если не дождались."""
+    deadline = time.time() + timeout
+    while True:
+        html = outer_html(driver, chain, ready)
+        if html is not None:
+            return html
+        if time.time() >= deadline:
+            raise TimeoutError(f"не найден: {' > '.join(chain)}")
+        time.sleep(poll)
+
+
+def activity_rows(driver, max_rows: int = 100) -> Optional[dict]:
+    """
+    Таблица сделок gmgn за один round-trip:
+    {"total": N, "rows": [{"duration": str | None,
+                           "cells": [{"holds": [str], "profits": [[str]]}]}]}
+    `rows` обрезаны до max_rows; None — таблицы на странице нет.
+    """
+    return driver.execute_script(_ACTIVITY_ROWS_JS, max_rows)
+
+
+def wait_activity_rows(driver, max_rows: int = 100, timeout: float = 15.0, poll: float = 0.5) -> dict:
+    deadline = time.time() + timeout
+    while True:
+        table = activity_rows(driver, max_rows)
+        if table is not None:
+            return table
+        if time.time() >= deadline:
+            raise TimeoutError("таблица сделок не появилась")
+        time.sleep(poll)
+
+
+# цепочки селекторов DexScreener (как в прежнем обходе custom-* div-ов)
+TOP_TRADERS_READY = 'a[href*="solscan.io/account"]'   # таблица кошельков отрисована
+TOP_TRADERS_CHAIN: List[str] = [
+    "#root",
+    "div.custom-cwirlr",
+    "main.custom-1ip3p22",
+    "div.custom-697dix",
+    "div.custom-1mgfq9c",
+    "div.custom-19qkkht",
+    "div.custom-1vjv7zm",
+    "div.custom-1mxzest",
+]
+TOP_TABLE_CHAIN: List[str] = ["div.ds-dex-table.ds-dex-table-top"]
@@ -1,65 +1,227 @@
 from __future__ import annotations
 
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from bs4 import BeautifulSoup
 
+# быстрые парсеры — необязательные зависимости; без них работает bs4
+try:
+    from selectolax.lexbor import LexborHTMLParser as _SelectolaxParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as _SelectolaxParser   # selectolax < 1.0
+    except ImportError:
+        _SelectolaxParser = None
+
+try:
+    import lxml.html as _lxml_html
+except ImportError:
+    _lxml_html = None
+
+PARSER_ENV = "DEX_HTML_PARSER"    # selectolax | lxml | bs4; по умолчанию — самый быстрый из доступных
+
+ROW_CLASS = "custom-1nvxwu0"
+WAX_CLASS = "custom-1o79wax"
+SOLD_CLASS = "chakra-text custom-13ppmr2"
+
+# (текст «sold», href | None) для каждой строки таблицы
+RowIter = Iterator[Tuple[str, Optional[str]]]
+
+
+# ---------- backends: HTML → (текст «sold», ссылка) по строкам ---------
+def _rows_bs4(html: str) -> RowIter:
+    soup = BeautifulSoup(html, "html.parser")
+    for row in soup.find_all("div", class_=ROW_CLASS):
+        wax_blocks = row.find_all("div", class_=WAX_CLASS)
+        if len(wax_blocks) <= 1:
+            continue
+        sold_span = wax_blocks[1].find("span", class_=SOLD_CLASS)
+        if not sold_span:
+            continue
+        link = row.find("a", href=True)
+        yield sold_span.get_text(strip=True), link["href"] if link else None
+
+
+def _rows_lxml(html: str) -> RowIter:
+    tree = _lxml_html.fromstring(html)
+    for row in tree.xpath(f'//div[contains(concat(" ", normalize-space(@class), " "), " {ROW_CLASS} ")]'):
+        wax_blocks = row.xpath(f'.//div[contains(concat(" ", normalize-space(@class), " "), " {WAX_CLASS} ")]')
+        if len(wax_blocks) <= 1:
+            continue
+        sold_span = wax_blocks[1].xpath(f'.//span[@class="{SOLD_CLASS}"]')
+        if not sold_span:
+            continue
+        links = row.xpath(".//a[@href]")
+        sold_text = "".join(t.strip() for t in sold_span[0].itertext())
+        yield sold_text, links[0].get("href") if links else None
+
+
+def _rows_selectolax(html: str) -> RowIter:
+    tree = _SelectolaxParser(html)
+    for row in tree.css(f"div.{ROW_CLASS}"):
+        wax_blocks = row.css(f"div.{WAX_CLASS}")
+        if len(wax_blocks) <= 1:
+            continue
+        sold_span = wax_blocks[1].css_first(f'span[class="{SOLD_CLASS}"]')
+        if sold_span is None:
+            continue
+        link = row.css_first("a[href]")
+        sold_text = sold_span.text(deep=True, separator="", strip=True)
+        yield sold_text, link.attributes.get("href") if link is not None else None
+
+
+BACKENDS: Dict[str, Callable[[str], RowIter]] = {"bs4": _rows_bs4}
+if _lxml_html is not None:
+    BACKENDS["lxml"] = _rows_lxml
+if _SelectolaxParser is not None:
+    BACKENDS["selectolax"] = _rows_selectolax
+
+
+def default_backend() -> str:
+    wanted = os.getenv(PARSER_ENV)
+    if wanted:
+        if wanted not in BACKENDS:
+            raise ValueError(f"{PARSER_ENV}={wanted}: парсер не установлен (есть {', '.join(BACKENDS)})")
+        return wanted
+    for name in ("selectolax", "lxml", "bs4"):
+        if name in BACKENDS:
+            return name
+    return "bs4"
+
 
 # ---------- парсинг одного HTML-файла ----------------------------------
-def _wallets_from_html(html_file: Path) -> List[str]:
+def _wallets_from_html(html_file: Path, backend: Optional[str] = None) -> List[str]:
     """Извлекает адреса кошельков с ≤ 10 txns."""
-    soup = BeautifulSoup(html_file.read_text(encoding="utf-8"), "html.parser")
-    wallets: List[str] = []
+    return wallets_from_markup(html_file.read_text(encoding="utf-8"), backend)
+
 
-    rows = soup.find_all("div", class_="custom-1nvxwu0")
-    for row in rows:
-        wax_blocks = row.find_all("div", class_="custom-1o79wax")
-        if len(wax_blocks) > 1:
-            sold_span = wax_blocks[1].find("span", class_="chakra-text custom-13ppmr2")
-            if not sold_span:
-                continue
+def wallets_from_markup(html: str, backend: Optional[str] = None) -> List[str]:
+    """То же для HTML-строки — когда блок Top Traders ещё не записан на диск."""
+    rows = BACKENDS[backend or default_backend()](html)
+    wallets: List[str] = []
 
-            sold_text = sold_span.get_text(strip=True)
-            if "txns" not in sold_text:
-                continue
+    for sold_text, href in rows:
+        if "txns" not in sold_text:
+            continue
 
-            txn_part = sold_text.split("/")[1].replace("txns", "").strip()
-            txns = float(txn_part.replace("K", "")) * 1_000 if "K" in txn_part else int(txn_part)
+        txn_part = sold_text.split("/")[1].replace("txns", "").strip()
+        txns = float(txn_part.replace("K", "")) * 1_000 if "K" in txn_part else int(txn_part)
 
-            if txns <= 10:
-                link = row.find("a", href=True)
-                if link and "solscan.io/account" in link["href"]:
-                    wallets.append(link["href"].split("/")[-1])
+        if txns <= 10:
+            if href and "solscan.io/account" in href:
+                wallets.append(href.split("/")[-1])
 
     return wallets
 
 
+def _parse_job(job: Tuple[Path, str]) -> List[str]:
+    html_file, backend = job
+    return _wallets_from_html(html_file, backend)
+
+
+def _html_files(wallet_html_dirs: List[Path]) -> List[Path]:
+    files: List[Path] = []
+    for wdir in wallet_html_dirs:
+        if not wdir.exists():
+            print(f"[extract_wallets] {wdir} не найден — пропуск")
+            continue
+        files.extend(wdir.glob("*.html"))
+    return files
+
+
+def _parse_all(files: List[Path], backend: str, workers: int) -> List[List[str]]:
+    """Результаты в порядке `files`; workers <= 1 — без пула процессов."""
+    jobs = [(f, backend) for f in files]
+    if workers <= 1 or len(files) < 2:
+        return [_parse_job(j) for j in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunk = max(1, len(jobs) // (workers * 4))
+        return list(executor.map(_parse_job, jobs, chunksize=chunk))
+
+
+def _cached_txts(wallet_html_dirs: List[Path]) -> List[Path]:
+    """clear_wallets/*.txt, у которых нет HTML-пары в wallet_html."""
+    txts: List[Path] = []
+    for wdir in wallet_html_dirs:
+        clear_dir = wdir.parent / "clear_wallets"
+        if clear_dir.exists():
+            txts.extend(t for t in clear_dir.glob("*.txt") if not (wdir / t.with_suffix(".html").name).exists())
+    return txts
+
+
 # ---------- публичная функция, вызываемая из pipeline ------------------
 def extract_wallets(
     wallet_html_dirs: List[Path],
     dst_dir: Path,
+    backend: Optional[str] = None,
+    workers: Optional[int] = None,
 ) -> List[Path]:
     """
     Для каждой директории wallet_html извлекает кошельки и
     сохраняет *.txt в `<parent>/clear_wallets/`.
+    Файлы разбираются пулом из `workers` процессов (по умолчанию —
+    по числу ядер) парсером `backend` (selectolax / lxml / bs4).
     Возвращает список созданных txt-файлов.
     """
+    backend = backend or default_backend()
+    workers = workers if workers is not None else (os.cpu_count() or 1)
+    files = _html_files(wallet_html_dirs)
+
     produced_txts: List[Path] = []
+    for html_file, wallets in zip(files, _parse_all(files, backend, workers)):
+        if wallets:
+            clear_dir = html_file.parent.parent / "clear_wallets"
+            clear_dir.mkdir(exist_ok=True)
+            out_file = clear_dir / html_file.with_suffix(".txt").name
+            out_file.write_text("\n".join(wallets), encoding="utf-8")
+            produced_txts.append(out_file)
 
-    for wdir in wallet_html_dirs:
-        if not wdir.exists():
-            print(f"[extract_wallets] {wdir} не найден — пропуск")
-            continue
+    # кошельки токенов из кэша Top Traders: txt уже есть, HTML не скачивался
+    cached = _cached_txts(wallet_html_dirs)
+    produced_txts.extend(cached)
 
-        clear_dir = wdir.parent / "clear_wallets"
-        clear_dir.mkdir(exist_ok=True)
+    print(f"[extract_wallets] создано {len(produced_txts) - len(cached)} файлов (парсер {backend}, "
+          f"процессов {workers}), из кэша токенов: {len(cached)}.")
+    return produced_txts
 
-        for html_file in wdir.glob("*.html"):
-            wallets = _wallets_from_html(html_file)
-            if wallets:
-                out_file = clear_dir / html_file.with_suffix(".txt").name
-                out_file.write_text("\n".join(wallets), encoding="utf-8")
-                produced_txts.append(out_file)
 
-    print(f"[extract_wallets] создано {len(produced_txts)} файлов.")
-    return produced_txts
+# ---------- бенчмарк парсеров ------------------------------------------
+def benchmark(wallet_html_dirs: List[Path], workers: int = 1, repeat: int = 3) -> Dict[str, float]:
+    """
+    files/sec для каждого доступного парсера на одних и тех же файлах.
+    Заодно проверяет, что все парсеры дают одинаковый результат.
+    """
+    files = _html_files(wallet_html_dirs)
+    if not files:
+        raise ValueError("нет HTML-файлов для бенчмарка")
+
+    reference = _parse_all(files, "bs4", 1)
+    speed: Dict[str, float] = {}
+    for name in BACKENDS:
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = _parse_all(files, name, workers)
+            best = min(best, time.perf_counter() - started)
+        if result != reference:
+            raise AssertionError(f"парсер {name} дал результат, отличный от bs4")
+        speed[name] = len(files) / best
+        print(f"[extract_wallets] {name:<10} {speed[name]:8.1f} files/sec ({len(files)} файлов, процессов {workers})")
+    return speed
+
+
+def _cli() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк парсеров wallet_html")
+    parser.add_argument("dirs", nargs="+", type=Path, help="каталоги wallet_html")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    benchmark(args.dirs, args.workers, args.repeat)
+
+
+if __name__ == "__main__":
+    _cli()
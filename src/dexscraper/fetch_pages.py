@@ -1,59 +1,106 @@
 
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from src.dexscraper.utils import create_run_dir, cleanup_old_runs
+from src.dexscraper.browser_pool import BrowserPool, borrow
+from src.dexscraper.session_manager import SESSIONS, PageState
+from src.dexscraper.dom_extract import TOP_TABLE_CHAIN, wait_outer_html
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from seleniumbase import Driver
-from typing import List
-import time
+import os
+from typing import List, Optional, Sequence, Tuple
 
-def fetch_pages(hours: int, dst_dir: Path) -> List[Path]:
+BASE_URL = "https://dexscreener.com/solana"
+
+# критерии сортировки DexScreener: ключ для CLI / окружения → rankBy
+RANKINGS = {
+    "h1": "trendingScoreH1",
+    "h6": "trendingScoreH6",
+    "h24": "trendingScoreH24",
+    "volume": "volume",
+}
+
+# настройки берутся из окружения, чтобы их видели и дочерние процессы
+PAGES_ENV = "DEX_PAGES"             # сколько страниц каждого рейтинга
+RANKINGS_ENV = "DEX_RANKINGS"       # через запятую: h1,h6,h24,volume
+DEFAULT_PAGES = 1
+DEFAULT_RANKINGS = "h6"
+
+
+def page_url(hours: int, ranking: str = "h6", page: int = 1) -> str:
+    path = BASE_URL if page == 1 else f"{BASE_URL}/page-{page}"
+    return f"{path}?rankBy={RANKINGS[ranking]}&order=desc&minMarketCap=50000&maxAge={hours}"
+
+
+def _settings(pages: Optional[int], rankings: Optional[Sequence[str]]) -> Tuple[int, List[str]]:
+    pages = pages or int(os.getenv(PAGES_ENV, DEFAULT_PAGES))
+    if rankings is None:
+        rankings = [r.strip() for r in os.getenv(RANKINGS_ENV, DEFAULT_RANKINGS).split(",") if r.strip()]
+    unknown = [r for r in rankings if r not in RANKINGS]
+    if unknown:
+        raise ValueError(f"неизвестные рейтинги: {', '.join(unknown)} (есть {', '.join(RANKINGS)})")
+    return max(1, pages), list(dict.fromkeys(rankings))
+
+
+def fetch_pages(
+    hours: int,
+    dst_dir: Path,
+    pool: Optional[BrowserPool] = None,
+    pages: Optional[int] = None,
+    rankings: Optional[Sequence[str]] = None,
+) -> List[Path]:
     """
-    Загружает «горячую» страницу DexScreener, выдёргивает саму
-    таблицу (div.ds-dex-table.ds-dex-table-top) и сохраняет
-    HTML в dst_dir/page‑1.html. Возвращает список сохранённых файлов.
+    Загружает страницы «горячих» токенов DexScreener: `pages` страниц
+    каждого рейтинга из `rankings` (по умолчанию — из DEX_PAGES /
+    DEX_RANKINGS; без настроек — одна страница trendingScoreH6, как
+    раньше).  С каждой страницы сохраняется только таблица
+    (div.ds-dex-table.ds-dex-table-top) в dst_dir/<рейтинг>_page-<N>.html.
+
+    С `pool` страницы качаются параллельно на прогретых драйверах пула,
+    без него — по очереди одним драйвером.  Порядок результата — сначала
+    первые страницы всех рейтингов, потом вторые и т. д.: при дедупликации
+    выше остаются токены с верха рейтингов.  Неудачные страницы пропускаются.
     """
-    saved: List[Path] = []
-    driver = Driver(uc=True, headless=False)
+    pages, rankings = _settings(pages, rankings)
+    jobs = [(ranking, page) for page in range(1, pages + 1) for ranking in rankings]
+    dst_dir.mkdir(parents=True, exist_ok=True)
+
+    if pool is not None and len(jobs) > 1:
+        def work(job: Tuple[str, int]) -> Optional[Path]:
+            with borrow(pool) as driver:
+                return _fetch_top_page(driver, hours, dst_dir, *job)
+
+        with ThreadPoolExecutor(max_workers=min(pool.size, len(jobs))) as executor:
+            results = list(executor.map(work, jobs))
+    else:
+        with borrow(pool) as driver:
+            results = [_fetch_top_page(driver, hours, dst_dir, *job) for job in jobs]
+
+    saved = [path for path in results if path is not None]
+    if len(jobs) > 1:
+        print(f"[fetch_pages] страниц: {len(saved)} из {len(jobs)} "
+              f"(рейтинги: {', '.join(rankings)}; по {pages} стр.)")
+    return saved
+
 
+def _fetch_top_page(driver, hours: int, dst_dir: Path, ranking: str = "h6", page: int = 1) -> Optional[Path]:
     try:
-        url = (
-            "https://dexscreener.com/solana"
-            f"?rankBy=trendingScoreH6&order=desc&minMarketCap=50000&maxAge={hours}"
-        )
-        driver.get(url)
-        time.sleep(10)
-        driver.uc_gui_click_captcha()
-        time.sleep(10)
-        driver.refresh()
-
-        root = WebDriverWait(driver, 60).until(
-            EC.presence_of_element_located((By.ID, "root"))
-        )
-        custom_cwirlr = root.find_element(By.CSS_SELECTOR, "div.custom-cwirlr")
-        main_element = custom_cwirlr.find_element(By.CSS_SELECTOR, "main.custom-1ip3p22")
-        custom_a3 = main_element.find_element(By.CSS_SELECTOR, "div.custom-a3qv9n")
-
-        target_table = WebDriverWait(driver, 60).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "div.ds-dex-table.ds-dex-table-top"))
-        )
-
-        table_html = target_table.get_attribute("outerHTML")
+        url = page_url(hours, ranking, page)
+        # вместо фиксированных 10 + 10 сек: капчу решаем, только если она есть
+        state = SESSIONS.open(driver, url)
+        if state is not PageState.CONTENT:
+            raise RuntimeError(f"страница: {state.value}")
+
+        # один execute_script на опрос вместо цепочки find_element + get_attribute
+        table_html = wait_outer_html(driver, TOP_TABLE_CHAIN, timeout=60)
         # --------------------------------------
 
-        file_path = dst_dir / "page-1.html"
+        file_path = dst_dir / f"{ranking}_page-{page}.html"
         file_path.write_text(table_html, encoding="utf-8")
-        saved.append(file_path)
         print(f"[fetch_pages] сохранено → {file_path}")
+        return file_path
     except Exception as e:
-        print(f"Ошибка на странице: {e}")
-
-    finally:
-        driver.quit()
-
-    return saved
+        print(f"Ошибка на странице {ranking} #{page}: {e}")
+        return None
 
 
 def main(hours: int = 24, keep_interim: bool = False) -> None:
@@ -1,9 +1,10 @@
 
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from multiprocessing import Process
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 import time
 import os
@@ -13,6 +14,16 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from src.dexscraper.browser_pool import BrowserPool, borrow
+from src.dexscraper.cache import TOP_TRADERS, get_token_cache
+from src.dexscraper.extract_wallets import wallets_from_markup
+from src.dexscraper.session_manager import SESSIONS, PageState
+from src.dexscraper.parse_pages import normalize_token
+from src.dexscraper.dom_extract import TOP_TRADERS_CHAIN, TOP_TRADERS_READY, wait_outer_html
+
+TOKEN_URL = "https://dexscreener.com/solana/"
+NO_HTML = "None"        # _extract_top_traders не нашёл блок
+
 
 # ---------- вспомогательная логика DOM ---------------------------------
 def _extract_top_traders(driver: Driver) -> str:
@@ -25,34 +36,60 @@ def _extract_top_traders(driver: Driver) -> str:
             EC.element_to_be_clickable((By.XPATH, "//button[contains(., 'Top Traders')]"))
         )
         top_button.click()
-        time.sleep(2)
-
-        root = driver.find_element(By.ID, "root")
-        custom_cwirlr = root.find_element(By.CSS_SELECTOR, "div.custom-cwirlr")
-        main = custom_cwirlr.find_element(By.CSS_SELECTOR, "main.custom-1ip3p22")
-        c1 = main.find_element(By.CSS_SELECTOR, "div.custom-697dix")
-        c2 = c1.find_element(By.CSS_SELECTOR, "div.custom-1mgfq9c")
-        c3 = c2.find_element(By.CSS_SELECTOR, "div.custom-19qkkht")
-        c4 = c3.find_element(By.CSS_SELECTOR, "div.custom-1vjv7zm")
-        c5 = c4.find_element(By.CSS_SELECTOR, "div.custom-1mxzest")
-
-        return c5.get_attribute("outerHTML")
+
+        # вместо sleep(2) + восьми find_element: один JS-опрос до появления кошельков
+        return wait_outer_html(driver, TOP_TRADERS_CHAIN, ready=TOP_TRADERS_READY, timeout=10)
     except Exception as exc:
         print(f"[extract] Ошибка: {exc}")
-        return "None"
+        return NO_HTML
+
+
+def fetch_top_traders(driver: Driver, token: str) -> str:
+    """HTML блока Top Traders одного токена; две попытки, затем исключение."""
+    url = f"{TOKEN_URL}{token}"
+    for attempt in range(2):
+        try:
+            if SESSIONS.open(driver, url) is not PageState.CONTENT:
+                raise RuntimeError("страница не загрузилась")
+            return _extract_top_traders(driver)
+        except Exception as e:
+            if attempt:
+                raise
+            print(f"  ⚠️  ошибка: {e} — retry")
+
+
+# ---------- кэш Top Traders между run'ами ------------------------------
+def cached_top_traders(token: str) -> Optional[List[str]]:
+    """Кошельки токена, снятые за TTL кэша токенов; None — страницу нужно открыть."""
+    return get_token_cache().get(token, "", TOP_TRADERS)
+
+
+def remember_top_traders(token: str, html: str) -> List[str]:
+    """Кошельки из свежего блока Top Traders; удачный снимок кладётся в кэш."""
+    wallets = wallets_from_markup(html)
+    if html != NO_HTML:
+        get_token_cache().put(token, "", TOP_TRADERS, wallets)
+    return wallets
 
 
 # ---------- основная «работа» с одним txt-файлом -----------------------
-def _process_token_file(txt_file: Path, dst_root: Path, page_idx: int) -> None:
+def _process_token_file(
+    txt_file: Path,
+    dst_root: Path,
+    page_idx: int,
+    pool: Optional[BrowserPool] = None,
+) -> None:
     """
     Для каждого адреса токена из txt-файла:
       • открываем DexScreener,
       • вытягиваем блок Top Traders,
       • сохраняем в …/wallet_html/{N}_token_wallets.html.
+    Токены, снятые за TTL кэша токенов, не открываются: их кошельки
+    сразу пишутся в …/clear_wallets/{N}_token_wallets.txt.
     Ошибочные токены кладём в …/error_tokens/.
     """
     tokens = [
-        line.strip().replace("/solana/", "")
+        normalize_token(line)      # старые txt ещё с префиксом /solana/
         for line in txt_file.read_text(encoding="utf-8").splitlines()
         if line.strip()
     ]
@@ -62,55 +99,72 @@ def _process_token_file(txt_file: Path, dst_root: Path, page_idx: int) -> None:
 
     save_dir = dst_root / f"{page_idx}_page_tokens" / "wallet_html"
     err_dir = dst_root / f"{page_idx}_page_tokens" / "error_tokens"
+    clear_dir = dst_root / f"{page_idx}_page_tokens" / "clear_wallets"
     save_dir.mkdir(parents=True, exist_ok=True)
     err_dir.mkdir(parents=True, exist_ok=True)
 
-    driver = Driver(uc=True, headless=False)
     total = len(tokens)
 
+    # сначала кэш: драйвер берём, только если остались токены без снимка
+    pending = []
     for n, token in enumerate(tokens, 1):
-        url = f"https://dexscreener.com/solana/{token}"
-        print(f"[Page {page_idx}] [{n}/{total}] → {url}")
-        try:
-            driver.get(url)
-            time.sleep(3)
-            driver.uc_gui_click_captcha()
-
-            html = _extract_top_traders(driver)
-            (save_dir / f"{n}_token_wallets.html").write_text(html, encoding="utf-8")
-        except Exception as e1:                      # первая попытка
-            print(f"  ⚠️  ошибка: {e1} — retry")
-            try:
-                driver.get(url)
-                time.sleep(3)
-                driver.uc_gui_click_captcha()
-                time.sleep(3)
-
-                html = _extract_top_traders(driver)
-                (save_dir / f"{n}_token_wallets.html").write_text(html, encoding="utf-8")
-            except Exception as e2:                  # вторая попытка
-                print(f"  ❌ не смог: {e2}")
-                (err_dir / f"{n}_token.txt").write_text(token, encoding="utf-8")
-
-    driver.quit()
+        wallets = cached_top_traders(token)
+        if wallets is None:
+            pending.append((n, token))
+        elif wallets:
+            clear_dir.mkdir(exist_ok=True)
+            (clear_dir / f"{n}_token_wallets.txt").write_text("\n".join(wallets), encoding="utf-8")
+    if len(pending) < total:
+        print(f"[Page {page_idx}] из кэша Top Traders: {total - len(pending)} из {total} токенов")
+
+    if pending:
+        with borrow(pool) as driver:
+            for n, token in pending:
+                print(f"[Page {page_idx}] [{n}/{total}] → {TOKEN_URL}{token}")
+                try:
+                    html = fetch_top_traders(driver, token)
+                    (save_dir / f"{n}_token_wallets.html").write_text(html, encoding="utf-8")
+                    remember_top_traders(token, html)
+                except Exception as e2:                      # обе попытки неудачны
+                    print(f"  ❌ не смог: {e2}")
+                    (err_dir / f"{n}_token.txt").write_text(token, encoding="utf-8")
+
     print(f"[Page {page_idx}] ✅ завершено.")
 
 
 # ---------- публичная функция, вызываемая из pipeline ------------------
-def fetch_wallet_html(token_txt_files: List[Path], dst_dir: Path) -> List[Path]:
+def fetch_wallet_html(
+    token_txt_files: List[Path],
+    dst_dir: Path,
+    pool: Optional[BrowserPool] = None,
+) -> List[Path]:
     """
     Принимает список txt-файлов с адресами токенов и корневую папку `dst_dir`
     (обычно data/runs/<run_id>/interim).  Для каждого txt-файла
     создаёт подпапку `<N>_page_tokens/wallet_html` и запускает
-    парсинг в отдельном процессе.  Возвращает список созданных
-    каталогов wallet_html.
+    парсинг в отдельном процессе.  Если передан `pool`, файлы
+    обрабатываются потоками на прогретых драйверах пула.
+    Возвращает список созданных каталогов wallet_html.
     """
-    wallet_html_dirs: List[Path] = []
+    wallet_html_dirs: List[Path] = [
+        dst_dir / f"{idx}_page_tokens" / "wallet_html"
+        for idx in range(1, len(token_txt_files) + 1)
+    ]
+
+    if pool is not None:
+        with ThreadPoolExecutor(max_workers=pool.size) as executor:
+            futures = [
+                executor.submit(_process_token_file, txt, dst_dir, idx, pool)
+                for idx, txt in enumerate(token_txt_files, 1)
+            ]
+            for future in futures:
+                future.result()
+        print("[fetch_wallet_html] все потоки завершены.")
+        return wallet_html_dirs
+
     procs: List[Process] = []
 
     for idx, txt in enumerate(token_txt_files, 1):
-        wallet_html_dir = dst_dir / f"{idx}_page_tokens" / "wallet_html"
-        wallet_html_dirs.append(wallet_html_dir)
         p = Process(target=_process_token_file, args=(txt, dst_dir, idx))
         p.start()
         procs.append(p)
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, List, Set
+
+from sqlalchemy import select
+
+from src.db.models import Wallet
+from src.db.snapshots import stable_addresses
+
+IN_CHUNK = 5000   # адресов в одном IN (...) — один запрос на всю пачку
+STABLE_RECHECK_FACTOR = 4   # стабильные кошельки проверяются раз в 4 окна свежести
+
+
+def _fresh_addresses(session_factory: Callable, addresses: List[str], since: datetime) -> Set[str]:
+    """Адреса из `addresses`, проверенные в БД не раньше `since` (bulk-запросом)."""
+    fresh: Set[str] = set()
+    session = session_factory()
+    try:
+        for i in range(0, len(addresses), IN_CHUNK):
+            chunk = addresses[i : i + IN_CHUNK]
+            stmt = select(Wallet.address).where(
+                Wallet.address.in_(chunk),
+                Wallet.last_updated >= since,
+            )
+            fresh.update(session.scalars(stmt))
+    finally:
+        session.close()
+    return fresh
+
+
+def fresh_subset(
+    session_factory: Callable, addresses: List[str], max_age_hours: float, stable_hours: float = 0.0
+) -> Set[str]:
+    """
+    Адреса, проверенные за последние `max_age_hours` часов, и — при
+    `stable_hours` > 0 — адреса, чьи метрики по истории wallet_snapshots
+    не менялись дольше `stable_hours` часов.  Стабильный кошелёк всё равно
+    перепроверяется, если не проверялся дольше STABLE_RECHECK_FACTOR окон
+    свежести (без окна — окон `stable_hours`).  При ошибке БД — пустое множество.
+    """
+    if (max_age_hours <= 0 and stable_hours <= 0) or not addresses:
+        return set()
+    skip: Set[str] = set()
+    try:
+        if max_age_hours > 0:
+            since = datetime.now(timezone.utc) - timedelta(hours=max_age_hours)
+            skip = _fresh_addresses(session_factory, addresses, since)
+        if stable_hours > 0:
+            recheck_hours = STABLE_RECHECK_FACTOR * (max_age_hours if max_age_hours > 0 else stable_hours)
+            skip |= stable_addresses(session_factory, addresses, stable_hours, recheck_hours)
+    except Exception as e:
+        print(f"[filter_fresh] БД недоступна, фильтр пропущен: {e}")
+        return set()
+    return skip
+
+
+def filter_fresh_wallets(
+    src_file: Path,
+    dst_file: Path,
+    session_factory: Callable,
+    max_age_hours: float = 12.0,
+    mode: str = "drop",
+    stable_hours: float = 0.0,
+) -> Path:
+    """
+    Убирает (mode="drop") или переносит в конец списка (mode="deprioritize")
+    кошельки, которые уже проверялись за последние `max_age_hours` часов
+    или чьи метрики не менялись дольше `stable_hours` часов (0 — не учитывать).
+    Если БД недоступна — пишет список как есть.
+    Возвращает путь к dst_file.
+    """
+    addresses: List[str] = [
+        line.strip() for line in src_file.read_text(encoding="utf-8").splitlines() if line.strip()
+    ]
+
+    fresh = fresh_subset(session_factory, addresses, max_age_hours, stable_hours)
+
+    stale = [a for a in addresses if a not in fresh]
+    if mode == "deprioritize":
+        result = stale + [a for a in addresses if a in fresh]
+    else:
+        result = stale
+
+    dst_file.parent.mkdir(parents=True, exist_ok=True)
+    dst_file.write_text("\n".join(result) + "\n", encoding="utf-8")
+
+    action = "в конец списка" if mode == "deprioritize" else "убрано"
+    stable = f", стабильных > {stable_hours} ч" if stable_hours > 0 else ""
+    print(f"[filter_fresh] свежих (< {max_age_hours} ч{stable}): {len(fresh)} {action}, "
+          f"к проверке {len(stale)} → {dst_file}")
+    return dst_file
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.dexscraper.browser_pool import BrowserPool, borrow
+from src.dexscraper.session_manager import SESSIONS
+
+
+API_URL = "https://gmgn.ai/defi/quotation/v1/smartmoney/sol/walletNew/"
+CHALLENGE_URL = "https://gmgn.ai/"
+CLEARANCE_TTL = 25 * 60          # сек; cf_clearance живёт дольше, берём с запасом
+CHALLENGE_MARKERS = ("Just a moment", "cf-chl", "challenge-platform")
+
+
+@dataclass
+class Clearance:
+    """Куки и User-Agent браузера, прошедшего CF-капчу."""
+    cookies: List[dict] = field(default_factory=list)
+    user_agent: str = ""
+    expires_at: float = 0.0
+
+    @property
+    def expired(self) -> bool:
+        return time.time() >= self.expires_at
+
+
+def harvest_clearance(driver, url: str = CHALLENGE_URL, ttl: float = CLEARANCE_TTL) -> Clearance:
+    """Открывает `url` в UC-драйвере, проходит капчу (если она есть) и забирает куки + UA."""
+    SESSIONS.open(driver, url)
+
+    cookies = driver.get_cookies()
+    user_agent = driver.execute_script("return navigator.userAgent")
+
+    expires_at = min(time.time() + ttl, SESSIONS.expires_at(driver, url) or float("inf"))
+    return Clearance(cookies=cookies, user_agent=user_agent, expires_at=expires_at)
+
+
+def is_challenge(resp: requests.Response) -> bool:
+    if resp.headers.get("cf-mitigated") == "challenge":
+        return True
+    if resp.status_code in (403, 503):
+        return any(m in resp.text for m in CHALLENGE_MARKERS)
+    return False
+
+
+class GmgnHttpClient:
+    """
+    Прямой HTTP-клиент для walletNew JSON.
+
+    Капча решается один раз в UC-браузере (из пула или «холодном»),
+    дальше запросы идут через keep-alive пул соединений `requests`.
+    Браузер снова нужен только когда clearance истёк или сервер
+    вернул страницу-челлендж.
+    """
+
+    def __init__(
+        self,
+        pool: Optional[BrowserPool] = None,
+        max_connections: int = 32,
+        timeout: float = 10.0,
+        clearance_ttl: float = CLEARANCE_TTL,
+    ) -> None:
+        self.pool = pool
+        self.timeout = timeout
+        self.clearance_ttl = clearance_ttl
+        self.max_connections = max_connections
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_connections, max_retries=0)
+        self.session.mount("https://", adapter)
+
+        self._clearance = Clearance()
+        self._lock = threading.Lock()
+        self.solves = 0
+
+    # ---------- clearance ----------------------------------------------
+    def refresh(self, force: bool = False) -> None:
+        stale = self._clearance
+        with self._lock:
+            # другой поток мог уже обновить clearance, пока мы ждали lock
+            if self._clearance is not stale and not self._clearance.expired:
+                return
+            if not force and not self._clearance.expired:
+                return
+
+            with borrow(self.pool) as driver:
+                clearance = harvest_clearance(driver, ttl=self.clearance_ttl)
+
+            self.session.cookies.clear()
+            for c in clearance.cookies:
+                self.session.cookies.set(
+                    c["name"], c["value"], domain=c.get("domain", ""), path=c.get("path", "/")
+                )
+            self.session.headers.update({
+                "User-Agent": clearance.user_agent,
+                "Accept": "application/json, text/plain, */*",
+                "Referer": CHALLENGE_URL,
+            })
+            self._clearance = clearance
+            self.solves += 1
+            print(f"[gmgn_http] clearance обновлён (#{self.solves})")
+
+    # ---------- запросы ------------------------------------------------
+    def fetch_wallet(self, wallet_address: str, period: str) -> dict | None:
+        url = f"{API_URL}{wallet_address}?period={period}"
+
+        for attempt in range(3):
+            if self._clearance.expired:
+                self.refresh()
+            try:
+                resp = self.session.get(url, timeout=self.timeout)
+            except requests.RequestException as e:
+                print(f"[gmgn_http] {wallet_address}: {e}")
+                continue
+
+            if is_challenge(resp):
+                self.refresh(force=True)
+                continue
+            if resp.status_code == 429:
+                time.sleep(2 ** attempt)
+                continue
+            if resp.status_code != 200:
+                print(f"[gmgn_http] {wallet_address}: HTTP {resp.status_code}")
+                return None
+            try:
+                return resp.json()
+            except ValueError:
+                print(f"[gmgn_http] {wallet_address}: ответ не JSON")
+                return None
+
+        print(f"ERROR WHILE FETCHING DATA: {wallet_address}")
+        return None
+
+    def fetch_many(
+        self,
+        wallet_addresses: Iterable[str],
+        period: str,
+        workers: Optional[int] = None,
+    ) -> Iterator[Tuple[str, dict | None]]:
+        """Параллельно запрашивает кошельки, отдаёт (address, data) по мере готовности."""
+        self.refresh()
+        with ThreadPoolExecutor(max_workers=workers or self.max_connections) as executor:
+            futures = {
+                executor.submit(self.fetch_wallet, address, period): address
+                for address in wallet_addresses
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+    def close(self) -> None:
+        self.session.close()
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Set
+
+JOURNAL_NAME = "journal.jsonl"
+
+# статусы адреса на этапе
+DONE, FAILED, FILTERED = "done", "failed", "filtered"
+FINISHED = (DONE, FILTERED)
+
+# этапы, которые пишут в журнал
+STAGE_WALLET = "wallet_main"
+STAGE_ACTIVITY = "wallet_parse"
+
+
+class RunJournal:
+    """
+    Append-only журнал прогресса `data/runs/<run_id>/journal.jsonl`:
+    одна JSON-строка на событие (address, stage, status, ts).
+
+    Каждая запись — один os.write в файл с O_APPEND, поэтому писать могут
+    и потоки, и процессы одновременно.  Объект хранит только путь и
+    спокойно передаётся в multiprocessing.Process.
+    """
+
+    def __init__(self, run_path: Path) -> None:
+        self.path = Path(run_path) / JOURNAL_NAME
+
+    def record(self, address: str, stage: str, status: str) -> None:
+        line = json.dumps(
+            {"ts": round(time.time(), 3), "address": address, "stage": stage, "status": status},
+            ensure_ascii=False,
+        ) + "\n"
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode("utf-8"))
+        finally:
+            os.close(fd)
+
+    def records(self) -> Iterator[dict]:
+        if not self.path.exists():
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue      # недописанная строка после падения
+
+    def latest(self, stage: str) -> Dict[str, str]:
+        """Последний статус каждого адреса на этапе `stage`."""
+        status: Dict[str, str] = {}
+        for rec in self.records():
+            if rec.get("stage") == stage:
+                status[rec["address"]] = rec["status"]
+        return status
+
+    def completed(self, stage: str) -> Set[str]:
+        return {a for a, s in self.latest(stage).items() if s in FINISHED}
+
+    def pending(self, addresses: Iterable[str], stage: str) -> List[str]:
+        """Адреса, которые на этапе `stage` ещё не done/filtered."""
+        done = self.completed(stage)
+        return [a for a in addresses if a not in done]
+
+    def summary(self, stage: str) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for s in self.latest(stage).values():
+            counts[s] = counts.get(s, 0) + 1
+        return counts
@@ -1,29 +1,97 @@
-
 from __future__ import annotations
 
+from html.parser import HTMLParser
 from pathlib import Path
-from typing import List
-from bs4 import BeautifulSoup
+from typing import Iterable, Iterator, List, Optional, Set
+
+TOKEN_PREFIX = "/solana/"
+READ_CHUNK = 64 * 1024
+
+
+def normalize_token(href: str) -> str:
+    """'/solana/<addr>?x#y' → '<addr>'; голый адрес возвращается как есть."""
+    token = href.strip()
+    if token.startswith(TOKEN_PREFIX):
+        token = token[len(TOKEN_PREFIX):]
+    for sep in ("?", "#"):
+        token = token.split(sep, 1)[0]
+    return token.strip("/")
+
+
+class _TokenHrefParser(HTMLParser):
+    """Собирает href вида /solana/<addr> по мере поступления HTML, без дерева."""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.found: List[str] = []
+
+    def handle_starttag(self, tag, attrs) -> None:
+        if tag != "a":
+            return
+        for name, value in attrs:
+            if name == "href" and value and value.startswith(TOKEN_PREFIX):
+                self.found.append(value)
+                return
+
+
+def iter_page_tokens(html_file: Path, seen: Optional[Set[str]] = None) -> Iterator[str]:
+    """
+    Адреса токенов одной страницы — по мере чтения файла кусками.
+    `seen` — общий для нескольких страниц набор: уже встреченные адреса
+    пропускаются и в него же добавляются новые.
+    """
+    seen = set() if seen is None else seen
+    parser = _TokenHrefParser()
+    with open(html_file, "r", encoding="utf-8") as f:
+        while True:
+            chunk = f.read(READ_CHUNK)
+            if chunk:
+                parser.feed(chunk)
+            else:
+                parser.close()
+            for href in parser.found:
+                token = normalize_token(href)
+                if token and token not in seen:
+                    seen.add(token)
+                    yield token
+            parser.found.clear()
+            if not chunk:
+                return
+
+
+def iter_token_addresses(html_files: Iterable[Path]) -> Iterator[str]:
+    """Уникальные адреса токенов со всех страниц подряд (дубли между страницами отброшены)."""
+    seen: Set[str] = set()
+    for html_file in html_files:
+        yield from iter_page_tokens(html_file, seen)
 
 
-def parse_token_addresses(html_files: List[Path], dst_dir: Path) -> List[Path]:
+def parse_token_addresses(html_files: List[Path], dst_dir: Path, parts: Optional[int] = None) -> List[Path]:
     """
     Принимает список HTML-файлов (страниц DexScreener),
-    извлекает адреса токенов вида `/solana/<addr>` и
-    сохраняет их постранично в `dst_dir/page-<N>_tokens.txt`.
+    извлекает адреса токенов из ссылок `/solana/<addr>` и
+    сохраняет их постранично в `dst_dir/page-<N>_tokens.txt`
+    (без префикса, без повторов — ни внутри страницы, ни между страницами).
+
+    `parts` — вместо раскладки по страницам разложить общий список
+    токенов по `parts` файлам поровну (по кругу, чтобы в каждый попали
+    токены и с верха, и с низа рейтингов): fetch_wallet_html отдаёт
+    по файлу на поток, и страницы, почти целиком состоящие из дублей,
+    не оставляют потоки без работы.
 
     Возвращает список созданных txt-файлов.
     """
-    token_txts: List[Path] = []
-
-    for idx, html_file in enumerate(html_files, 1):
-        soup = BeautifulSoup(html_file.read_text(encoding="utf-8"), "html.parser")
-        addresses = [
-            a["href"]
-            for a in soup.find_all("a", href=True)
-            if a["href"].startswith("/solana/")
-        ]
+    if parts:
+        tokens = list(iter_token_addresses(html_files))
+        n = max(1, min(parts, len(tokens)))
+        groups = [tokens[i::n] for i in range(n)]
+        print(f"[parse_pages] {len(tokens)} уникальных адресов с {len(html_files)} страниц → {n} файлов")
+    else:
+        seen: Set[str] = set()
+        groups = [list(iter_page_tokens(html_file, seen)) for html_file in html_files]
 
+    token_txts: List[Path] = []
+    for idx, addresses in enumerate(groups, 1):
         out_file = dst_dir / f"page-{idx}_tokens.txt"
         out_file.parent.mkdir(parents=True, exist_ok=True)
         out_file.write_text("\n".join(addresses), encoding="utf-8")
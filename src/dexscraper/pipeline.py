@@ -2,41 +2,105 @@ from __future__ import annotations
 
 import argparse
 import multiprocessing
+import os
 import shutil
+import time
 
 
-from src.dexscraper.utils import create_run_dir, cleanup_old_runs
-from src.dexscraper.fetch_pages import fetch_pages
+from typing import Optional
+
+from src.dexscraper.utils import create_run_dir, open_run_dir, cleanup_old_runs
+from src.dexscraper.browser_pool import BrowserPool
+from src.dexscraper.cache import get_cache, get_token_cache, stats_delta, TTL_ENV, TOKEN_TTL_ENV
+from src.dexscraper.journal import RunJournal, STAGE_WALLET, STAGE_ACTIVITY
+from src.dexscraper.fetch_pages import fetch_pages, PAGES_ENV, RANKINGS, RANKINGS_ENV
 from src.dexscraper.parse_pages import parse_token_addresses
 from src.dexscraper.fetch_wallet_html import fetch_wallet_html
 from src.dexscraper.extract_wallets import extract_wallets
 from src.dexscraper.merge_wallets import merge_wallets
 from src.dexscraper.remove_duplicates import deduplicate_wallets   # ← добавили
-from src.dexscraper.wallet_main import wallet_main
+from src.dexscraper.filter_fresh import filter_fresh_wallets
+from src.dexscraper.wallet_main import wallet_main, make_session_factory
 from src.dexscraper.wallet_parse_main import wallet_parse_main
-
-def run_pipeline(hours: int, keep_interim: bool) -> None:
-    run_id, run_path = create_run_dir()
-    print(f"=== RUN {run_id} started ===")
+from src.dexscraper.stream_pipeline import run_stream
+from src.dexscraper.columnar import export_run
+
+def run_pipeline(
+    hours: int,
+    keep_interim: bool,
+    browsers: int = 4,
+    fetch_mode: str = "browser",
+    resume: Optional[str] = None,
+    fresh_hours: float = 12.0,
+    fresh_mode: str = "drop",
+    activity_source: str = "dom",
+    two_stage: bool = False,
+    stream: bool = False,
+    stable_hours: float = 0.0,
+) -> None:
+    if resume:
+        run_id, run_path = open_run_dir(resume)
+        print(f"=== RUN {run_id} resumed ===")
+    else:
+        run_id, run_path = create_run_dir()
+        print(f"=== RUN {run_id} started ===")
 
     raw_dir       = run_path / "raw"
     interim_dir   = run_path / "interim"
     processed_dir = run_path / "processed"
-
-
-    html_pages     = fetch_pages(hours, raw_dir)
-    token_txts     = parse_token_addresses(html_pages, interim_dir)
-    wallet_dirs    = fetch_wallet_html(token_txts, interim_dir)
-    clear_txts     = extract_wallets(wallet_dirs, interim_dir)
-    merged_file    = merge_wallets(clear_txts, processed_dir / "merged_wallets.txt")
-
-
-    final_file = deduplicate_wallets(merged_file, processed_dir / "list.txt")
-
-    list_wallets = wallet_main(final_file, processed_dir / "results.txt")
-
-    wallet_parse_main(list_wallets, run_path)
-
+    journal       = RunJournal(run_path)
+    final_file    = processed_dir / "list.txt"
+    check_file    = processed_dir / "to_check.txt"
+    cache_before  = get_cache().stats()
+    tokens_before = get_token_cache().stats()
+    started       = time.time()
+
+    # один пул прогретых браузеров на весь run; browsers=0 — старый режим
+    use_cdp = activity_source == "cdp"
+    pool = BrowserPool(size=browsers, log_cdp=use_cdp).start() if browsers > 0 else None
+
+    try:
+        if stream:
+            # этапы перекрываются: кошельки первых токенов оцениваются, пока качаются следующие
+            list_wallets = run_stream(
+                hours, run_path, pool, journal, fetch_mode, fresh_hours, stable_hours=stable_hours
+            )
+        else:
+            # при --resume сбор адресов повторяем, только если list.txt ещё не был записан
+            if not (resume and final_file.exists()):
+                html_pages     = fetch_pages(hours, raw_dir, pool)
+                # с пулом — по файлу токенов на браузер, чтобы потоки Top Traders были загружены поровну
+                token_txts     = parse_token_addresses(
+                    html_pages, interim_dir, parts=pool.size if pool is not None else None
+                )
+                wallet_dirs    = fetch_wallet_html(token_txts, interim_dir, pool)
+                clear_txts     = extract_wallets(wallet_dirs, interim_dir)
+                merged_file    = merge_wallets(clear_txts, processed_dir / "merged_wallets.txt")
+
+
+                final_file = deduplicate_wallets(merged_file, final_file)
+
+            # недавно проверенные кошельки не тратят время браузера
+            if not (resume and check_file.exists()):
+                check_file = filter_fresh_wallets(
+                    final_file, check_file, make_session_factory(), fresh_hours, fresh_mode, stable_hours
+                )
+
+            list_wallets = wallet_main(check_file, processed_dir / "results.txt", pool, fetch_mode, journal)
+
+        # снимки кладутся в processed/activity_snapshots и переживают очистку interim
+        wallet_parse_main(
+            list_wallets, processed_dir / "clear_results.txt", pool, journal, use_cdp, two_stage=two_stage
+        )
+    finally:
+        if pool is not None:
+            pool.close()
+
+    # типизированные колонки run'а для анализа нескольких run'ов (columnar.load_runs)
+    try:
+        export_run(run_path)
+    except Exception as e:
+        print(f"[columnar] экспорт не удался: {e}")
 
     if not keep_interim:
         shutil.rmtree(raw_dir, ignore_errors=True)
@@ -45,15 +109,68 @@ def run_pipeline(hours: int, keep_interim: bool) -> None:
 
     #cleanup_old_runs(keep=3)
 
-    print(f"=== RUN {run_id} finished — final file: {final_file} ===")
+    print(stats_delta(cache_before, get_cache().stats()))
+    tokens_after = get_token_cache().stats()
+    print(f"{stats_delta(tokens_before, tokens_after, 'token_cache')}, "
+          f"сэкономлено загрузок страниц: {tokens_after['hit'] - tokens_before['hit']}")
+    print(f"[journal] gmgn: {journal.summary(STAGE_WALLET)}, activity: {journal.summary(STAGE_ACTIVITY)}")
+    print(f"=== RUN {run_id} finished in {time.time() - started:.0f} s — final file: {final_file} ===")
 
 
 def _cli() -> None:
     parser = argparse.ArgumentParser(description="DexScreener scraping pipeline")
     parser.add_argument("--hours", type=int, default=12, help="максимальный возраст токенов (часы)")
     parser.add_argument("--keep-interim", action="store_true", help="не удалять raw & interim после выполнения")
+    parser.add_argument("--browsers", type=int, default=4, help="размер пула браузеров (0 — драйвер на каждый этап)")
+    parser.add_argument("--pages", type=int, metavar="N",
+                        help="сколько страниц каждого рейтинга DexScreener загружать (по умолчанию 1)")
+    parser.add_argument("--rank-by", metavar="LIST",
+                        help=f"рейтинги через запятую: {', '.join(RANKINGS)} (по умолчанию h6)")
+    parser.add_argument("--fetch-mode", choices=("browser", "http", "async"), default="browser",
+                        help="как получать walletNew JSON: браузером или напрямую по HTTP")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="продолжить run из data/runs/<RUN_ID>: только незавершённые адреса")
+    parser.add_argument("--cache-ttl", type=float, metavar="HOURS",
+                        help="TTL кэша gmgn-ответов в часах (0 — не использовать кэш)")
+    parser.add_argument("--token-ttl", type=float, metavar="HOURS",
+                        help="не открывать Top Traders токенов, снятых за N часов (0 — выкл.)")
+    parser.add_argument("--fresh-hours", type=float, default=12.0,
+                        help="не проверять кошельки, обновлённые в БД за последние N часов (0 — выкл.)")
+    parser.add_argument("--fresh-mode", choices=("drop", "deprioritize"), default="drop",
+                        help="свежие кошельки убрать или поставить в конец очереди")
+    parser.add_argument("--stable-hours", type=float, default=0.0,
+                        help="реже проверять кошельки, чьи метрики не менялись N часов (0 — выкл.)")
+    parser.add_argument("--activity-source", choices=("dom", "cdp"), default="dom",
+                        help="метрики активности: разбор таблицы (dom) или перехват JSON через CDP")
+    parser.add_argument("--stream", action="store_true",
+                        help="этапы сбора и оценки gmgn работают одновременно через ограниченные очереди")
+    parser.add_argument("--two-stage", action="store_true",
+                        help="браузеры только снимают таблицы активности, метрики считает пул процессов")
     args = parser.parse_args()
-    run_pipeline(hours=args.hours, keep_interim=args.keep_interim)
+    if args.cache_ttl is not None:
+        os.environ[TTL_ENV] = str(args.cache_ttl)   # увидят и дочерние процессы
+    if args.token_ttl is not None:
+        os.environ[TOKEN_TTL_ENV] = str(args.token_ttl)
+    if args.pages is not None:
+        os.environ[PAGES_ENV] = str(args.pages)
+    if args.rank_by is not None:
+        unknown = [r for r in args.rank_by.split(",") if r.strip() and r.strip() not in RANKINGS]
+        if unknown:
+            parser.error(f"--rank-by: неизвестные рейтинги {', '.join(unknown)}")
+        os.environ[RANKINGS_ENV] = args.rank_by
+    run_pipeline(
+        hours=args.hours,
+        keep_interim=args.keep_interim,
+        browsers=args.browsers,
+        fetch_mode=args.fetch_mode,
+        resume=args.resume,
+        fresh_hours=args.fresh_hours,
+        fresh_mode=args.fresh_mode,
+        activity_source=args.activity_source,
+        two_stage=args.two_stage,
+        stream=args.stream,
+        stable_hours=args.stable_hours,
+    )
 
 if __name__ == "__main__":
     multiprocessing.freeze_support()
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Iterator, List, Union
+
+PathLike = Union[str, Path]
+
+
+# ---------- запись -------------------------------------------------------
+def append_record(path: PathLike, record: dict) -> None:
+    """
+    Одна компактная JSON-строка на запись, одним os.write в файл с
+    O_APPEND: строки разных потоков и процессов не перемешиваются,
+    блокировка не нужна (как в RunJournal).
+    """
+    line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line.encode("utf-8"))
+    finally:
+        os.close(fd)
+
+
+# ---------- чтение -------------------------------------------------------
+def iter_records(path: PathLike) -> Iterator[dict]:
+    """
+    Потоковое чтение results: по строке за раз, память не зависит от
+    размера файла.  Понимает и новый формат (JSON на строку), и старый
+    (indent=4, объект на несколько строк), в том числе их смесь —
+    когда --resume дописал новые записи в старый файл.
+    """
+    legacy: List[str] = []
+    inside = False
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            stripped = line.strip()
+            if not stripped:
+                continue
+
+            if stripped.startswith("{"):
+                if stripped.endswith("}"):
+                    try:
+                        yield json.loads(stripped)
+                        inside = False
+                        continue
+                    except ValueError:
+                        pass
+                inside, legacy = True, [stripped]      # начало многострочного объекта
+            elif stripped.endswith("}"):
+                legacy.append(stripped)
+                inside = False
+                text = "\n".join(legacy)
+                legacy = []
+                try:
+                    yield json.loads(text)
+                except ValueError as e:
+                    print(f"Ошибка парсинга:\n{text}\n{e}")
+            elif inside:
+                legacy.append(stripped)
+
+
+def read_records(path: PathLike) -> List[dict]:
+    return list(iter_records(path))
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Пакетный подсчёт метрик активности сразу для многих кошельков.
+# Строки всех кошельков склеиваются в один плоский массив + offsets
+# (границы кошельков, как в CSR), разбираются одним векторным проходом,
+# а перцентили и счётчики считаются по сегментам без цикла по кошелькам.
+
+# делим/умножаем как _duration_to_hours — иначе 42m и 0.7h разойдутся в последнем бите
+DURATION_DIVISOR = {"s": 3600.0, "m": 60.0, "h": 1.0, "d": 1.0}
+DURATION_FACTOR = {"d": 24.0}
+DURATION_SECONDS = {"s": 1.0, "m": 60.0, "h": 3600.0, "d": 86400.0}
+PROFIT_MULTIPLIER = {"K": 1e3, "M": 1e6, "B": 1e9}
+
+# Определения счётчиков профита — общие для DOM (здесь) и CDP (cdp_capture):
+#   profit_trades — сделки, у которых есть значение PnL, любого знака;
+#   good_profit   — PnL > GOOD_PROFIT_PCT %, rockets — PnL > ROCKET_PCT %.
+FAST_TRADE_SECONDS = 120
+GOOD_PROFIT_PCT = 40
+ROCKET_PCT = 1000
+
+DAILY_HOURS, NORMAL_HOURS = 24, 168
+
+
+# ---------- плоские массивы ----------------------------------------------
+def flatten(groups: Sequence[Sequence[str]]) -> Tuple[List[str], np.ndarray]:
+    """[[a, b], [], [c]] → ([a, b, c], offsets=[0, 2, 2, 3])."""
+    flat = [s for group in groups for s in group]
+    offsets = np.zeros(len(groups) + 1, dtype=np.int64)
+    np.cumsum([len(g) for g in groups], out=offsets[1:])
+    return flat, offsets
+
+
+def segment_ids(offsets: np.ndarray) -> np.ndarray:
+    """Номер кошелька для каждого элемента плоского массива."""
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+# ---------- векторный разбор строк ---------------------------------------
+def _char_matrix(strings: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Строки → матрица кодов символов (n × ширина) и длины без пробелов по краям."""
+    arr = np.char.strip(np.asarray(strings, dtype=str))
+    if arr.size == 0:
+        return np.zeros((0, 1), dtype=np.uint32), np.zeros(0, dtype=np.int64)
+    width = max(arr.dtype.itemsize // 4, 1)
+    mat = np.ascontiguousarray(arr, dtype=f"U{width}").view(np.uint32).reshape(len(arr), width)
+    return mat, np.char.str_len(arr)
+
+
+def _numbers(mat: np.ndarray) -> np.ndarray:
+    """
+    Число из каждой строки матрицы: все цифры до и после первой точки,
+    прочие символы ('+', '%', '$', ',', пробелы, суффикс) игнорируются.
+    Ведущий '-' даёт отрицательное значение; без цифр — NaN.
+
+    Прежний разбор (re.sub(r"[^0-9.]", "", ...)) знак терял, и убыток
+    "-58%" засчитывался в good_profit как +58 %.  Теперь убытки в
+    good_profit не попадают — good_profit/good_ratio у кошельков с
+    крупными убытками ниже, чем в записях, посчитанных до этого;
+    rockets не меняются (убыток не бывает больше 100 %).
+    """
+    digit = mat - ord("0")
+    is_digit = (mat >= ord("0")) & (mat <= ord("9"))
+    is_dot = mat == ord(".")
+    has_dot = is_dot.any(axis=1)
+    dot_pos = np.where(has_dot, is_dot.argmax(axis=1), mat.shape[1])
+
+    # целая мантисса из всех цифр, затем одно деление на 10^(цифр после точки):
+    # так результат совпадает с float("1.5") бит в бит
+    count = np.cumsum(is_digit, axis=1)                       # цифр слева, включительно
+    total = count[:, -1]
+    cols = np.arange(mat.shape[1])
+    int_digits = np.where(cols[None, :] < dot_pos[:, None], is_digit, False).sum(axis=1)
+    exponent = np.clip(total[:, None] - count, 0, None)
+    mantissa = np.where(is_digit, digit * np.power(10.0, exponent), 0.0).sum(axis=1)
+    values = mantissa / np.power(10.0, total - int_digits)
+
+    first = mat[:, 0] if mat.shape[1] else np.zeros(len(mat), dtype=np.uint32)
+    values = np.where(first == ord("-"), -values, values)
+    return np.where(is_digit.any(axis=1), values, np.nan)
+
+
+def _last_char(mat: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    idx = np.clip(lengths - 1, 0, None)
+    last = mat[np.arange(len(mat)), idx] if len(mat) else np.zeros(0, dtype=np.uint32)
+    return np.where(lengths > 0, last, 0)
+
+
+def _suffix_scale(codes: np.ndarray, table: Dict[str, float], default: float = 1.0) -> np.ndarray:
+    scale = np.full(codes.shape, default, dtype=float)
+    for char, factor in table.items():
+        scale[codes == ord(char)] = factor
+    return scale
+
+
+def parse_durations(strings: Sequence[str]) -> np.ndarray:
+    """'40s' / '25m' / '1.5h' / '3d' → часы; '--', пустое и без суффикса — NaN."""
+    mat, lengths = _char_matrix(strings)
+    suffix = _last_char(mat, lengths)
+    divisor = _suffix_scale(suffix, DURATION_DIVISOR, np.nan)
+    return _numbers(mat) * _suffix_scale(suffix, DURATION_FACTOR) / divisor
+
+
+def parse_duration_seconds(strings: Sequence[str]) -> np.ndarray:
+    """То же в секундах (для порога быстрых сделок без погрешности перевода)."""
+    mat, lengths = _char_matrix(strings)
+    return _numbers(mat) * _suffix_scale(_last_char(mat, lengths), DURATION_SECONDS, np.nan)
+
+
+def parse_profits(strings: Sequence[str]) -> np.ndarray:
+    """'+58%' / '1.2K%' / '-3.4M%' / '2B' → проценты с учётом K/M/B и знака; без цифр — NaN."""
+    mat, lengths = _char_matrix(strings)
+    last = _last_char(mat, lengths)
+    # суффикс стоит перед '%': смотрим последний символ без него
+    before_pct = _last_char(mat, np.where(last == ord("%"), lengths - 1, lengths))
+    return _numbers(mat) * _suffix_scale(before_pct, PROFIT_MULTIPLIER)
+
+
+# ---------- статистика по сегментам --------------------------------------
+def segment_percentile(values: np.ndarray, segments: np.ndarray, n: int, q: float) -> np.ndarray:
+    """
+    q-й перцентиль (линейная интерполяция, как np.percentile) в каждом из
+    `n` сегментов; NaN в пустых.  `values` в сегменте могут быть не отсортированы.
+    """
+    out = np.full(n, np.nan)
+    if values.size == 0:
+        return out
+    order = np.lexsort((values, segments))
+    values, segments = values[order], segments[order]
+    counts = np.bincount(segments, minlength=n)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    filled = counts > 0
+    rank = q / 100 * (counts[filled] - 1)
+    lo = np.floor(rank).astype(np.int64)
+    hi = np.ceil(rank).astype(np.int64)
+    base = starts[filled]
+    out[filled] = values[base + lo] + (values[base + hi] - values[base + lo]) * (rank - lo)
+    return out
+
+
+def interval_q75(hours: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """
+    75-й перцентиль положительных интервалов между отсортированными
+    отметками каждого кошелька (как median_interval_and_label).  NaN,
+    если отметок меньше двух или все интервалы нулевые.
+    """
+    n = len(offsets) - 1
+    segments = segment_ids(offsets)
+    valid = ~np.isnan(hours)
+    hours, segments = hours[valid], segments[valid]
+
+    order = np.lexsort((hours, segments))
+    hours, segments = hours[order], segments[order]
+    deltas = np.diff(hours)
+    keep = (segments[1:] == segments[:-1]) & (deltas > 0)
+    return segment_percentile(deltas[keep], segments[1:][keep], n, 75)
+
+
+def labels_for(q75: np.ndarray) -> np.ndarray:
+    return np.select(
+        [np.isnan(q75), q75 <= DAILY_HOURS, q75 <= NORMAL_HOURS],
+        ["UNKNOWN", "DAILY", "NORMAL"],
+        default="RARE",
+    )
+
+
+def segment_count(mask: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Число True в каждом сегменте."""
+    n = len(offsets) - 1
+    return np.bincount(segment_ids(offsets)[mask], minlength=n) if mask.size else np.zeros(n, dtype=np.int64)
+
+
+# ---------- пакетный API --------------------------------------------------
+def score_wallets(
+    buy_durations: Sequence[Sequence[str]],
+    hold_durations: Sequence[Sequence[str]],
+    profits: Sequence[Sequence[str]],
+    trade_counts: Sequence[int],
+) -> Dict[str, np.ndarray]:
+    """
+    Метрики для всех кошельков за один проход.  i-й элемент каждого
+    списка — сырые строки i-го кошелька: давность покупок, время
+    удержания, профит.  Возвращает массивы длины «число кошельков»:
+    rockets, profit_trades, good_profit, fast_trades, fast_pct, q75, label.
+    """
+    buy_flat, buy_off = flatten(buy_durations)
+    hold_flat, hold_off = flatten(hold_durations)
+    profit_flat, profit_off = flatten(profits)
+
+    hold_seconds = parse_duration_seconds(hold_flat)
+    profit_pct = parse_profits(profit_flat)
+    q75 = interval_q75(parse_durations(buy_flat), buy_off)
+
+    trades = np.asarray(trade_counts, dtype=float)
+    fast = segment_count((hold_seconds > 0) & (hold_seconds < FAST_TRADE_SECONDS), hold_off)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fast_pct = np.where(trades > 0, fast / trades * 100, np.nan)
+
+    return {
+        "rockets": segment_count(profit_pct > ROCKET_PCT, profit_off),
+        "profit_trades": segment_count(~np.isnan(profit_pct), profit_off),
+        "good_profit": segment_count(profit_pct > GOOD_PROFIT_PCT, profit_off),
+        "fast_trades": fast,
+        "fast_pct": fast_pct,
+        "q75": q75,
+        "label": labels_for(q75),
+    }
+
+
+def score_tables(tables: Sequence[dict]) -> List[tuple]:
+    """
+    Снимки dom_extract.activity_rows → кортежи в формате count_rockets:
+    (rockets, trades, "fast %", profit_trades, good_profit, q75 | None, label).
+    """
+    buys, holds, profits = [], [], []
+    for table in tables:
+        rows = table["rows"]
+        buys.append([r["duration"] for r in rows if r["duration"] is not None])
+        holds.append([h for r in rows for c in r["cells"] for h in c["holds"]])
+        profits.append([p for r in rows for c in r["cells"] for div in c["profits"] for p in div])
+
+    totals = [table["total"] for table in tables]
+    scores = score_wallets(buys, holds, profits, totals)
+
+    results: List[tuple] = []
+    for i, total in enumerate(totals):
+        fast_display = f"{round(float(scores['fast_pct'][i]), 1)}%" if total > 0 else 0
+        q75 = scores["q75"][i]
+        results.append((
+            int(scores["rockets"][i]),
+            total,
+            fast_display,
+            int(scores["profit_trades"][i]),
+            int(scores["good_profit"][i]),
+            None if np.isnan(q75) else float(q75),
+            str(scores["label"][i]),
+        ))
+    return results
+
+
+def interval_label(hours: Sequence[float]) -> Tuple[Optional[float], str]:
+    """(q75, label) для одного кошелька по уже посчитанным часам."""
+    q75 = interval_q75(np.asarray(hours, dtype=float), np.array([0, len(hours)]))
+    return (None if np.isnan(q75[0]) else float(q75[0])), str(labels_for(q75)[0])
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import Counter
+from enum import Enum
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+
+CLEARANCE_TTL = 25 * 60      # сек, если cf_clearance не сообщил свой expiry
+
+# Один round-trip: заголовок, признаки CF-челленджа и начало текста страницы.
+_PROBE_JS = """
+const challenge = !!document.querySelector(
+    'iframe[src*="challenges.cloudflare.com"], #challenge-form, #cf-chl-widget,' +
+    ' [name="cf-turnstile-response"], script[src*="/cdn-cgi/challenge-platform/"]'
+);
+const body = document.body ? document.body.innerText.slice(0, 400) : "";
+return [document.title || "", challenge, body, document.readyState];
+"""
+
+CHALLENGE_TITLES = ("Just a moment", "Один момент", "Attention Required")
+ERROR_MARKERS = (
+    "Access denied",
+    "Error code",
+    "error code:",
+    "502 Bad Gateway",
+    "504 Gateway",
+    "This site can’t be reached",
+    "ERR_",
+)
+
+
+class PageState(str, Enum):
+    CHALLENGE = "challenge"
+    ERROR = "error"
+    CONTENT = "content"
+
+
+def _host(url: str) -> str:
+    host = urlparse(url).hostname or ""
+    parts = host.split(".")
+    return ".".join(parts[-2:]) if len(parts) > 2 else host
+
+
+def classify_page(driver) -> PageState:
+    """Определяет, что сейчас открыто: CF-челлендж, страница ошибки или контент."""
+    try:
+        title, challenge, body, _ = driver.execute_script(_PROBE_JS)
+    except Exception:
+        return PageState.ERROR
+
+    if challenge or any(t in title for t in CHALLENGE_TITLES):
+        return PageState.CHALLENGE
+    if any(m in title or m in body for m in ERROR_MARKERS):
+        return PageState.ERROR
+    return PageState.CONTENT
+
+
+class SessionManager:
+    """
+    Решает CF-капчу только тогда, когда она действительно на странице.
+
+    • `open(driver, url)` — загрузить url и вернуть PageState;
+    • для каждого (драйвер, host) помнит, когда истекает clearance;
+    • считает решённые / нерешённые капчи по host-ам.
+    Экземпляр потокобезопасен; в каждом процессе свой (SESSIONS).
+    """
+
+    def __init__(
+        self,
+        clearance_ttl: float = CLEARANCE_TTL,
+        auto_pass_wait: float = 5.0,
+        solve_timeout: float = 20.0,
+        poll: float = 0.5,
+    ) -> None:
+        self.clearance_ttl = clearance_ttl
+        self.auto_pass_wait = auto_pass_wait
+        self.solve_timeout = solve_timeout
+        self.poll = poll
+
+        self._expires: Dict[Tuple[int, str], float] = {}
+        self._lock = threading.Lock()
+        self.solves: Counter = Counter()
+        self.failures: Counter = Counter()
+
+    # ---------- публичное API -----------------------------------------
+    def open(self, driver, url: str) -> PageState:
+        driver.get(url)
+        return self.ensure(driver, url)
+
+    def ensure(self, driver, url: Optional[str] = None) -> PageState:
+        """Проверяет текущую страницу и проходит челлендж, если он есть."""
+        host = _host(url or driver.current_url)
+        state = classify_page(driver)
+
+        if state is PageState.CHALLENGE:
+            # неинтерактивный челлендж часто проходит сам за пару секунд
+            state = self._wait_while_challenge(driver, self.auto_pass_wait)
+        if state is PageState.CHALLENGE:
+            state = self._solve(driver, host)
+        if state is PageState.CONTENT and not self.has_clearance(driver, host):
+            self._mark_cleared(driver, host)
+        return state
+
+    def has_clearance(self, driver, host_or_url: str) -> bool:
+        return self.expires_at(driver, host_or_url) > time.time()
+
+    def expires_at(self, driver, host_or_url: str) -> float:
+        host = _host(host_or_url) if "://" in host_or_url else host_or_url
+        with self._lock:
+            return self._expires.get((id(driver), host), 0.0)
+
+    def forget(self, driver) -> None:
+        """Сбрасывает clearance драйвера (например, после перезапуска)."""
+        with self._lock:
+            for key in [k for k in self._expires if k[0] == id(driver)]:
+                del self._expires[key]
+
+    def summary(self) -> str:
+        hosts = sorted(set(self.solves) | set(self.failures))
+        if not hosts:
+            return "[session_manager] капч не встречалось"
+        stats = ", ".join(f"{h}: {self.solves[h]} решено / {self.failures[h]} нет" for h in hosts)
+        return f"[session_manager] {stats}"
+
+    # ---------- внутреннее --------------------------------------------
+    def _wait_while_challenge(self, driver, timeout: float) -> PageState:
+        deadline = time.time() + timeout
+        state = classify_page(driver)
+        while state is PageState.CHALLENGE and time.time() < deadline:
+            time.sleep(self.poll)
+            state = classify_page(driver)
+        return state
+
+    def _solve(self, driver, host: str) -> PageState:
+        state = PageState.CHALLENGE
+        for _ in range(3):
+            try:
+                driver.uc_gui_click_captcha()
+            except Exception as e:
+                print(f"[session_manager] клик по капче не удался: {e}")
+            state = self._wait_while_challenge(driver, self.solve_timeout)
+            if state is not PageState.CHALLENGE:
+                with self._lock:
+                    self.solves[host] += 1
+                self._mark_cleared(driver, host)
+                return state
+
+        with self._lock:
+            self.failures[host] += 1
+        print(f"[session_manager] не удалось пройти капчу на {host}")
+        return state
+
+    def _mark_cleared(self, driver, host: str) -> None:
+        expires = time.time() + self.clearance_ttl
+        try:
+            for c in driver.get_cookies():
+                if c.get("name") == "cf_clearance" and c.get("expiry"):
+                    expires = min(expires, float(c["expiry"]))
+        except Exception:
+            pass
+        with self._lock:
+            self._expires[(id(driver), host)] = expires
+
+
+SESSIONS = SessionManager()
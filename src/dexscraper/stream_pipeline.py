@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Set
+
+from src.dexscraper.browser_pool import BrowserPool, borrow
+from src.dexscraper.fetch_pages import fetch_pages
+from src.dexscraper.parse_pages import iter_token_addresses
+from src.dexscraper.fetch_wallet_html import cached_top_traders, fetch_top_traders, remember_top_traders
+from src.dexscraper.filter_fresh import fresh_subset
+from src.dexscraper.gmgn_http import GmgnHttpClient
+from src.dexscraper.journal import RunJournal, STAGE_WALLET
+from src.dexscraper.wallet_main import browser_handler, make_session_factory, _handle_result
+from src.dexscraper.cache import get_cache, WALLET_JSON
+from src.dexscraper.db_writer import write_behind
+
+_STOP = object()      # маркер конца очереди, по одному на потребителя
+
+
+class _Stats:
+    """Счётчики и отметки времени потокового прогона (пишут несколько потоков)."""
+
+    def __init__(self) -> None:
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.tokens = self.wallets = self.evaluated = self.skipped = 0
+        self.first_wallet: Optional[float] = None
+        self.first_result: Optional[float] = None
+
+    def mark(self, attr: str, n: int = 1) -> None:
+        with self.lock:
+            setattr(self, attr, getattr(self, attr) + n)
+            if attr == "wallets" and self.first_wallet is None:
+                self.first_wallet = time.time() - self.started
+            if attr == "evaluated" and self.first_result is None:
+                self.first_result = time.time() - self.started
+
+    def summary(self) -> str:
+        fmt = lambda t: f"{t:.1f} с" if t is not None else "—"
+        return (
+            f"[stream] токенов: {self.tokens}, кошельков: {self.wallets} "
+            f"(пропущено свежих/готовых: {self.skipped}), оценено: {self.evaluated}; "
+            f"первый кошелёк: {fmt(self.first_wallet)}, первый результат: {fmt(self.first_result)}, "
+            f"всего: {fmt(time.time() - self.started)}"
+        )
+
+
+def _put(q: queue.Queue, item, consumers: List[threading.Thread]) -> None:
+    """Блокирующий put (backpressure), который не виснет, если все потребители упали."""
+    while True:
+        try:
+            q.put(item, timeout=1)
+            return
+        except queue.Full:
+            if not any(t.is_alive() for t in consumers):
+                raise RuntimeError("все потребители очереди завершились")
+
+
+def _stop(q: queue.Queue, consumers: List[threading.Thread]) -> None:
+    for _ in consumers:
+        try:
+            _put(q, _STOP, consumers)
+        except RuntimeError:
+            return
+
+
+def _drain(q: queue.Queue) -> Iterable:
+    while True:
+        item = q.get()
+        if item is _STOP:
+            return
+        yield item
+
+
+def run_stream(
+    hours: int,
+    run_path: Path,
+    pool: Optional[BrowserPool],
+    journal: RunJournal,
+    fetch_mode: str = "browser",
+    fresh_hours: float = 12.0,
+    period: str = "7d",
+    stable_hours: float = 0.0,
+    queue_size: int = 64,
+) -> Path:
+    """
+    Потоковый вариант сбора и оценки кошельков:
+
+        страница → токены (генератор) → [token_q] → потоки Top Traders
+                 → кошельки → [wallet_q] → потоки gmgn walletNew → results.txt
+
+    Очереди ограничены `queue_size`: если оценка gmgn не успевает, сбор
+    Top Traders ждёт.  Кошельки первого токена уходят в gmgn, пока
+    остальные токены ещё скачиваются.  Драйверы пула делятся пополам
+    между этапами (fetch_mode="http"/"async" — все, кроме одного, на
+    Top Traders, свободный драйвер нужен GmgnHttpClient для cf_clearance;
+    JSON берётся по HTTP).  Каждый поток держит свой драйвер до конца
+    этапа, поэтому в режиме browser нужен пул хотя бы из двух.
+    Возвращает путь к results.txt.
+    """
+    raw_dir, interim_dir, processed_dir = run_path / "raw", run_path / "interim", run_path / "processed"
+    results_path = processed_dir / "results.txt"
+    html_dir = interim_dir / "stream" / "wallet_html"
+    err_dir = interim_dir / "stream" / "error_tokens"
+    html_dir.mkdir(parents=True, exist_ok=True)
+    err_dir.mkdir(parents=True, exist_ok=True)
+
+    browsers = pool.size if pool is not None else 4
+    use_http = fetch_mode in ("http", "async")
+    if pool is not None and browsers < 2:
+        raise ValueError("потоковому режиму нужен пул хотя бы из двух браузеров")
+    n_token = max(1, browsers - 1) if use_http else max(1, browsers // 2)
+    n_wallet = 8 if use_http else max(1, browsers - n_token)
+
+    stats = _Stats()
+    session_factory = make_session_factory()
+    done = journal.completed(STAGE_WALLET)
+    seen: Set[str] = set()
+    seen_lock = threading.Lock()
+    found: List[str] = []
+
+    token_q: queue.Queue = queue.Queue(maxsize=max(2 * n_token, 4))
+    wallet_q: queue.Queue = queue.Queue(maxsize=queue_size)
+    wallet_threads: List[threading.Thread] = []
+
+    # ---------- этап 2: токен → Top Traders → новые кошельки --------------
+    def token_worker(worker_id: int) -> None:
+        with borrow(pool) as driver:
+            for n, token in _drain(token_q):
+                try:
+                    wallets = cached_top_traders(token)
+                    if wallets is None:
+                        html = fetch_top_traders(driver, token)
+                        (html_dir / f"{n}_token_wallets.html").write_text(html, encoding="utf-8")
+                        wallets = remember_top_traders(token, html)
+                except Exception as e:
+                    print(f"[stream] токен {token}: {e}")
+                    (err_dir / f"{n}_token.txt").write_text(token, encoding="utf-8")
+                    continue
+                stats.mark("tokens")
+
+                with seen_lock:
+                    new = [w for w in dict.fromkeys(wallets) if w not in seen]
+                    seen.update(new)
+                    found.extend(new)
+                fresh = fresh_subset(session_factory, new, fresh_hours, stable_hours)
+                for address in new:
+                    if address in fresh or address in done:
+                        stats.mark("skipped")
+                        continue
+                    stats.mark("wallets")
+                    _put(wallet_q, address, wallet_threads)
+
+    # ---------- этап 3: кошелёк → walletNew JSON → results.txt ------------
+    def make_handler(worker_id: int) -> "tuple[Callable[[str], bool], Callable[[], None]]":
+        if not use_http:
+            return browser_handler(worker_id, period, results_path, pool, journal)
+
+        cache = get_cache()
+
+        def handle(address: str) -> bool:
+            data = cache.get(address, period, WALLET_JSON)
+            if data is None:
+                data = http_client.fetch_wallet(address, period)
+                cache.put(address, period, WALLET_JSON, data)
+            return _handle_result(session_factory, address, data, period, results_path, journal)
+
+        return handle, lambda: None
+
+    def wallet_worker(worker_id: int) -> None:
+        handle, close = make_handler(worker_id)
+        try:
+            for address in _drain(wallet_q):
+                try:
+                    ok = handle(address) or handle(address)     # одна повторная попытка
+                except Exception as e:
+                    print(f"[stream] кошелёк {address}: {e}")
+                    ok = False
+                if ok:
+                    stats.mark("evaluated")
+        finally:
+            close()
+
+    # этап 1: страница DexScreener — до старта потоков, которые займут все драйверы
+    pages = fetch_pages(hours, raw_dir, pool)
+
+    http_client = GmgnHttpClient(pool) if use_http else None
+    token_threads = [threading.Thread(target=token_worker, args=(i,), daemon=True) for i in range(n_token)]
+    wallet_threads.extend(
+        threading.Thread(target=wallet_worker, args=(i,), daemon=True) for i in range(n_wallet)
+    )
+    print(f"[stream] потоков Top Traders: {n_token}, оценки gmgn: {n_wallet} ({fetch_mode})")
+
+    # запись в БД — фоновым потоком DbWriter, потоки gmgn не ждут commit.
+    # Блок открывается до старта потоков: writer принадлежит этому потоку,
+    # вложенные write_behind в browser_handler его только переиспользуют
+    with write_behind(session_factory):
+        for t in token_threads + wallet_threads:
+            t.start()
+        try:
+            # токены уходят в работу по мере разбора страницы
+            for n, token in enumerate(iter_token_addresses(pages), 1):
+                _put(token_q, (n, token), token_threads)
+        finally:
+            _stop(token_q, token_threads)
+            for t in token_threads:
+                t.join()
+            _stop(wallet_q, wallet_threads)
+            for t in wallet_threads:
+                t.join()
+            if http_client is not None:
+                http_client.close()
+
+    # список кошельков, как после обычного сбора — для --resume и отчётов
+    (processed_dir / "list.txt").write_text("\n".join(found) + "\n", encoding="utf-8")
+    print(stats.summary())
+    return results_path
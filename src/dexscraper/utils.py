@@ -16,6 +16,16 @@ def create_run_dir() -> tuple[str, Path]:
     return run_id, run_path
 
 
+def open_run_dir(run_id: str) -> tuple[str, Path]:
+    """Возвращает (run_id, Path) уже существующего run’а — для --resume."""
+    run_path = DATA_DIR / RUNS / run_id
+    if not run_path.is_dir():
+        raise FileNotFoundError(run_path)
+    for sub in (RAW, INTERIM, PROCESSED):
+        (run_path / sub).mkdir(parents=True, exist_ok=True)
+    return run_id, run_path
+
+
 def cleanup_old_runs(keep: int = 3) -> None:
     """Оставляет только `keep` последних run’ов, остальные удаляет."""
     runs_root = DATA_DIR / RUNS
@@ -1,17 +1,26 @@
 
-import multiprocessing
+from contextlib import ExitStack
 from pathlib import Path
+from typing import Optional
 import json
 from datetime import datetime
 from tabulate import tabulate
 from termcolor import colored
 import time
 
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import NullPool
 
-from src.db.models import Wallet
+from src.db.database import DATABASE_URL, get_session_factory
+from src.db.upsert import upsert_wallets, wallet_row
+from src.dexscraper.browser_pool import BrowserPool, borrow
+from src.dexscraper.session_manager import SESSIONS, PageState
+from src.dexscraper.gmgn_http import GmgnHttpClient
+from src.dexscraper.async_evaluator import evaluate_wallets
+from src.dexscraper.work_queue import run_queue
+from src.dexscraper.cache import get_cache, WALLET_JSON
+from src.dexscraper.journal import RunJournal, STAGE_WALLET, DONE, FAILED, FILTERED
+from src.dexscraper.results_io import append_record
+from src.dexscraper.db_writer import KIND_WALLET, active_writer, write_behind
 
 from seleniumbase import Driver
 from selenium.webdriver.common.by import By
@@ -26,16 +35,11 @@ NUM_PROCESSES = 4
 
 
 
-BROWSER_COUNT = multiprocessing.Value("i", 0)
 
 
 def make_session_factory() -> sessionmaker:
-    engine = create_engine(
-        DB_URL,
-        poolclass=NullPool,
-        pool_pre_ping=True,
-    )
-    return sessionmaker(bind=engine)
+    """Фабрика сессий на общий engine процесса (пул соединений вместо NullPool)."""
+    return get_session_factory(DATABASE_URL or DB_URL)
 
 
 def add_wallet(
@@ -45,31 +49,19 @@ def add_wallet(
     sol_balance: float,
     pnl: float,
 ):
-    """Добавляем/обновляем кошелёк в БД."""
-    session = SessionLocal()
+    """
+    Добавляем/обновляем кошелёк в БД (один upsert вместо SELECT + UPDATE).
+    Внутри write_behind строка уходит в очередь DbWriter, без ожидания БД.
+    """
+    row = wallet_row(address, winrate, sol_balance, pnl)
+    writer = active_writer()
+    if writer is not None:
+        writer.put(KIND_WALLET, row, SessionLocal)
+        return
     try:
-        wallet = session.query(Wallet).filter_by(address=address).first()
-        if wallet:
-            wallet.checked_count += 1
-            wallet.last_updated = datetime.now()
-            wallet.sol_balance = int(sol_balance)
-            wallet.pnl = int(pnl)
-            wallet.winrate = int(winrate * 100)
-        else:
-            wallet = Wallet(
-                address=address,
-                winrate=int(winrate * 100),
-                sol_balance=int(sol_balance),
-                pnl=int(pnl),
-                checked_count=1,
-            )
-            session.add(wallet)
-        session.commit()
+        upsert_wallets(SessionLocal, [row])
     except Exception as e:
-        session.rollback()
         print(f"Ошибка при добавлении кошелька {address}: {e}")
-    finally:
-        session.close()
 
 
 
@@ -80,39 +72,25 @@ def setup_driver(headless: bool = False) -> Driver:
 def fetch_wallet_data(driver: Driver, wallet_address: str, period: str) -> dict | None:
     url = f"{API_URL}{wallet_address}?period={period}"
 
-    with BROWSER_COUNT.get_lock():
-        first_calls = BROWSER_COUNT.value < 4
-        BROWSER_COUNT.value += 1
-
-    try:
-        driver.get(url)
-        if first_calls:  # обойдём капчу в первых 4 запросах
-            time.sleep(3)
-            driver.uc_gui_click_captcha()
-
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.TAG_NAME, "pre"))
-        )
-        page_source = driver.page_source
-        json_data = page_source.split("<pre>", 1)[1].split("</pre>", 1)[0]
-        return json.loads(json_data)
-    except Exception as e:
+    for attempt in range(2):
         try:
-            print(f"ERROR TRYING AGAIN: {wallet_address}: {e}")
-            driver.get(url)
-            if first_calls:
-                time.sleep(3)
-                driver.uc_gui_click_captcha()
+            # капча решается только если SessionManager её реально увидел
+            state = SESSIONS.open(driver, url)
+            if state is not PageState.CONTENT:
+                raise RuntimeError(f"страница: {state.value}")
 
-            WebDriverWait(driver, 20).until(
+            WebDriverWait(driver, 10).until(
                 EC.presence_of_element_located((By.TAG_NAME, "pre"))
             )
             page_source = driver.page_source
             json_data = page_source.split("<pre>", 1)[1].split("</pre>", 1)[0]
             return json.loads(json_data)
         except Exception as e:
-            print(f"ERROR WHILE FETCHING DATA: {wallet_address}: {e}")
-            return None
+            if attempt == 0:
+                print(f"ERROR TRYING AGAIN: {wallet_address}: {e}")
+            else:
+                print(f"ERROR WHILE FETCHING DATA: {wallet_address}: {e}")
+    return None
 
 
 def process_data(data, wallet_address, period):
@@ -155,42 +133,174 @@ def process_data(data, wallet_address, period):
     return None
 
 
-def worker_func(wallet_addresses: list[str], period: str, output_file: Path) -> None:
+def worker_func(
+    wallet_addresses: list[str],
+    period: str,
+    output_file: Path,
+    pool: Optional[BrowserPool] = None,
+    journal: Optional[RunJournal] = None,
+) -> None:
+    handle, close = browser_handler(0, period, output_file, pool, journal)
+    try:
+        for address in wallet_addresses:
+            handle(address)
+    finally:
+        close()
+
+
+def browser_handler(
+    worker_id: int,
+    period: str,
+    output_file: Path,
+    pool: Optional[BrowserPool] = None,
+    journal: Optional[RunJournal] = None,
+):
+    """
+    Фабрика для work_queue.run_queue: создаёт драйвер и сессию БД внутри
+    воркера и возвращает (handle, close).  handle → False, если JSON не
+    получен, — адрес уйдёт в очередь на повтор другим воркером.
+    """
+    SessionLocal = make_session_factory()
+    stack = ExitStack()
+    stack.enter_context(write_behind(SessionLocal))   # свой writer, если воркер — отдельный процесс
+    driver = stack.enter_context(borrow(pool))
+
+    cache = get_cache()
+
+    def handle(address: str) -> bool:
+        data = cache.get(address, period, WALLET_JSON)
+        if data is None:
+            data = fetch_wallet_data(driver, address, period)
+            cache.put(address, period, WALLET_JSON, data)
+        return _handle_result(SessionLocal, address, data, period, output_file, journal)
+
+    def close() -> None:
+        stack.close()
+        print(f"[wallet_main] воркер {worker_id}: {SESSIONS.summary()}")
+
+    return handle, close
+
+
+def http_worker(
+    wallet_addresses: list[str],
+    period: str,
+    output_file: Path,
+    pool: Optional[BrowserPool] = None,
+    journal: Optional[RunJournal] = None,
+) -> None:
+    """Режим без браузера на каждый кошелёк: walletNew JSON через GmgnHttpClient."""
     SessionLocal = make_session_factory()
-    driver = setup_driver()
+    missing = _serve_cached(SessionLocal, wallet_addresses, period, output_file, journal)
+    if not missing:
+        return
 
+    cache = get_cache()
+    client = GmgnHttpClient(pool)
+    try:
+        for address, data in client.fetch_many(missing, period):
+            cache.put(address, period, WALLET_JSON, data)
+            _handle_result(SessionLocal, address, data, period, output_file, journal)
+    finally:
+        client.close()
+
+
+def async_worker(
+    wallet_addresses: list[str],
+    period: str,
+    output_file: Path,
+    pool: Optional[BrowserPool] = None,
+    journal: Optional[RunJournal] = None,
+) -> None:
+    """Замена worker_func: сотни запросов из одного процесса с rate limit на host."""
+    SessionLocal = make_session_factory()
+    missing = _serve_cached(SessionLocal, wallet_addresses, period, output_file, journal)
+    if not missing:
+        return
+
+    cache = get_cache()
+
+    def on_result(address: str, data: dict | None) -> None:
+        cache.put(address, period, WALLET_JSON, data)
+        _handle_result(SessionLocal, address, data, period, output_file, journal)
+
+    evaluate_wallets(missing, period, on_result, pool=pool)
+
+
+def _serve_cached(
+    SessionLocal,
+    wallet_addresses: list[str],
+    period: str,
+    output_file: Path,
+    journal: Optional[RunJournal] = None,
+) -> list[str]:
+    """Обрабатывает кошельки, чей JSON уже есть в кэше.  Возвращает остальные."""
+    cache = get_cache()
+    missing = []
     for address in wallet_addresses:
-        data = fetch_wallet_data(driver, address, period)
-        processed = process_data(data, address, period)
-        if (
-            processed
-            and processed["Winrate"] > 0.45
-            and processed["SOL_value"] > 5
-            and processed["PnL_value"] > 50
-        ):
-            add_wallet(
-                SessionLocal,
-                address,
-                processed["Winrate"],
-                processed["SOL_value"],
-                processed["PnL_value"],
-            )
-            print(tabulate([processed], headers="keys", tablefmt="grid"))
+        data = cache.get(address, period, WALLET_JSON)
+        if data is None:
+            missing.append(address)
+        else:
+            _handle_result(SessionLocal, address, data, period, output_file, journal)
+    return missing
 
-            with open(output_file, "a", encoding="utf-8") as f:
-                json.dump(
-                    {k: v for k, v in processed.items() if k != "Winrate Value"},
-                    f,
-                    ensure_ascii=False,
-                    indent=4,
-                )
-                f.write("\n")
 
-    driver.quit()
+def _handle_result(
+    SessionLocal,
+    address: str,
+    data: dict | None,
+    period: str,
+    output_file: Path,
+    journal: Optional[RunJournal] = None,
+) -> bool:
+    """Обрабатывает JSON кошелька и отмечает итог в журнале.  False — данных нет."""
+    if data is None:
+        if journal is not None:
+            journal.record(address, STAGE_WALLET, FAILED)
+        return False
+
+    saved = _save_if_good(SessionLocal, address, process_data(data, address, period), output_file)
+    if journal is not None:
+        journal.record(address, STAGE_WALLET, DONE if saved else FILTERED)
+    return True
+
+
+def _save_if_good(SessionLocal, address: str, processed: dict | None, output_file: Path) -> bool:
+    if (
+        processed
+        and processed["Winrate"] > 0.45
+        and processed["SOL_value"] > 5
+        and processed["PnL_value"] > 50
+    ):
+        add_wallet(
+            SessionLocal,
+            address,
+            processed["Winrate"],
+            processed["SOL_value"],
+            processed["PnL_value"],
+        )
+        print(tabulate([processed], headers="keys", tablefmt="grid"))
+
+        # одна строка JSON за один O_APPEND-write — общий lock потокам не нужен
+        append_record(output_file, {k: v for k, v in processed.items() if k != "Winrate Value"})
+        return True
+    return False
 
 
 
-def wallet_main(list_path: Path, results_path: Path):
+def wallet_main(
+    list_path: Path,
+    results_path: Path,
+    pool: Optional[BrowserPool] = None,
+    fetch_mode: str = "browser",
+    journal: Optional[RunJournal] = None,
+):
+    """
+    fetch_mode="browser" — каждый кошелёк открывается в Chrome (как раньше);
+    fetch_mode="http"    — капча решается один раз, JSON берётся напрямую;
+    fetch_mode="async"   — то же, но asyncio + token bucket на каждый host.
+    С `journal` уже обработанные (done/filtered) адреса пропускаются.
+    """
     start_time = time.time()
     period = "7d"
 
@@ -201,26 +311,32 @@ def wallet_main(list_path: Path, results_path: Path):
         print("Файл list.txt не найден.")
         return results_path
 
-    chunk_size = len(all_addresses) // NUM_PROCESSES + 1
-    chunks = [
-        all_addresses[i : i + chunk_size] for i in range(0, len(all_addresses), chunk_size)
-    ]
-
-    processes = []
-    for chunk in chunks:
-        p = multiprocessing.Process(
-            target=worker_func,
-            args=(chunk, period, Path(results_path)),
-            daemon=False,
+    if journal is not None:
+        pending = journal.pending(all_addresses, STAGE_WALLET)
+        print(f"[wallet_main] журнал: осталось {len(pending)} из {len(all_addresses)}")
+        all_addresses = pending
+
+    # запись в БД — в фоновом потоке, воркеры не ждут commit
+    with write_behind(make_session_factory()):
+        if fetch_mode in ("http", "async"):
+            worker = http_worker if fetch_mode == "http" else async_worker
+            worker(all_addresses, period, Path(results_path), pool, journal)
+            print(f"Время работы: {time.time() - start_time:.2f} сек")
+            return results_path
+
+        # общая очередь вместо статичных чанков: свободный воркер берёт следующий адрес
+        summary = run_queue(
+            all_addresses,
+            browser_handler,
+            (period, Path(results_path), pool, journal),
+            n_workers=pool.size if pool is not None else NUM_PROCESSES,
+            use_threads=pool is not None,          # драйверы пула живут в этом процессе
+            start_delay=0 if pool is not None else 4,  # пауза для обхода капчи у холодных драйверов
         )
-        p.start()
-        time.sleep(4)  # небольшая пауза для обхода капчи
-        processes.append(p)
-
-    for p in processes:
-        p.join()
+    if summary["failed"]:
+        print(f"Не удалось обработать {len(summary['failed'])} кошельков")
 
-    print("Все процессы завершены.")
+    print("Все воркеры завершены.")
     print(f"Время работы: {time.time() - start_time:.2f} сек")
     return results_path
 
@@ -1,15 +1,26 @@
+import argparse
 import json
+import queue
+import threading
 import time
-import re
-import numpy as np
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
-from src.db.database import SessionLocal
-from src.db.models import Wallet
+from typing import Dict, List, Optional
+from src.db.database import SessionLocal, after_fork
+from src.db.upsert import activity_row, upsert_activity
 
-from seleniumbase import Driver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from src.dexscraper.browser_pool import BrowserPool, borrow
+from src.dexscraper.session_manager import SESSIONS
+from src.dexscraper.dom_extract import wait_activity_rows
+from src.dexscraper.scoring import interval_label, parse_durations, score_tables
+from src.dexscraper.cdp_capture import capture_json, drain_performance_log, metrics_from_payloads
+from src.dexscraper.cache import get_cache, ACTIVITY
+from src.dexscraper.journal import RunJournal, STAGE_ACTIVITY, DONE, FAILED
+from src.dexscraper.results_io import read_records
+from src.dexscraper.db_writer import KIND_ACTIVITY, active_writer, write_behind
+from src.dexscraper.activity_snapshots import (
+    SNAPSHOT_DIR_NAME, SOURCE_CDP, iter_snapshots, load_snapshot, save_snapshot, snapshot_path,
+)
 
 
 
@@ -18,6 +29,8 @@ from selenium.webdriver.support import expected_conditions as EC
 RESULTS_FILE = 'results.txt'
 TABLE_TEXT_FILE = 'table_results.txt'
 BASE_URL = 'https://gmgn.ai/sol/address/'
+ACTIVITY_PERIOD = 'recent'   # ключ кэша: страница активности без периода
+RESCORE_BATCH = 512          # снимков на один пакетный вызов scoring
 
 
 def add_may_good(
@@ -30,129 +43,49 @@ def add_may_good(
         median: float,
         label: str
 ):
-    session = SessionLocal()
-
+    row = activity_row(address, rockets, trade_counts, profit_trades, good_profit, fast_trades, median, label)
+    writer = active_writer()
+    if writer is not None:
+        writer.put(KIND_ACTIVITY, row, SessionLocal)      # запишет поток DbWriter пачкой
+        return
     try:
-        wallet = session.query(Wallet).filter_by(address=address).first()
-        if wallet:
-            wallet.rockets = rockets
-            wallet.trade_counts = trade_counts
-            wallet.profit_trades = profit_trades
-            wallet.good_profit = good_profit
-            wallet.fast_trades = fast_trades
-            wallet.median = float(median)
-            wallet.lable = label
-        else:
-            wallet = Wallet(
-                address=address,
-                rockets=rockets,
-                trade_counts=trade_counts,
-                profit_trades=profit_trades,
-                good_profit=good_profit,
-                fast_trades=fast_trades,
-                median=float(median),
-                lable=label,
-            )
-            session.add(wallet)
-        session.commit()
+        upsert_activity(SessionLocal, [row])
     except Exception as e:
-        session.rollback()
         print(f"Ошибка при добавлении кошелька {address} в базу данных: {e}")
-    finally:
-        session.close()
-
-def _duration_to_hours(s: str) -> float | None:
-    """
-    '--'  → None
-    '25m' → 0.416…   (25 / 60)
-    '5h'  → 5.0
-    '3d'  → 72.0
-    '40s' → 0.011…   (по желанию)
-    """
-    if not s or s == "--":
-        return None
-
-    value = float(re.sub(r"[^\d.]", "", s))   # поддерживаем и '1.5h'
-    if s.endswith("s"):                       # секунды → часы
-        return value / 3600
-    if s.endswith("m"):                       # минуты → часы
-        return value / 60
-    if s.endswith("h"):
-        return value
-    if s.endswith("d"):
-        return value * 24
-    return None        # неожиданный суффикс
 
 
 def median_interval_and_label(buy_duration: list[str]):
     """
     • Принимает исходный список строк ['5h', '1d', ...]
-    • Возвращает (median_delta_hours | None, label)
+    • Возвращает (q75_delta_hours | None, label)
     """
-
-    hours = sorted(
-        h for h in (_duration_to_hours(x) for x in buy_duration) if h is not None
-    )
-
-    if len(hours) < 2:
-        return None, "UNKNOWN"
-
-
-    deltas = np.diff(hours)
-    deltas = deltas[deltas > 0]
-
-    if len(deltas) == 0:
-        return None, "UNKNOWN"
-
-    median_h = float(np.median(deltas))
-
-    q75 = np.percentile(deltas, 75)
-
-    if q75 <= 24:
-        label = "DAILY"
-    elif q75 <= 168:
-        label = "NORMAL"
-    else:
-        label = "RARE"
-
-    return q75, label
-
+    return interval_label(parse_durations(buy_duration))
 
 
+def interval_label_from_hours(hours: list[float]):
+    """
+    То же для уже посчитанных часов (например, из JSON gmgn).
+    Возвращает (q75_delta_hours | None, label)
+    """
+    return interval_label(hours)
 
 
 def load_results_multiline(filename):
     """
-    Считываем 'results.txt', где сохранено несколько JSON-объектов (каждый в фигурных скобках),
-    записанных друг за другом (по несколько строк на объект).
+    Считываем 'results.txt': JSON на строку (append_record) и/или старые
+    объекты с indent=4 на несколько строк — см. results_io.iter_records.
     """
-    objects = []
-    current_lines = []
-    inside_object = False
-
-    with open(filename, 'r', encoding='utf-8') as f:
-        for line in f:
-            line_stripped = line.strip()
-            if line_stripped.startswith('{'):
-                inside_object = True
-                current_lines = [line_stripped]
-            elif line_stripped.endswith('}'):
-                current_lines.append(line_stripped)
-                inside_object = False
-                json_text = "\n".join(current_lines)
-                try:
-                    obj = json.loads(json_text)
-                    objects.append(obj)
-                except Exception as e:
-                    print(f"Ошибка парсинга:\n{json_text}\n{e}")
-                current_lines = []
-            else:
-                if inside_object:
-                    current_lines.append(line_stripped)
+    return read_records(filename)
 
-    return objects
 
 
+def activity_metrics(table: dict):
+    """
+    Метрики count_rockets по снимку таблицы из dom_extract.activity_rows
+    (чистый Python, без обращений к браузеру) — через пакетный scoring.
+    """
+    return score_tables([table])[0]
+
 
 def count_rockets(driver, max_rows=100):
     """
@@ -160,117 +93,66 @@ def count_rockets(driver, max_rows=100):
     - rockets_count (профит > 1000),
     - trades_count (всего трейдов),
     - быстрые трейды (<2 минут).
-    Возвращает (rockets_count, trades_count, fast_trades_display).
+    Таблица забирается одним execute_script (dom_extract.activity_rows),
+    метрики считает activity_metrics.
     """
-    rockets_count = 0
-    trades_count = 0
-    fast_trades_count = 0
-    profit_trades_count = 0
-    good_profit_trades_count = 0
-    buy_duration = []
-
     try:
-        WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "div.g-table-content"))
-        )
-
-        table_content = driver.find_element(By.CSS_SELECTOR, "div.g-table-content")
-        table_element = table_content.find_element(By.TAG_NAME, "table")
-        tbody_element = table_element.find_element(By.CSS_SELECTOR, "tbody.g-table-tbody")
-
-        rows = tbody_element.find_elements(By.CSS_SELECTOR, "tr.g-table-row")
-        trades_count = len(rows)
-        print(f"Найдено строк в таблице (трейдов): {trades_count}")
-
-        for row in rows[:max_rows]:
-            try:
-                dur_el = row.find_element(
-                    By.CSS_SELECTOR,
-                    "td.g-table-cell.g-table-cell-fix-left."
-                    "g-table-cell-fix-left-last p.chakra-text"
-                )
-                dur_text = dur_el.get_attribute("textContent").strip()
-                buy_duration.append(dur_text)
-
-                cells = row.find_elements(By.CSS_SELECTOR, "td.g-table-cell")
-
-                if not cells:
-                    continue
-
-                for cell in cells:
-                    # 1) Holding Duration
-                    duration_elements = cell.find_elements(By.CSS_SELECTOR, "span.css-1baulvz")
-                    for duration_element in duration_elements:
-                        duration_text = duration_element.get_attribute("textContent").strip()
-
-                        # Переводим в секунды
-                        duration_seconds = 0
-                        if "s" in duration_text:
-                            duration_seconds = int(re.sub(r"[^0-9]", "", duration_text))
-                        elif "m" in duration_text:
-                            duration_seconds = int(re.sub(r"[^0-9]", "", duration_text)) * 60
-
-                        if 0 < duration_seconds < 120:
-                            fast_trades_count += 1
-
-                    # 2) Ракета: profit % > 1000
-                    profit_divs = cell.find_elements(By.CSS_SELECTOR, "div.css-1i5dkc8")
-                    if not profit_divs:
-                        continue
-
-                    for div_ in profit_divs:
-                        profit_elements = div_.find_elements(By.CSS_SELECTOR, "p.chakra-text.css-b4wymw")
-
-                        for number in profit_elements:
-                            profit_trades_count += 1
-                            profit_text = number.get_attribute("textContent").strip()
-                            numeric_part = re.sub(r"[^0-9.]", "", profit_text)
-                            clear_number = int(float(numeric_part))
-                            if clear_number > 40:
-                                good_profit_trades_count += 1
-
-                        for profit_element in profit_elements:
-                            profit_text = profit_element.get_attribute("textContent").strip()
-                            multiplier = 1
-                            if "K" in profit_text:
-                                multiplier = 1000
-
-                            numeric_part = re.sub(r"[^0-9.]", "", profit_text)
-                            if numeric_part:
-                                profit_value = float(numeric_part) * multiplier
-                                if profit_value > 1000:
-                                    print("НАЙДЕНА РАКЕТА!")
-                                    rockets_count += 1
-
-            except Exception as e:
-                print(f"Ошибка при обработке строки: {e}")
-                continue
-
+        table = wait_activity_rows(driver, max_rows=max_rows, timeout=15)
     except Exception as e:
         print(f"Не удалось разобрать историю сделок: {e}")
         return 0, 0, 0
 
-    if trades_count > 0:
-        fast_trade_percentage = (fast_trades_count / trades_count) * 100
-        fast_trades_display = f"{round(fast_trade_percentage, 1)}%"
-    else:
-        fast_trades_display = 0
+    print(f"Найдено строк в таблице (трейдов): {table['total']}")
+    return activity_metrics(table)
 
-    median_h, freq_label = median_interval_and_label(buy_duration)
 
+def count_rockets_cdp(driver, max_rows=100):
+    """
+    Вариант count_rockets без обхода DOM: метрики считаются по JSON,
+    который страница сама загрузила (перехват через CDP).  Страницу нужно
+    открыть после drain_performance_log().  None — ответ не пойман.
+    """
+    return payload_metrics(capture_json(driver), max_rows=max_rows)
+
+
+def payload_metrics(payloads, max_rows=100, now=None):
+    """Метрики count_rockets по JSON активности; `now` — момент снимка."""
+    counts = metrics_from_payloads(payloads, max_rows=max_rows, now=now)
+    if counts is None:
+        return None
 
-    return rockets_count, trades_count, fast_trades_display, profit_trades_count, good_profit_trades_count, median_h, freq_label
+    rockets, trades_count, fast_trades, profit_trades, good_trades, ages_h = counts
+    print(f"[cdp] сделок в ответе: {trades_count}, ракет: {rockets}")
+    fast_trades_display = f"{round(fast_trades / trades_count * 100, 1)}%"
+    median_h, freq_label = interval_label_from_hours(ages_h)
+    return rockets, trades_count, fast_trades_display, profit_trades, good_trades, median_h, freq_label
 
 
-def process_one_wallet(driver, item):
+def process_one_wallet(driver, item, use_cdp=False):
     wallet_address = item.get("Wallet Address", "")
     if not wallet_address:
         return None
 
-    url = f"{BASE_URL}{wallet_address}"
-    print(f"Переходим по ссылке: {url}")
-    driver.get(url)
-    rockets, trades_count, fast_trades_percent, profit_trades, good_trades, median, freq_l = count_rockets(driver, max_rows=100)
+    cache = get_cache()
+    metrics = cache.get(wallet_address, ACTIVITY_PERIOD, ACTIVITY)
+    if metrics is None:
+        url = f"{BASE_URL}{wallet_address}"
+        print(f"Переходим по ссылке: {url}")
+        if use_cdp:
+            drain_performance_log(driver)
+        SESSIONS.open(driver, url)
+        metrics = count_rockets_cdp(driver, max_rows=100) if use_cdp else None
+        if metrics is None:
+            metrics = count_rockets(driver, max_rows=100)
+        if len(metrics) == 7 and metrics[1] > 0:   # неудачный разбор не кэшируем
+            cache.put(wallet_address, ACTIVITY_PERIOD, ACTIVITY, list(metrics))
+    return row_and_save(item, metrics)
+
+
+def row_and_save(item, metrics, write_db=True):
+    """Строка clear_results по метрикам кошелька; write_db — заодно обновить запись в БД."""
+    wallet_address = item.get("Wallet Address", "")
+    rockets, trades_count, fast_trades_percent, profit_trades, good_trades, median, freq_l = metrics
 
     row_data = {
         "Wallet Address": wallet_address,
@@ -286,42 +168,259 @@ def process_one_wallet(driver, item):
         "Label": freq_l
     }
 
-    add_may_good(
-        address=wallet_address,
-        rockets=rockets,
-        trade_counts=trades_count,
-        profit_trades=profit_trades,
-        good_profit=good_trades,
-        fast_trades=float(fast_trades_percent.strip().rstrip("%")),
-        median=median,
-        label=freq_l,
-    )
+    if write_db:
+        add_may_good(**_activity_row(row_data))
 
+    return row_data
 
 
-    return row_data
+def _activity_row(row_data: dict) -> dict:
+    """Строка clear_results → аргументы add_may_good / activity_row."""
+    return dict(
+        address=row_data["Wallet Address"],
+        rockets=row_data["Rockets"],
+        trade_counts=row_data["Trades Count"],
+        profit_trades=row_data["Profit trades"],
+        good_profit=row_data["Good profit"],
+        fast_trades=float(row_data["Fast Trades"].strip().rstrip("%")),
+        median=row_data["Median_H"],
+        label=row_data["Label"],
+    )
+
+
+# ---------- двухэтапный режим: браузер → снимок → пул процессов --------
+def snapshot_metrics(snapshot: dict):
+    """Метрики по снимку (DOM или CDP); None — в снимке нет сделок."""
+    if snapshot["source"] == SOURCE_CDP:
+        return payload_metrics(snapshot["data"], max_rows=100, now=snapshot["captured_at"])
+    return activity_metrics(snapshot["data"])
 
 
-def wallet_parse_main(results_path: Path, clear_results: Path):
+def score_snapshot(path: Path, write_db: bool = True) -> Optional[dict]:
+    """
+    Второй этап: снимок → метрики → кэш и БД.  Выполняется в процессе
+    пула, браузер к этому моменту уже грузит следующий кошелёк.
+    """
+    snapshot = load_snapshot(path)
+    metrics = snapshot_metrics(snapshot)
+    if metrics is None or len(metrics) != 7:
+        return None
+    if metrics[1] > 0:
+        get_cache().put(snapshot["address"], ACTIVITY_PERIOD, ACTIVITY, list(metrics))
+    return row_and_save(snapshot["item"], metrics, write_db)
+
+
+def score_snapshot_batch(paths: List[Path], write_db: bool = True) -> List[Optional[dict]]:
+    """score_snapshot для пачки: все DOM-снимки считаются одним вызовом score_tables."""
+    snapshots = [load_snapshot(p) for p in paths]
+    dom = [i for i, snap in enumerate(snapshots) if snap["source"] != SOURCE_CDP]
+    metrics: Dict[int, Optional[tuple]] = dict(zip(dom, score_tables([snapshots[i]["data"] for i in dom])))
+
+    rows: List[Optional[dict]] = []
+    db_rows: List[dict] = []
+    for i, snapshot in enumerate(snapshots):
+        m = metrics[i] if i in metrics else snapshot_metrics(snapshot)
+        if m is None:
+            rows.append(None)
+            continue
+        if m[1] > 0:
+            get_cache().put(snapshot["address"], ACTIVITY_PERIOD, ACTIVITY, list(m))
+        try:
+            row = row_and_save(snapshot["item"], m, write_db=False)
+            if write_db:
+                db_rows.append(activity_row(**_activity_row(row)))
+        except Exception as e:
+            print(f"Ошибка при сохранении {snapshot['address']}: {e}")
+            row = None
+        rows.append(row)
+
+    # вся пачка — одним upsert вместо запроса на кошелёк
+    if db_rows:
+        try:
+            upsert_activity(SessionLocal, db_rows)
+        except Exception as e:
+            print(f"Ошибка при записи пачки из {len(db_rows)} кошельков в базу данных: {e}")
+    return rows
+
+
+def _init_scoring_worker() -> None:
+    # соединения пула, унаследованные через fork, принадлежат родителю
+    after_fork()
+
+
+def fetch_snapshot(driver, item, snapshot_dir: Path, use_cdp: bool = False) -> Path:
+    """Первый этап: только загрузка страницы и снимок ячеек, без подсчётов."""
+    url = f"{BASE_URL}{item['Wallet Address']}"
+    print(f"Переходим по ссылке: {url}")
+    if use_cdp:
+        drain_performance_log(driver)
+    SESSIONS.open(driver, url)
+    if use_cdp:
+        payloads = capture_json(driver)
+        if payloads:
+            return save_snapshot(snapshot_dir, item, payloads=payloads)
+    table = wait_activity_rows(driver, max_rows=100, timeout=15)
+    return save_snapshot(snapshot_dir, item, table=table)
+
+
+def _parse_two_stage(
+    items: List[dict],
+    pool: Optional[BrowserPool],
+    use_cdp: bool,
+    snapshot_dir: Path,
+    workers: Optional[int],
+) -> Dict[str, Optional[dict]]:
+    """
+    Браузерные потоки (по одному на драйвер пула) только снимают страницы,
+    пул процессов считает метрики.  В БД пишет родитель по мере готовности
+    результатов: через свой DbWriter пачками, а без него — одним upsert
+    в конце (у процессов пула writer'а нет, там каждая строка шла бы
+    отдельным запросом).  Снимки, оставшиеся от прерванного прогона,
+    сразу идут на подсчёт.
+    """
+    rows: Dict[str, Optional[dict]] = {}
+    futures: Dict[str, Future] = {}
+    lock = threading.Lock()
+    todo: "queue.Queue[dict]" = queue.Queue()
+    writer = active_writer()
+    unsaved: List[dict] = []
+    unsaved_lock = threading.Lock()     # колбэк может сработать прямо в submit(), под `lock`
+
+    def persist(future: Future) -> None:
+        if future.exception() is not None:
+            return                      # ошибку напечатает сбор результатов ниже
+        row = future.result()
+        if row is None:
+            return
+        try:
+            db_row = activity_row(**_activity_row(row))
+        except Exception as e:
+            print(f"Ошибка при сохранении {row.get('Wallet Address', '')}: {e}")
+            return
+        if writer is not None:
+            writer.put(KIND_ACTIVITY, db_row, SessionLocal)
+        else:
+            with unsaved_lock:
+                unsaved.append(db_row)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_scoring_worker) as scorers:
+        def submit(address: str, path: Path) -> None:
+            with lock:
+                future = futures[address] = scorers.submit(score_snapshot, path, False)
+                future.add_done_callback(persist)
+
+        for item in items:
+            address = item.get("Wallet Address", "")
+            if not address:
+                continue
+            path = snapshot_path(snapshot_dir, address)
+            if path.exists():
+                submit(address, path)
+            else:
+                todo.put(item)
+
+        def fetcher() -> None:
+            with borrow(pool, log_cdp=use_cdp) as driver:
+                while True:
+                    try:
+                        item = todo.get_nowait()
+                    except queue.Empty:
+                        return
+                    address = item["Wallet Address"]
+                    try:
+                        cached = get_cache().get(address, ACTIVITY_PERIOD, ACTIVITY)
+                        if cached is not None:
+                            rows[address] = row_and_save(item, cached)
+                        else:
+                            submit(address, fetch_snapshot(driver, item, snapshot_dir, use_cdp))
+                    except Exception as e:
+                        print(f"Ошибка при разборе кошелька {address}: {e}")
+                        rows[address] = None
+
+        n_fetchers = min(pool.size if pool is not None else 1, max(todo.qsize(), 1))
+        threads = [threading.Thread(target=fetcher, daemon=True) for _ in range(n_fetchers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        for address, future in futures.items():
+            try:
+                rows[address] = future.result()
+            except Exception as e:
+                print(f"Ошибка при подсчёте метрик {address}: {e}")
+                rows[address] = None
+
+    if unsaved:
+        try:
+            upsert_activity(SessionLocal, unsaved)
+        except Exception as e:
+            print(f"Ошибка при записи пачки из {len(unsaved)} кошельков в базу данных: {e}")
+    return rows
+
+
+def wallet_parse_main(
+    results_path: Path,
+    clear_results: Path,
+    pool: Optional[BrowserPool] = None,
+    journal: Optional[RunJournal] = None,
+    use_cdp: bool = False,
+    two_stage: bool = False,
+    snapshot_dir: Optional[Path] = None,
+    workers: Optional[int] = None,
+):
+    """
+    use_cdp=True — метрики по перехваченному JSON активности (драйвер
+    должен быть с log_cdp=True), при неудаче — разбор DOM как раньше.
+    two_stage=True — браузеры только сохраняют снимки в `snapshot_dir`
+    (по умолчанию рядом с clear_results), метрики считает пул из
+    `workers` процессов.
+    """
     # 1) Считываем объекты из файла results.txt
     saved_results = load_results_multiline(results_path)
     if not saved_results:
         print("В файле нет данных или файл отсутствует.")
         return
 
-    # 2) Создаём единый драйвер
-    driver = Driver(uc=True, headless=False)
-    final_data = []
-
-    try:
-        # 3) Для каждого кошелька парсим данные
-        for item in saved_results:
-            row_data = process_one_wallet(driver, item)
-            if row_data is not None:
-                final_data.append(row_data)
-    finally:
-        # Закрываем драйвер только один раз
-        driver.quit()
+    # при --resume пропускаем уже разобранные кошельки, их строки берём из clear_results
+    previous = []
+    if journal is not None:
+        done = journal.completed(STAGE_ACTIVITY)
+        saved_results = [r for r in saved_results if r.get("Wallet Address") not in done]
+        if Path(clear_results).exists():
+            with open(clear_results, "r", encoding="utf-8") as f:
+                previous = [r for r in json.load(f) if r.get("Wallet Address") in done]
+        print(f"[wallet_parse_main] журнал: осталось {len(saved_results)}, готово {len(previous)}")
+
+    final_data = previous
+
+    # запись метрик в БД — фоновым потоком, браузер не ждёт commit
+    with write_behind(SessionLocal):
+        if two_stage:
+            snapshot_dir = Path(snapshot_dir or Path(clear_results).parent / SNAPSHOT_DIR_NAME)
+            rows = _parse_two_stage(saved_results, pool, use_cdp, snapshot_dir, workers)
+            for item in saved_results:
+                address = item.get("Wallet Address", "")
+                row_data = rows.get(address)
+                if row_data is not None:
+                    final_data.append(row_data)
+                if journal is not None and address:
+                    journal.record(address, STAGE_ACTIVITY, DONE if row_data is not None else FAILED)
+        else:
+            # 2) Берём единый драйвер (из пула, если он есть)
+            with borrow(pool, log_cdp=use_cdp) as driver:
+                # 3) Для каждого кошелька парсим данные
+                for item in saved_results:
+                    address = item.get("Wallet Address", "")
+                    try:
+                        row_data = process_one_wallet(driver, item, use_cdp)
+                    except Exception as e:
+                        print(f"Ошибка при разборе кошелька {address}: {e}")
+                        row_data = None
+                    if row_data is not None:
+                        final_data.append(row_data)
+                    if journal is not None and address:
+                        journal.record(address, STAGE_ACTIVITY, DONE if row_data is not None else FAILED)
 
     # 4) Сохраняем результат в clear_results.txt (в JSON-формате)
     with open(clear_results, "w", encoding="utf-8") as out_file:
@@ -330,5 +429,35 @@ def wallet_parse_main(results_path: Path, clear_results: Path):
 
 
 
+# ---------- пересчёт сохранённых снимков -------------------------------
+def rescore(root: Path, out_file: Optional[Path] = None, write_db: bool = False, workers: Optional[int] = None) -> List[dict]:
+    """
+    Пересчитывает метрики по всем снимкам под `root` без браузера —
+    например, после изменения правил подсчёта.
+    """
+    paths = list(iter_snapshots(root))
+    print(f"[rescore] снимков: {len(paths)}")
+    batches = [paths[i : i + RESCORE_BATCH] for i in range(0, len(paths), RESCORE_BATCH)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_scoring_worker) as scorers:
+        rows = [
+            r
+            for batch in scorers.map(score_snapshot_batch, batches, [write_db] * len(batches))
+            for r in batch
+            if r
+        ]
+
+    if out_file is not None:
+        with open(out_file, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=4)
+        print(f"[rescore] {len(rows)} строк → {out_file}")
+    return rows
+
+
 if __name__ == "__main__":
-    wallet_parse_main()
+    parser = argparse.ArgumentParser(description="Пересчёт метрик по снимкам активности")
+    parser.add_argument("root", type=Path, help="каталог снимков, run-каталог или data/runs")
+    parser.add_argument("--out", type=Path, help="куда сохранить строки (JSON, как clear_results)")
+    parser.add_argument("--write-db", action="store_true", help="обновить метрики в БД")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+    rescore(args.root, args.out, args.write_db, args.workers)
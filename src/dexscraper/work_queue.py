@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import multiprocessing
+import queue
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, List, Sequence, Set, Tuple
+
+# Фабрика вызывается внутри воркера: (worker_id, *args) -> (handle, close).
+# handle(address) -> True, если адрес обработан, False — если нужно повторить.
+Handler = Tuple[Callable[[str], bool], Callable[[], None]]
+HandlerFactory = Callable[..., Handler]
+
+STOP = None
+
+
+# ---------- воркер -----------------------------------------------------
+def _worker_loop(
+    worker_id: int,
+    tasks,
+    events,
+    factory: HandlerFactory,
+    factory_args: Sequence[Any],
+    n_workers: int,
+    batch_size: int,
+    max_attempts: int,
+) -> None:
+    """
+    Тянет адреса из общей очереди маленькими пачками.  Элемент очереди —
+    (address, attempts, failed_by, skips).  Неудачный адрес возвращается в
+    очередь с пометкой, какой воркер на нём упал; этот же воркер такой адрес
+    не берёт, пока есть другие (не больше n_workers пропусков).
+    """
+    handle, close = factory(worker_id, *factory_args)
+    try:
+        while True:
+            item = tasks.get()
+            if item is STOP:
+                break
+            # take — сразу после каждого get: чем короче окно, тем реже адрес
+            # пропадает вместе с воркером; остаток ловит stall_timeout координатора
+            events.put(("take", worker_id, item[0]))
+            batch = [item]
+            while len(batch) < batch_size:
+                try:
+                    extra = tasks.get_nowait()
+                except queue.Empty:
+                    break
+                if extra is STOP:
+                    tasks.put(STOP)
+                    break
+                events.put(("take", worker_id, extra[0]))
+                batch.append(extra)
+
+            for address, attempts, failed_by, skips in batch:
+                if worker_id in failed_by and skips < n_workers:
+                    tasks.put((address, attempts, failed_by, skips + 1))
+                    events.put(("skip", worker_id, address))
+                    time.sleep(0.2)
+                    continue
+
+                try:
+                    ok = handle(address)
+                except Exception as e:
+                    print(f"[work_queue] воркер {worker_id}: {address}: {e}")
+                    ok = False
+
+                if ok:
+                    events.put(("done", worker_id, address))
+                elif attempts + 1 >= max_attempts:
+                    events.put(("failed", worker_id, address))
+                else:
+                    tasks.put((address, attempts + 1, failed_by + (worker_id,), 0))
+                    events.put(("retry", worker_id, address))
+    finally:
+        close()
+
+
+# ---------- координатор -------------------------------------------------
+def _report(done_by: Dict[int, int], started: float, outstanding: int) -> None:
+    elapsed = max(time.time() - started, 1e-9)
+    per_worker = ", ".join(
+        f"w{wid}: {n} ({n / elapsed * 60:.1f}/мин)" for wid, n in sorted(done_by.items())
+    )
+    print(f"[work_queue] осталось {outstanding} | {per_worker or 'ещё нет готовых'}")
+
+
+def run_queue(
+    addresses: Sequence[str],
+    factory: HandlerFactory,
+    factory_args: Sequence[Any] = (),
+    n_workers: int = 4,
+    batch_size: int = 1,
+    max_attempts: int = 3,
+    use_threads: bool = False,
+    start_delay: float = 0.0,
+    report_every: float = 30.0,
+    stall_timeout: float = 60.0,
+) -> Dict[str, Any]:
+    """
+    Раздаёт адреса воркерам через общую очередь вместо статичных чанков:
+    освободившийся воркер сразу берёт следующий адрес, поэтому медленный
+    воркер не держит «хвост» запуска.  Адреса упавшего процесса
+    возвращаются в очередь.  Каждые `report_every` секунд печатает
+    пропускную способность по воркерам.
+
+    Воркер может умереть между get() и отправкой take — такой адрес
+    координатор не видит.  Если после смерти воркера живые простаивают
+    (ничего не держат) и событий нет `stall_timeout` секунд, все
+    незавершённые адреса возвращаются в очередь; повторный done/failed
+    по уже учтённому адресу игнорируется.
+
+    use_threads=True — потоки (драйверы из BrowserPool нельзя передать
+    в процесс), иначе — multiprocessing.Process.
+    Возвращает {"done": int, "failed": [...], "per_worker": {...}, "elapsed": float}.
+    """
+    if use_threads:
+        tasks, events, Worker = queue.Queue(), queue.Queue(), threading.Thread
+    else:
+        tasks, events, Worker = multiprocessing.Queue(), multiprocessing.Queue(), multiprocessing.Process
+
+    for address in addresses:
+        tasks.put((address, 0, (), 0))
+    outstanding = len(addresses)
+    remaining = Counter(addresses)      # адрес -> сколько раз его ещё ждём
+
+    started = time.time()
+    workers = []
+    for wid in range(min(n_workers, max(outstanding, 1))):
+        w = Worker(
+            target=_worker_loop,
+            args=(wid, tasks, events, factory, tuple(factory_args), n_workers, batch_size, max_attempts),
+            daemon=True,
+        )
+        w.start()
+        workers.append(w)
+        if start_delay and wid + 1 < n_workers:
+            time.sleep(start_delay)
+
+    done_by: Dict[int, int] = defaultdict(int)
+    inflight: Dict[int, Set[str]] = defaultdict(set)
+    failed: List[str] = []
+    last_report = last_event = time.time()
+
+    while outstanding > 0:
+        try:
+            kind, wid, address = events.get(timeout=1.0)
+        except queue.Empty:
+            kind = None
+
+        if kind is not None:
+            last_event = time.time()
+        if kind == "take":
+            inflight[wid].add(address)
+        elif kind is not None:
+            inflight[wid].discard(address)
+            if kind in ("done", "failed") and remaining[address] > 0:
+                remaining[address] -= 1
+                outstanding -= 1
+                if kind == "done":
+                    done_by[wid] += 1
+                else:
+                    failed.append(address)
+
+        # адреса, которые держал умерший воркер, отдаём остальным
+        dead = [wid for wid, w in enumerate(workers) if not w.is_alive()]
+        for wid in dead:
+            if inflight.get(wid):
+                print(f"[work_queue] воркер {wid} умер — возвращаю {len(inflight[wid])} адресов")
+                for lost in inflight.pop(wid):
+                    tasks.put((lost, 1, (wid,), 0))
+        if len(dead) == len(workers):
+            print(f"[work_queue] все воркеры завершились, не обработано: {outstanding}")
+            break
+
+        # адрес пропал вместе с воркером до take: живые простаивают, а он не учтён
+        idle = not any(inflight.get(wid) for wid in range(len(workers)) if wid not in dead)
+        if dead and idle and time.time() - last_event >= stall_timeout:
+            lost = list(remaining.elements())
+            print(f"[work_queue] {stall_timeout:.0f} с без событий — возвращаю {len(lost)} незавершённых адресов")
+            for address in lost:
+                tasks.put((address, 1, (), 0))
+            last_event = time.time()
+
+        if time.time() - last_report >= report_every:
+            _report(done_by, started, outstanding)
+            last_report = time.time()
+
+    for _ in workers:
+        tasks.put(STOP)
+    for w in workers:
+        w.join()
+
+    _report(done_by, started, outstanding)
+    return {
+        "done": sum(done_by.values()),
+        "failed": failed,
+        "per_worker": dict(done_by),
+        "elapsed": time.time() - started,
+    }
@@ -1,5 +1,3 @@
-import multiprocessing
-
 import json
 from datetime import datetime
 from tabulate import tabulate
@@ -7,7 +5,10 @@ from termcolor import colored
 import time
 
 from src.db.database import SessionLocal
-from src.db.models import Wallet
+from src.db.upsert import upsert_wallets, wallet_row
+from src.dexscraper.work_queue import run_queue
+from src.dexscraper.results_io import append_record
+from src.dexscraper.session_manager import SESSIONS, PageState
 
 from seleniumbase import Driver
 from selenium.webdriver.common.by import By
@@ -16,8 +17,6 @@ from selenium.webdriver.support import expected_conditions as EC
 
 API_URL = 'https://gmgn.ai/defi/quotation/v1/smartmoney/sol/walletNew/'
 
-BROWSER_COUNT = 0
-
 
 
 def add_may_normal(
@@ -26,32 +25,10 @@ def add_may_normal(
         sol_balance: float,
         pnl: float,
 ):
-    session = SessionLocal()
-
     try:
-        wallet = session.query(Wallet).filter_by(address=address).first()
-        if wallet:
-            wallet.checked_count += 1
-            wallet.last_updated = datetime.now()
-            wallet.sol_balance = int(sol_balance)
-            wallet.pnl = int(pnl)
-            wallet.winrate = int(winrate*100)
-        else:
-            wallet = Wallet(
-                address=address,
-                winrate=int(winrate*100),
-                sol_balance=int(sol_balance),
-                pnl=int(pnl),
-                checked_count=1
-            )
-            session.add(wallet)
-        session.commit()
+        upsert_wallets(SessionLocal, [wallet_row(address, winrate, sol_balance, pnl)])
     except Exception as e:
-        session.rollback()
         print(f"Ошибка при добавлении кошелька {address} в базу данных: {e}")
-    finally:
-        session.close()
-
 
 
 def setup_driver(headless=False):
@@ -62,19 +39,15 @@ def setup_driver(headless=False):
 
 def fetch_wallet_data(driver, wallet_address, period):
     """Загружает данные по конкретному кошельку через Selenium."""
-    global BROWSER_COUNT
-    if BROWSER_COUNT < 4:
-        BROWSER_COUNT += 1
     url = f'{API_URL}{wallet_address}?period={period}'
 
     try:
-        driver.get(url)
-
-        if BROWSER_COUNT < 4:
-            time.sleep(3)
-            driver.uc_gui_click_captcha()
+        # капчу решаем только если она действительно на странице
+        state = SESSIONS.open(driver, url)
+        if state is not PageState.CONTENT:
+            raise RuntimeError(f'страница: {state.value}')
         # Подождём, пока появится <pre> на странице.
-        WebDriverWait(driver, 20).until(
+        WebDriverWait(driver, 10).until(
             EC.presence_of_element_located((By.TAG_NAME, "pre"))
         )
         # Извлекаем json из тега <pre>
@@ -150,14 +123,39 @@ def worker_func(wallet_addresses, period, output_file):
                 )
                 print("Добавил в хороший")
                 print(tabulate([processed], headers="keys", tablefmt="grid"))
-                with open('results.txt', 'a', encoding='utf-8') as file:
-                    result_to_save = {k: v for k, v in processed.items() if k != 'Winrate Value'}
-                    file.write(json.dumps(result_to_save, indent=4) + '\n')
+                result_to_save = {k: v for k, v in processed.items() if k != 'Winrate Value'}
+                append_record('results.txt', result_to_save)
 
 
     driver.quit()
 
 
+def queue_handler(worker_id, period):
+    """Фабрика для run_queue: один драйвер на воркер, адреса берутся из общей очереди."""
+    driver = setup_driver()
+
+    def handle(wallet_address):
+        data = fetch_wallet_data(driver, wallet_address, period)
+        if data is None:
+            return False
+        processed = process_data(data, wallet_address, period)
+        if processed:
+            if processed['Winrate'] > 0.45 and processed['SOL_value'] > 5 and processed['PnL_value'] > 50:
+                add_may_normal(
+                    wallet_address,
+                    processed['Winrate'],
+                    processed['SOL_value'],
+                    processed['PnL_value'],
+                )
+                print("Добавил в хороший")
+                print(tabulate([processed], headers="keys", tablefmt="grid"))
+                result_to_save = {k: v for k, v in processed.items() if k != 'Winrate Value'}
+                append_record('results.txt', result_to_save)
+        return True
+
+    return handle, driver.quit
+
+
 def main():
     start_time = time.time()
     period = '7d'  # или '30d'
@@ -171,31 +169,15 @@ def main():
         print("The file 'list.txt' was not found.")
         return
 
-    # Допустим, хотим разбить на 4 части
+    # Общая очередь вместо разбиения на 4 части: кто освободился — берёт следующий
     num_processes = 4
-    chunk_size = len(all_wallet_addresses) // num_processes + 1
-    chunks = [
-        all_wallet_addresses[i:i + chunk_size]
-        for i in range(0, len(all_wallet_addresses), chunk_size)
-    ]
-
-    processes = []
-    for i, chunk in enumerate(chunks):
-        # Для удобства можно задать отдельные файлы результатов
-        # чтобы избежать одновременной записи. Например:
-        worker_output_file = "./results.txt"
-
-        p = multiprocessing.Process(
-            target=worker_func,
-            args=(chunk, period, worker_output_file)
-        )
-        p.start()
-        time.sleep(4)
-        processes.append(p)
-
-    # Ждём завершения всех процессов
-    for p in processes:
-        p.join()
+    run_queue(
+        all_wallet_addresses,
+        queue_handler,
+        (period,),
+        n_workers=num_processes,
+        start_delay=4,
+    )
 
     print("Все процессы завершены.")
     end_time = time.time()
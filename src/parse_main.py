@@ -5,6 +5,7 @@ import numpy as np
 from datetime import datetime
 from src.db.database import SessionLocal
 from src.db.models import Wallet
+from src.dexscraper.results_io import read_records
 
 from seleniumbase import Driver
 from selenium.webdriver.common.by import By
@@ -124,34 +125,10 @@ def median_interval_and_label(buy_duration: list[str]):
 
 def load_results_multiline(filename):
     """
-    Считываем 'results.txt', где сохранено несколько JSON-объектов (каждый в фигурных скобках),
-    записанных друг за другом (по несколько строк на объект).
+    Считываем 'results.txt': JSON на строку (append_record) и/или старые
+    объекты с indent=4 на несколько строк — см. results_io.iter_records.
     """
-    objects = []
-    current_lines = []
-    inside_object = False
-
-    with open(filename, 'r', encoding='utf-8') as f:
-        for line in f:
-            line_stripped = line.strip()
-            if line_stripped.startswith('{'):
-                inside_object = True
-                current_lines = [line_stripped]
-            elif line_stripped.endswith('}'):
-                current_lines.append(line_stripped)
-                inside_object = False
-                json_text = "\n".join(current_lines)
-                try:
-                    obj = json.loads(json_text)
-                    objects.append(obj)
-                except Exception as e:
-                    print(f"Ошибка парсинга:\n{json_text}\n{e}")
-                current_lines = []
-            else:
-                if inside_object:
-                    current_lines.append(line_stripped)
-
-    return objects
+    return read_records(filename)
 
 
 